@@ -0,0 +1,15 @@
+-- Precomputed k nearest clinics per clinic, written by seeding_scripts/clinic_neighbours.py
+CREATE TABLE IF NOT EXISTS public.clinic_neighbours (
+  clinic_id bigint PRIMARY KEY REFERENCES public.clinics(clinic_id) ON DELETE CASCADE,
+  latitude double precision NOT NULL,
+  longitude double precision NOT NULL,
+  neighbour_ids bigint[] NOT NULL,
+  distances_km real[] NOT NULL,
+  computed_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Add comments to explain the table purpose
+COMMENT ON TABLE public.clinic_neighbours IS 'k nearest clinics of each clinic, nearest first; read by GET /api/clinics/:id/nearby';
+COMMENT ON COLUMN public.clinic_neighbours.latitude IS 'Clinic latitude the row was computed from; compared on reruns to find moved clinics';
+COMMENT ON COLUMN public.clinic_neighbours.longitude IS 'Clinic longitude the row was computed from';
+COMMENT ON COLUMN public.clinic_neighbours.distances_km IS 'Great-circle distance to each entry of neighbour_ids, in kilometers';
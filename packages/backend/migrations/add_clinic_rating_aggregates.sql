@@ -0,0 +1,31 @@
+-- Running review totals per clinic, maintained by seeding_scripts/rating_aggregates.py
+CREATE TABLE IF NOT EXISTS public.clinic_rating_aggregates (
+  clinic_id bigint PRIMARY KEY REFERENCES public.clinics(clinic_id) ON DELETE CASCADE,
+  review_count bigint NOT NULL DEFAULT 0,
+  rating_sum bigint NOT NULL DEFAULT 0,
+  last_review_id bigint NOT NULL DEFAULT 0,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Single-row state of the aggregation job
+CREATE TABLE IF NOT EXISTS public.rating_aggregate_state (
+  id boolean PRIMARY KEY DEFAULT true CHECK (id),
+  last_review_id bigint NOT NULL DEFAULT 0,
+  last_created_at timestamptz,
+  review_count bigint NOT NULL DEFAULT 0,
+  rating_sum bigint NOT NULL DEFAULT 0,
+  prior_mean double precision NOT NULL,
+  prior_weight double precision NOT NULL,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Rating sort of clinic listings (GET /api/clinics?sort=rating) reads this index
+CREATE INDEX IF NOT EXISTS idx_clinics_rating ON public.clinics(rating DESC NULLS LAST);
+
+-- Add comments to explain the table purpose
+COMMENT ON TABLE public.clinic_rating_aggregates IS 'Review count and rating sum of each reviewed clinic; clinics.rating is the smoothed average';
+COMMENT ON COLUMN public.clinic_rating_aggregates.last_review_id IS 'Highest review_id counted into this row, so a rerun after a crash does not count a review twice';
+COMMENT ON TABLE public.rating_aggregate_state IS 'Watermark and Bayesian prior of the rating aggregation job';
+COMMENT ON COLUMN public.rating_aggregate_state.last_review_id IS 'Reviews up to this review_id are counted in clinic_rating_aggregates';
+COMMENT ON COLUMN public.rating_aggregate_state.prior_mean IS 'Mean of all counted reviews when clinic ratings were last smoothed';
+COMMENT ON COLUMN public.rating_aggregate_state.prior_weight IS 'Weight of the prior mean, in reviews';
@@ -0,0 +1,29 @@
+-- Service dictionary, maintained by seeding_scripts/service_taxonomy.py and src/lib/data.ts.
+-- Writers insert names with ON CONFLICT DO NOTHING and read the IDs back, so the
+-- identity columns hand out every ID
+CREATE TABLE IF NOT EXISTS public.service_categories (
+  category_id integer GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  name text NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS public.services (
+  service_id integer GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  category_id integer REFERENCES public.service_categories(category_id),
+  name text NOT NULL,
+  UNIQUE NULLS NOT DISTINCT (category_id, name)
+);
+
+-- Clinic ↔ service links
+CREATE TABLE IF NOT EXISTS public.clinic_services (
+  clinic_id bigint NOT NULL REFERENCES public.clinics(clinic_id) ON DELETE CASCADE,
+  service_id integer NOT NULL REFERENCES public.services(service_id),
+  PRIMARY KEY (clinic_id, service_id)
+);
+
+-- Service filter of clinic listings (GET /api/clinics?service=...) reads this index
+CREATE INDEX IF NOT EXISTS idx_clinic_services_service ON public.clinic_services(service_id, clinic_id);
+
+-- Add comments to explain the table purpose
+COMMENT ON TABLE public.service_categories IS 'Service categories of the facility registry, with stable integer IDs';
+COMMENT ON TABLE public.services IS 'Distinct (category, service) pairs of the facility registry, with stable integer IDs';
+COMMENT ON TABLE public.clinic_services IS 'Services offered by each clinic; clinics.services keeps the joined display text';
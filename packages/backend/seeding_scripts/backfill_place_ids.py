@@ -0,0 +1,233 @@
+"""
+Google Place ID Backfill
+------------------------
+
+Fills `clinics.google_place_id` (see migrations/add_google_place_id.sql) for
+clinics seeded before the column existed.
+
+    - clinics with no place ID are read page by page in `clinic_id` order
+      (keyset pagination, so each page is an index range scan);
+    - each page's names are resolved concurrently through
+      `webscrapping.google_find_place(name, detailed=False)`, which is paced
+      by the adaptive Google rate limiter and reads through the response
+      archive, so names looked up before cost no quota;
+    - resolved IDs are written back concurrently, one update of
+      `google_place_id` per clinic (other columns are never touched, so
+      concurrent edits survive); clinics hitting the UNIQUE constraint (two
+      clinics resolving to the same place) are reported as likely
+      duplicates;
+    - progress (last clinic_id and counters) is saved after every page, so
+      an interrupted run resumes where it stopped. A failed lookup (quota,
+      timeout, transport error) stops the run with the checkpoint just
+      before that clinic, so the resumed run retries it.
+
+Usage:
+    python backfill_place_ids.py --workers 8 --page-size 200
+    python backfill_place_ids.py --restart --dry-run --limit 100
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+import webscrapping
+from response_archive import ARCHIVE_FILE, ResponseArchive
+from seed_supabase import get_supabase_client
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+STATE_FILE = os.path.join(os.path.dirname(__file__), "backfill_place_ids.state.json")
+UNIQUE_VIOLATION = "23505"
+
+
+def new_state() -> dict:
+    return {"last_clinic_id": 0, "resolved": 0, "unresolved": 0, "duplicates": []}
+
+
+def load_state(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return new_state()
+
+
+def save_state(state: dict, path: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+# ============================================================
+# --- BACKFILL ---
+# ============================================================
+
+def iter_clinic_pages(supabase, after_id: int, page_size: int) -> Iterator[List[Dict]]:
+    """Yield pages of clinics without a place ID, in clinic_id order, after `after_id`."""
+    while True:
+        page = (
+            supabase.table("clinics")
+            .select("clinic_id,name")
+            .is_("google_place_id", "null")
+            .gt("clinic_id", after_id)
+            .order("clinic_id")
+            .limit(page_size)
+            .execute()
+            .data
+        )
+        if not page:
+            return
+        yield page
+        after_id = page[-1]["clinic_id"]
+
+
+def resolve_place_id(clinic: Dict) -> Optional[str]:
+    """Place ID of a clinic, None when Google has no confident match; failed lookups raise."""
+    if not clinic.get("name"):
+        return None
+    result = webscrapping.google_find_place(clinic["name"], detailed=False, raise_errors=True)
+    return result["google_place_id"] if result else None
+
+
+def resolve_page(pool: ThreadPoolExecutor, page: List[Dict]) -> Tuple[List[Optional[str]], Optional[Exception]]:
+    """
+    Resolve a page concurrently.
+
+    Returns:
+        tuple: Place IDs of the clinics up to the first failed lookup, and
+        that lookup's error (None when every lookup completed).
+    """
+    futures = [pool.submit(resolve_place_id, clinic) for clinic in page]
+    place_ids = []
+    for future in futures:
+        try:
+            place_ids.append(future.result())
+        except Exception as e:
+            for pending in futures:
+                pending.cancel()
+            return place_ids, e
+    return place_ids, None
+
+
+def write_place_ids(supabase, rows: List[Dict], pool: Optional[ThreadPoolExecutor] = None) -> List[Dict]:
+    """
+    Write resolved place IDs back; returns the rows rejected as duplicates.
+
+    Only `google_place_id` is written, and only while it is still empty, so
+    columns changed since the page was read (ratings, API edits) are kept.
+    """
+    def write(row: Dict) -> bool:
+        try:
+            supabase.table("clinics").update({"google_place_id": row["google_place_id"]}) \
+                .eq("clinic_id", row["clinic_id"]).is_("google_place_id", "null").execute()
+            return False
+        except APIError as e:
+            if e.code != UNIQUE_VIOLATION:
+                raise
+            return True
+
+    rejected = (pool.map if pool is not None else map)(write, rows)
+    return [row for row, duplicate in zip(rows, rejected) if duplicate]
+
+
+def backfill_place_ids(supabase, workers: int = 8, page_size: int = 200, limit: Optional[int] = None,
+                       state_file: str = STATE_FILE, restart: bool = False, dry_run: bool = False) -> dict:
+    """
+    Resolve and store place IDs for every clinic that lacks one.
+
+    Parameters:
+        supabase: Supabase client.
+        workers (int): Concurrent Google lookups (the rate limiter still applies).
+        page_size (int): Clinics per page, and per write-back batch.
+        limit (int): Stop after this many clinics (for trial runs).
+        state_file (str): Progress file used to resume.
+        restart (bool): Ignore saved progress.
+        dry_run (bool): Resolve but do not write to Supabase (progress is not saved).
+
+    Returns:
+        dict: The final state (counters and duplicate list).
+    """
+    state = new_state() if restart else load_state(state_file)
+    if state["last_clinic_id"]:
+        print(f"Resuming after clinic_id {state['last_clinic_id']} "
+              f"({state['resolved']} resolved, {state['unresolved']} unresolved so far)")
+
+    started = time.perf_counter()
+    processed = 0
+    resolved_this_run = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for page in iter_clinic_pages(supabase, state["last_clinic_id"], page_size):
+            if limit is not None:
+                page = page[:max(0, limit - processed)]
+                if not page:
+                    break
+
+            # Clinics after a failed lookup are left for the resumed run
+            place_ids, error = resolve_page(pool, page)
+            page = page[:len(place_ids)]
+            rows = [dict(clinic, google_place_id=place_id)
+                    for clinic, place_id in zip(page, place_ids) if place_id]
+
+            duplicates = write_place_ids(supabase, rows, pool) if rows and not dry_run else []
+            for row in duplicates:
+                print(f"⚠️ Place {row['google_place_id']} already belongs to another clinic "
+                      f"(clinic_id {row['clinic_id']}, '{row.get('name')}')")
+
+            processed += len(page)
+            resolved_this_run += len(rows) - len(duplicates)
+            state["resolved"] += len(rows) - len(duplicates)
+            state["unresolved"] += len(page) - len(rows)
+            state["duplicates"] += [{"clinic_id": r["clinic_id"], "google_place_id": r["google_place_id"]}
+                                    for r in duplicates]
+            if page:
+                state["last_clinic_id"] = page[-1]["clinic_id"]
+            if not dry_run:
+                save_state(state, state_file)
+            if error is not None:
+                print(f"❌ Lookup failed after clinic_id {state['last_clinic_id']} ({error}); "
+                      f"rerun to resume from there.")
+                raise error
+
+            minutes = (time.perf_counter() - started) / 60
+            print(f"✅ Up to clinic_id {state['last_clinic_id']}: {processed} processed, "
+                  f"{resolved_this_run} resolved ({resolved_this_run / minutes if minutes else 0:.0f}/min), "
+                  f"Google rate {webscrapping.GOOGLE_LIMITER.rate:.1f} req/s")
+
+    print(f"\nBackfill complete: {state['resolved']} resolved, {state['unresolved']} unresolved, "
+          f"{len(state['duplicates'])} duplicates.")
+    return state
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill clinics.google_place_id from Google Places.")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent Google lookups")
+    parser.add_argument("--page-size", type=int, default=200, help="Clinics per page and per write-back")
+    parser.add_argument("--limit", type=int, help="Stop after this many clinics")
+    parser.add_argument("--state-file", default=STATE_FILE, help="Progress file used to resume")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved progress")
+    parser.add_argument("--dry-run", action="store_true", help="Resolve without writing to Supabase")
+    parser.add_argument("--archive", default=ARCHIVE_FILE, help="Response archive used as the lookup cache")
+    args = parser.parse_args()
+
+    webscrapping.ARCHIVE, webscrapping.ARCHIVE_MODE = ResponseArchive(args.archive), "record"
+    backfill_place_ids(
+        get_supabase_client(),
+        workers=args.workers,
+        page_size=args.page_size,
+        limit=args.limit,
+        state_file=args.state_file,
+        restart=args.restart,
+        dry_run=args.dry_run,
+    )
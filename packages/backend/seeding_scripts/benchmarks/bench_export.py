@@ -0,0 +1,57 @@
+"""
+Offline benchmarks for the keyset-paginated table export.
+
+Run from this directory:
+    pytest bench_export.py
+"""
+
+import json
+import os
+
+import pytest
+
+import export_tables
+import seed_supabase
+
+EXPORT_ROWS = 10_000
+PAGE_SIZE = 500
+ROUND_TRIP = 0.1  # seconds per request, like a remote Supabase project
+
+
+@pytest.fixture
+def appointments(supabase_env):
+    """EXPORT_ROWS appointments in the stub, with gaps in the key space like a real table."""
+    rows = [
+        {"appointment_id": 1 + i * 3, "user_id": 1 + i % 97, "clinic_id": 1 + i % 31,
+         "date": "2026-01-05", "time": "09:15:00", "status": "pending", "created_at": "2026-01-01T00:00:00+00:00"}
+        for i in range(EXPORT_ROWS)
+    ]
+    supabase_env.postgrest.tables["appointments"] = rows
+    supabase_env.postgrest_latency = ROUND_TRIP
+    yield rows
+    supabase_env.postgrest_latency = 0.0
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def bench_export_ndjson(benchmark, appointments, tmp_path, workers):
+    client = seed_supabase.get_supabase_client()
+    output = str(tmp_path / "appointments.ndjson")
+    stats = benchmark.pedantic(export_tables.export_table, args=(client, "appointments", output),
+                               kwargs={"workers": workers, "page_size": PAGE_SIZE}, rounds=3)
+
+    with open(output, "r", encoding="utf-8") as f:
+        keys = [json.loads(line)["appointment_id"] for line in f]
+    assert stats.rows == EXPORT_ROWS and keys == [row["appointment_id"] for row in appointments]
+
+
+def bench_export_parquet(benchmark, appointments, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    client = seed_supabase.get_supabase_client()
+    output = str(tmp_path / "appointments.parquet")
+    benchmark.pedantic(export_tables.export_table, args=(client, "appointments", output, "parquet"),
+                       kwargs={"workers": 4, "page_size": PAGE_SIZE}, rounds=3)
+
+    table = pq.read_table(output)
+    assert table.num_rows == EXPORT_ROWS
+    assert str(table.schema.field("appointment_id").type) == "int64"
+    assert not [p for p in os.listdir(tmp_path) if ".part" in p]
@@ -0,0 +1,79 @@
+"""
+Offline benchmarks for the clinic rating aggregates.
+
+Run from this directory:
+    pytest bench_ratings.py
+"""
+
+import random
+
+import pytest
+
+import rating_aggregates
+import seed_supabase
+
+CLINICS = 300
+REVIEWS = 20_000
+NEW_REVIEWS = 200
+
+
+def _reviews(first_id: int, count: int, rng: random.Random, ratings=(3, 4, 5)):
+    return [
+        {"review_id": first_id + i, "user_id": 1, "clinic_id": rng.randint(1, CLINICS),
+         "rating": rng.choice(ratings), "comment": None, "created_at": "2026-01-01T00:00:00+00:00"}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def reviewed_clinics(supabase_env):
+    """CLINICS clinics carrying random seeded ratings, and REVIEWS reviews."""
+    rng = random.Random(0)
+    tables = supabase_env.postgrest.tables
+    tables["clinics"] = [{"clinic_id": i, "name": f"Clinic {i}", "rating": round(rng.uniform(3.5, 5.0), 1)}
+                         for i in range(1, CLINICS + 1)]
+    tables["reviews"] = _reviews(1, REVIEWS, rng)
+    return supabase_env
+
+
+def _check(client):
+    result = rating_aggregates.verify_rating_aggregates(client)
+    assert not result["wrong_totals"] and not result["wrong_ratings"] and result["state_ok"]
+
+
+def bench_rebuild(benchmark, reviewed_clinics):
+    client = seed_supabase.get_supabase_client()
+    stats = benchmark.pedantic(rating_aggregates.rebuild_rating_aggregates, args=(client,), rounds=3)
+    assert stats["reviews"] == REVIEWS
+    _check(client)
+
+
+@pytest.mark.parametrize("ratings", [(3, 4, 5), (1,)], ids=["steady", "prior-drift"])
+def bench_incremental(benchmark, reviewed_clinics, ratings):
+    client = seed_supabase.get_supabase_client()
+    rating_aggregates.rebuild_rating_aggregates(client)
+    rng = random.Random(1)
+    reviews = reviewed_clinics.postgrest.tables["reviews"]
+
+    def add_reviews():
+        reviews.extend(_reviews(reviews[-1]["review_id"] + 1, NEW_REVIEWS, rng, ratings))
+
+    stats = benchmark.pedantic(rating_aggregates.refresh_rating_aggregates, args=(client,),
+                               setup=add_reviews, rounds=3)
+    assert stats["reviews"] == NEW_REVIEWS
+    _check(client)
+
+
+def bench_incremental_after_crash(benchmark, reviewed_clinics):
+    """A run whose state write never happened is repeated without counting a review twice."""
+    client = seed_supabase.get_supabase_client()
+    rating_aggregates.rebuild_rating_aggregates(client)
+    reviews = reviewed_clinics.postgrest.tables["reviews"]
+    reviews.extend(_reviews(REVIEWS + 1, NEW_REVIEWS, random.Random(2)))
+
+    state = reviewed_clinics.postgrest.rows("rating_aggregate_state")
+    rating_aggregates.refresh_rating_aggregates(client)
+    reviewed_clinics.postgrest.tables["rating_aggregate_state"] = state
+
+    benchmark.pedantic(rating_aggregates.refresh_rating_aggregates, args=(client,), rounds=1)
+    _check(client)
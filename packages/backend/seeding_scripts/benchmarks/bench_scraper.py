@@ -0,0 +1,139 @@
+"""
+Offline benchmarks for the KMHFL scraper, the clinics seeder and the pipeline.
+
+Run from this directory:
+    pip install -r requirements.txt
+    pytest                                  # all benchmarks
+    pytest -k extract --benchmark-save=base # save a baseline
+    pytest --benchmark-compare              # compare against it
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import seed_supabase
+import webscrapping
+from parse_pool import ParsePool
+from pipeline import ScrapeSeedPipeline
+
+DETAIL_FACILITIES = 60  # Detail pages fetched per phase 2 / pipeline round
+
+# Dependencies the scraper and seeder only import on first use
+HEAVY_MODULES = ("requests", "bs4", "googlemaps", "dotenv", "supabase", "numpy")
+
+
+@pytest.fixture(scope="module")
+def detail_html(stub):
+    return stub.detail_page(stub.facility_id(0))
+
+
+@pytest.fixture
+def general_file(scraper_env):
+    """A Phase 1 output file listing DETAIL_FACILITIES synthetic facilities."""
+    with open(webscrapping.GENERAL_OUTPUT_FILE, "w", encoding="utf-8") as f:
+        json.dump(scraper_env.general_records(DETAIL_FACILITIES), f)
+    return webscrapping.GENERAL_OUTPUT_FILE
+
+
+# ============================================================
+# --- STARTUP ---
+# ============================================================
+
+@pytest.mark.parametrize("module", ["webscrapping", "seed_supabase", "parse_pool"])
+def bench_import_startup(benchmark, module):
+    """A fresh interpreter importing the module, as a parse worker or test does."""
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    run = lambda: subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(webscrapping.__file__),
+                                 capture_output=True, text=True, check=True)
+    result = benchmark.pedantic(run, rounds=5)
+    assert result.stdout.strip() == "", f"{module} imports {result.stdout.strip()} at import time"
+
+
+# ============================================================
+# --- PARSING ---
+# ============================================================
+
+def bench_extract_facility_details(benchmark, detail_html):
+    record = benchmark(webscrapping.extract_facility_details, detail_html, google_data=False)
+    assert record["services"]
+
+
+def bench_extract_facility_details_with_google(benchmark, scraper_env, detail_html):
+    record = benchmark(webscrapping.extract_facility_details, detail_html)
+    assert record["google_location"]
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def bench_parse_pool(benchmark, detail_html, workers):
+    pages = [detail_html.encode("utf-8")] * 400
+    with ParsePool(workers) as pool:
+        pool.parse_all(pages[:workers * pool.chunksize])  # start the workers
+        records = benchmark(pool.parse_all, pages)
+    assert len(records) == len(pages)
+
+
+# ============================================================
+# --- FETCH PHASES ---
+# ============================================================
+
+def bench_fetch_general_phase(benchmark, scraper_env):
+    total = benchmark(webscrapping.fetch_all_general_data)
+    assert total > 0
+
+
+def bench_fetch_detail_phase(benchmark, scraper_env, general_file, monkeypatch):
+    monkeypatch.setattr(webscrapping, "MAX_FACILITIES_FOR_DETAIL", None)
+    benchmark.pedantic(webscrapping.fetch_all_detail_data, rounds=3)
+
+    with open(webscrapping.DETAIL_OUTPUT_FILE, "r", encoding="utf-8") as f:
+        assert len(json.load(f)) == DETAIL_FACILITIES
+
+
+# ============================================================
+# --- SEEDING ---
+# ============================================================
+
+def bench_populate_clinics(benchmark, scraper_env, supabase_env, general_file, monkeypatch):
+    # seed_clinics reads the detail dump from the working directory
+    monkeypatch.setattr(webscrapping, "MAX_FACILITIES_FOR_DETAIL", None)
+    webscrapping.fetch_all_detail_data()
+    monkeypatch.chdir(os.path.dirname(webscrapping.DETAIL_OUTPUT_FILE))
+    os.replace(webscrapping.DETAIL_OUTPUT_FILE, "all_kmhfl_facilities_details.json")
+
+    client = seed_supabase.get_supabase_client()
+    benchmark.pedantic(
+        seed_supabase.seed_clinics, args=(client,), setup=supabase_env.postgrest.reset, rounds=3,
+    )
+    assert len(supabase_env.postgrest.rows("clinics")) == DETAIL_FACILITIES
+
+
+# ============================================================
+# --- PIPELINE ---
+# ============================================================
+
+def bench_pipeline(benchmark, scraper_env, supabase_env):
+    ids = [scraper_env.facility_id(i) for i in range(DETAIL_FACILITIES)]
+
+    def run():
+        pipeline = ScrapeSeedPipeline(fetch_workers=8, fetch_delay=0, batch_size=20)
+        pipeline.run(ids, report_every=60)
+
+    benchmark.pedantic(run, setup=supabase_env.postgrest.reset, rounds=3)
+    assert len(supabase_env.postgrest.rows("clinics")) == DETAIL_FACILITIES
+    linked = {row["clinic_id"] for row in supabase_env.postgrest.rows("clinic_services")}
+    assert linked == {row["clinic_id"] for row in supabase_env.postgrest.rows("clinics")}
+
+
+def bench_pipeline_parse_processes(benchmark, scraper_env, supabase_env):
+    ids = [scraper_env.facility_id(i) for i in range(DETAIL_FACILITIES)]
+
+    def run():
+        pipeline = ScrapeSeedPipeline(fetch_workers=8, fetch_delay=0, batch_size=20, parse_processes=2)
+        pipeline.run(ids, report_every=60)
+
+    benchmark.pedantic(run, setup=supabase_env.postgrest.reset, rounds=3)
+    assert len(supabase_env.postgrest.rows("clinics")) == DETAIL_FACILITIES
@@ -0,0 +1,56 @@
+"""
+Offline benchmarks for the appointment slot book.
+
+Run from this directory:
+    pytest bench_slots.py
+"""
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from appointment_slots import BOOKING_HORIZON_DAYS, SLOTS_PER_DAY, SlotBook
+
+CLINICS = 500
+REQUESTS = 200_000
+
+
+def _reference(book: SlotBook, clinic_ids, days, slots):
+    """`book_next` per request, in requested-time order (what `schedule` promises)."""
+    order = sorted(range(len(clinic_ids)), key=lambda i: (days[i], slots[i]))
+    booked = [None] * len(clinic_ids)
+    for i in order:
+        booked[i] = book.book_next(int(clinic_ids[i]), int(days[i]), int(slots[i]))
+    return booked
+
+
+@pytest.mark.parametrize("capacity", [1, 2])
+def bench_schedule(benchmark, capacity):
+    rng = np.random.default_rng(0)
+    clinic_ids = rng.integers(1, CLINICS + 1, REQUESTS)
+    days = rng.integers(0, BOOKING_HORIZON_DAYS, REQUESTS)
+    slots = rng.integers(0, SLOTS_PER_DAY, REQUESTS)
+
+    def run():
+        book = SlotBook(date.today(), capacity, clinics=CLINICS)
+        return book, book.schedule(clinic_ids, days, slots)
+
+    book, (booked_days, booked_slots) = benchmark.pedantic(run, rounds=3)
+    assert book.check() and book.booked == REQUESTS
+
+
+@pytest.mark.parametrize("clinics", [1, 2])
+def bench_schedule_after_full_days(benchmark, clinics):
+    """A second batch at day 0 lands after days an earlier batch filled past its requested day."""
+    def run():
+        book, reference = SlotBook(date.today(), 1), SlotBook(date.today(), 1)
+        first = ([1] * 108, [0] * 108, [0] * 108)
+        second = ([1] * 1008 + list(range(2, clinics + 1)), [0] * (1007 + clinics), [0] * (1007 + clinics))
+        book.schedule(*first)
+        _reference(reference, *first)
+        return book, reference, book.schedule(*second), _reference(reference, *second)
+
+    book, reference, (booked_days, booked_slots), expected = benchmark.pedantic(run, rounds=1)
+    assert list(zip(booked_days.tolist(), booked_slots.tolist())) == expected
+    assert book.check() and reference.check()
@@ -0,0 +1,65 @@
+"""
+Shared fixtures for the offline benchmarks.
+
+Every remote dependency of the seeding scripts is redirected to a local
+`StubServer`: the KMHFL pages and API, Google Places (through a
+`googlemaps.Client` pointed at the stub) and Supabase/PostgREST. Scraper
+output files are written to a temporary directory, and the scraper's
+politeness delays are disabled so runs measure our own code.
+"""
+
+import os
+import sys
+
+import pytest
+
+BENCHMARKS_DIR = os.path.dirname(__file__)
+SCRIPTS_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+# Read when the scraper's Google client and the Supabase client are first created
+os.environ["GOOGLE_MAPS_API_KEY"] = "AIzaOfflineBenchmarkKey"
+os.environ["SUPABASE_URL"] = "http://127.0.0.1"
+os.environ["SUPABASE_SERVICE_ROLE_KEY"] = "offline.benchmark.key"
+
+import googlemaps  # noqa: E402
+
+import webscrapping  # noqa: E402
+from rate_limit import AdaptiveRateLimiter  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def stub():
+    """One stub server for the whole benchmark session."""
+    with StubServer(facility_count=300) as server:
+        yield server
+
+
+@pytest.fixture
+def supabase_env(stub, monkeypatch):
+    """Point `get_supabase_client` at the stub and start from empty tables."""
+    stub.postgrest.reset()
+    monkeypatch.setenv("SUPABASE_URL", stub.url)
+    return stub
+
+
+@pytest.fixture
+def scraper_env(stub, tmp_path, monkeypatch):
+    """
+    Redirect webscrapping to the stub server and a temporary output directory.
+    """
+    monkeypatch.setattr(webscrapping, "home_page", f"{stub.url}/public/facilities")
+    monkeypatch.setattr(webscrapping, "GENERAL_LIST_URL",
+                        f"{stub.url}/api/facilities/facilities/?approved_national_level=true&page=1")
+    monkeypatch.setattr(webscrapping, "DETAIL_API_BASE_URL", f"{stub.url}/public/facilities/")
+    monkeypatch.setattr(webscrapping, "GENERAL_OUTPUT_FILE", str(tmp_path / "general.json"))
+    monkeypatch.setattr(webscrapping, "DETAIL_OUTPUT_FILE", str(tmp_path / "details.json"))
+    monkeypatch.setattr(webscrapping, "gmaps", googlemaps.Client(
+        key=os.environ["GOOGLE_MAPS_API_KEY"], base_url=stub.url, queries_per_second=10_000,
+    ))
+    monkeypatch.setattr(webscrapping, "METRICS_DIR", str(tmp_path / "metrics"))
+    for limiter in ("KMHFL_LIMITER", "GOOGLE_LIMITER"):
+        monkeypatch.setattr(webscrapping, limiter, AdaptiveRateLimiter(limiter, initial_rate=1e6, max_rate=1e6))
+    return stub
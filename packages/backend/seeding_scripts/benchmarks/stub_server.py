@@ -0,0 +1,401 @@
+"""
+Offline Stub Server
+-------------------
+
+A local HTTP server that stands in for every remote service the seeding
+scripts talk to, so they can be benchmarked without network access:
+
+    GET  /public/facilities                  KMHFL home page (token + first page)
+    GET  /public/facilities/<id>             KMHFL facility detail page
+    GET  /api/facilities/facilities/?page=N  KMHFL paginated facility API
+    GET  /maps/api/place/findplacefromtext/json   Google Places "Find Place"
+    GET|POST|PATCH|DELETE /rest/v1/<table>   PostgREST-compatible in-memory tables
+
+Responses are built from the recorded pages in `fixtures/`. Detail pages are
+served for any facility ID by cycling through the recorded ones, and the
+facility API paginates over `facility_count` synthetic facilities, so runs
+can be scaled up without recording more data.
+
+Usage:
+    python stub_server.py --port 8765 --facilities 15000
+"""
+
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Primary key of each seeded table; other tables fall back to "id"
+PRIMARY_KEYS = {
+    "users": "user_id",
+    "clinics": "clinic_id",
+    "appointments": "appointment_id",
+    "reviews": "review_id",
+    "clinic_neighbours": "clinic_id",
+    "clinic_rating_aggregates": "clinic_id",
+    "service_categories": "category_id",
+    "services": "service_id",
+    "clinic_services": "clinic_id",
+}
+
+PAGE_SIZE = 30
+NEXT_DATA_PATTERN = re.compile(r'(<script id="__NEXT_DATA__" type="application/json">)(.*?)(</script>)', re.S)
+
+
+def _fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+# ============================================================
+# --- POSTGREST STAND-IN ---
+# ============================================================
+
+class PostgrestTables:
+    """In-memory tables answering the subset of PostgREST used by the scripts."""
+
+    CONTROL_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables: Dict[str, List[dict]] = {}
+        self.sequences: Dict[str, itertools.count] = {}
+
+    def reset(self):
+        with self.lock:
+            self.tables.clear()
+            self.sequences.clear()
+
+    def rows(self, table: str) -> List[dict]:
+        with self.lock:
+            return [dict(row) for row in self.tables.get(table, [])]
+
+    def _key(self, table: str) -> str:
+        return PRIMARY_KEYS.get(table, "id")
+
+    # ------------- FILTERS -------------
+
+    @staticmethod
+    def _coerce(raw: str, sample):
+        if isinstance(sample, bool):
+            return raw == "true"
+        if isinstance(sample, int):
+            return int(raw)
+        if isinstance(sample, float):
+            return float(raw)
+        return raw
+
+    def _matches(self, row: dict, column: str, expression: str) -> bool:
+        op, _, raw = expression.partition(".")
+        negate = op == "not"
+        if negate:
+            op, _, raw = raw.partition(".")
+        value = row.get(column)
+
+        if op == "is":
+            result = value is None if raw == "null" else value == (raw == "true")
+        elif op == "in":
+            options = next(csv.reader([raw.strip("()")], skipinitialspace=True)) if raw.strip("()") else []
+            result = value is not None and value in [self._coerce(o, value) for o in options]
+        elif value is None:
+            result = False
+        elif op in ("like", "ilike"):
+            pattern = re.escape(raw).replace(r"\*", ".*").replace("%", ".*")
+            result = re.fullmatch(pattern, str(value), re.I if op == "ilike" else 0) is not None
+        else:
+            target = self._coerce(raw, value)
+            result = {
+                "eq": value == target, "neq": value != target,
+                "gt": value > target, "gte": value >= target,
+                "lt": value < target, "lte": value <= target,
+            }[op]
+        return not result if negate else result
+
+    def _filtered(self, table: str, params: List[tuple]) -> List[dict]:
+        rows = self.tables.get(table, [])
+        for column, expression in params:
+            if column not in self.CONTROL_PARAMS:
+                rows = [row for row in rows if self._matches(row, column, expression)]
+        return rows
+
+    @staticmethod
+    def _project(rows: List[dict], select: Optional[str]) -> List[dict]:
+        if not select or select == "*":
+            return [dict(row) for row in rows]
+        columns = [c.strip() for c in select.split(",")]
+        return [{c: row.get(c) for c in columns} for row in rows]
+
+    # ------------- VERBS -------------
+
+    def select(self, table: str, params: List[tuple]) -> List[dict]:
+        with self.lock:
+            rows = list(self._filtered(table, params))
+        options = dict(params)
+        for order in reversed((options.get("order") or "").split(",")):
+            if order:
+                column, _, direction = order.partition(".")
+                present = [r for r in rows if r.get(column) is not None]
+                missing = [r for r in rows if r.get(column) is None]
+                present.sort(key=lambda r: r[column], reverse=direction.startswith("desc"))
+                rows = present + missing
+        offset = int(options.get("offset", 0))
+        limit = options.get("limit")
+        rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+        return self._project(rows, options.get("select"))
+
+    def insert(self, table: str, payload, params: List[tuple], merge: bool) -> List[dict]:
+        rows = payload if isinstance(payload, list) else [payload]
+        key = self._key(table)
+        conflict = dict(params).get("on_conflict") or key
+        written = []
+        with self.lock:
+            existing = self.tables.setdefault(table, [])
+            sequence = self.sequences.setdefault(table, itertools.count(1))
+            by_conflict = {row.get(conflict): row for row in existing if row.get(conflict) is not None}
+            for row in rows:
+                current = by_conflict.get(row.get(conflict)) if merge else None
+                if current is not None:
+                    current.update(row)
+                    written.append(dict(current))
+                    continue
+                new_row = dict(row)
+                if new_row.get(key) is None:
+                    new_row[key] = next(sequence)
+                existing.append(new_row)
+                if new_row.get(conflict) is not None:
+                    by_conflict[new_row[conflict]] = new_row
+                written.append(dict(new_row))
+        return written
+
+    def update(self, table: str, changes: dict, params: List[tuple]) -> List[dict]:
+        with self.lock:
+            rows = self._filtered(table, params)
+            for row in rows:
+                row.update(changes)
+            return [dict(row) for row in rows]
+
+    def delete(self, table: str, params: List[tuple]) -> List[dict]:
+        with self.lock:
+            doomed = self._filtered(table, params)
+            ids = {id(row) for row in doomed}
+            self.tables[table] = [row for row in self.tables.get(table, []) if id(row) not in ids]
+            return [dict(row) for row in doomed]
+
+
+# ============================================================
+# --- HTTP SERVER ---
+# ============================================================
+
+class StubServer:
+    """
+    Threaded stub server for KMHFL, Google Places and PostgREST.
+
+    Parameters:
+        port (int): Port to bind on 127.0.0.1 (0 picks a free one).
+        facility_count (int): Number of facilities the paginated API reports.
+        postgrest_latency (float): Seconds added to every PostgREST request,
+            standing in for the round trip to a remote database.
+    """
+
+    def __init__(self, port: int = 0, facility_count: int = 300, postgrest_latency: float = 0.0):
+        self.facility_count = facility_count
+        self.postgrest_latency = postgrest_latency
+        self.postgrest = PostgrestTables()
+        self.request_counts: Dict[str, int] = {}
+        self._counts_lock = threading.Lock()
+
+        self._home_page = _fixture("kmhfl_home.html")
+        self._detail_pages = sorted(
+            name for name in os.listdir(FIXTURES_DIR) if name.startswith("kmhfl_facility_")
+        )
+        self._detail_templates = [self._split_detail(_fixture(name)) for name in self._detail_pages]
+        self._places = json.loads(_fixture("places_find_place.json"))
+        self._general_sample = json.loads(NEXT_DATA_PATTERN.search(self._home_page).group(2))[
+            "props"]["pageProps"]["data"]["results"]
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def facility_id(self, ordinal: int) -> str:
+        """Deterministic synthetic facility ID for an ordinal."""
+        digest = hashlib.md5(f"facility-{ordinal}".encode()).hexdigest()
+        return f"{digest[:8]}-{digest[8:12]}-{digest[12:16]}-{digest[16:20]}-{digest[20:32]}"
+
+    def general_records(self, count: int) -> List[dict]:
+        """`count` Phase 1 records with synthetic IDs, cycled from the recorded page."""
+        records = []
+        for ordinal in range(count):
+            record = dict(self._general_sample[ordinal % len(self._general_sample)])
+            record["id"] = self.facility_id(ordinal)
+            records.append(record)
+        return records
+
+    # ------------- RESPONSES -------------
+
+    @staticmethod
+    def _split_detail(html: str):
+        match = NEXT_DATA_PATTERN.search(html)
+        return html[:match.start(2)], json.loads(match.group(2)), html[match.end(2):]
+
+    def detail_page(self, facility_id: str) -> str:
+        digest = int(hashlib.md5(facility_id.encode()).hexdigest(), 16)
+        prefix, data, suffix = self._detail_templates[digest % len(self._detail_templates)]
+        facility = dict(data["props"]["pageProps"]["data"])
+        facility["id"] = facility_id
+        facility["name"] = f"{facility['name']} {facility_id[:8]}"
+        page = {**data, "props": {**data["props"], "pageProps": {**data["props"]["pageProps"], "data": facility}}}
+        return prefix + json.dumps(page, ensure_ascii=False) + suffix
+
+    def facility_page(self, path: str, params: Dict[str, str]) -> dict:
+        page = int(params.get("page", 1))
+        start = (page - 1) * PAGE_SIZE
+        end = min(start + PAGE_SIZE, self.facility_count)
+        results = [
+            {**self._general_sample[i % len(self._general_sample)], "id": self.facility_id(i)}
+            for i in range(start, end)
+        ]
+        next_url = None
+        if end < self.facility_count:
+            next_url = f"{self.url}{path}?{urlencode({**params, 'page': page + 1})}"
+        return {"count": self.facility_count, "next": next_url, "results": results}
+
+    def find_place(self, params: Dict[str, str]) -> dict:
+        query = params.get("input", "")
+        response = json.loads(json.dumps(self._places))
+        for candidate in response.get("candidates", []):
+            candidate["name"] = query
+            candidate["place_id"] = "ChIJ" + hashlib.md5(query.encode()).hexdigest()[:23]
+        return response
+
+    def _count(self, route: str):
+        with self._counts_lock:
+            self.request_counts[route] = self.request_counts.get(route, 0) + 1
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # Headers and body go out as separate writes
+
+            def log_message(self, *args):
+                pass  # Keep benchmark output clean
+
+            def _send(self, status: int, body, content_type: str = "application/json"):
+                data = body if isinstance(body, bytes) else (
+                    body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8"))
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"null")
+
+            def _route(self, method: str):
+                parts = urlsplit(self.path)
+                path = parts.path.rstrip("/")
+                params = parse_qsl(parts.query, keep_blank_values=True)
+
+                if path.startswith("/rest/v1/"):
+                    stub._count("postgrest")
+                    return self._postgrest(method, path[len("/rest/v1/"):], params)
+                if method != "GET":
+                    return self._send(405, {"error": "method not allowed"})
+
+                if path == "/public/facilities":
+                    stub._count("home")
+                    return self._send(200, stub._home_page, "text/html; charset=utf-8")
+                if path.startswith("/public/facilities/"):
+                    stub._count("detail")
+                    facility_id = path.rsplit("/", 1)[-1]
+                    return self._send(200, stub.detail_page(facility_id), "text/html; charset=utf-8")
+                if path == "/api/facilities/facilities":
+                    stub._count("api")
+                    return self._send(200, stub.facility_page(parts.path, dict(params)))
+                if path == "/maps/api/place/findplacefromtext/json":
+                    stub._count("places")
+                    return self._send(200, stub.find_place(dict(params)))
+                return self._send(404, {"error": f"no stub for {path}"})
+
+            def _postgrest(self, method: str, table: str, params: List[tuple]):
+                prefer = self.headers.get("Prefer", "")
+                tables = stub.postgrest
+                if stub.postgrest_latency:
+                    time.sleep(stub.postgrest_latency)
+                if method == "GET":
+                    rows = tables.select(table, params)
+                elif method == "POST":
+                    rows = tables.insert(table, self._body(), params, merge="merge-duplicates" in prefer)
+                elif method == "PATCH":
+                    rows = tables.update(table, self._body(), params)
+                else:
+                    self._body()  # drain it, or the next keep-alive request is misread
+                    rows = tables.delete(table, params)
+                if method != "GET" and "return=minimal" in prefer:
+                    return self._send(201 if method == "POST" else 204, b"")
+                return self._send(201 if method == "POST" else 200, rows)
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def do_PATCH(self):
+                self._route("PATCH")
+
+            def do_DELETE(self):
+                self._route("DELETE")
+
+        return Handler
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve offline KMHFL / Google Places / PostgREST stubs.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--facilities", type=int, default=300, help="Facilities reported by the paginated API")
+    args = parser.parse_args()
+
+    with StubServer(port=args.port, facility_count=args.facilities) as server:
+        print(f"Stub server listening on {server.url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
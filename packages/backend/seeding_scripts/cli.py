@@ -0,0 +1,70 @@
+"""
+MediMap Data CLI
+----------------
+
+Single entry point for the data scripts:
+
+    crawl     scrape KMHFL (webscrapping.py)
+    pipeline  scrape, parse and seed clinics concurrently (pipeline.py)
+    enrich    backfill Google place IDs of clinics (backfill_place_ids.py)
+    seed      seed the Supabase tables (seed_supabase.py)
+    export    snapshot tables to NDJSON / Parquet (export_tables.py)
+    services  service dictionary and clinic links (service_taxonomy.py)
+    embed     build / query the clinic search indexes (vector_search/hybrid_search.py)
+
+Everything after the subcommand is handed to that script's own argument
+parser. The script runs in its own interpreter exactly as if started
+directly (so its multiprocessing workers work unchanged), and `cli.py`
+itself imports nothing but the standard library.
+
+Usage:
+    python cli.py crawl --shard 1/4
+    python cli.py enrich --workers 8
+    python cli.py seed --backend copy
+    python cli.py export clinics --format parquet
+    python cli.py services sync
+    python cli.py embed build --mode pq
+    python cli.py seed --help
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# subcommand -> (script path relative to this directory, help)
+COMMANDS = {
+    "crawl": ("webscrapping.py", "Scrape KMHFL facility data"),
+    "pipeline": ("pipeline.py", "Scrape, parse and seed clinics concurrently"),
+    "enrich": ("backfill_place_ids.py", "Backfill Google place IDs of existing clinics"),
+    "seed": ("seed_supabase.py", "Seed users, clinics, appointments and reviews"),
+    "export": ("export_tables.py", "Export tables to NDJSON or Parquet"),
+    "services": ("service_taxonomy.py", "Build the service dictionary and link clinics to services"),
+    "embed": (os.path.join("vector_search", "hybrid_search.py"), "Build, query or benchmark the clinic search indexes"),
+}
+
+
+def run_script(script: str, argv) -> int:
+    """Run `python script argv...` with this interpreter and return its exit code."""
+    return subprocess.call([sys.executable, os.path.join(SCRIPTS_DIR, script), *argv])
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MediMap data scripts.")
+    subparsers = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+    for name, (script, description) in COMMANDS.items():
+        # The script parses its own options, including --help
+        subparsers.add_parser(name, help=description, add_help=False)
+
+    args, rest = parser.parse_known_args()
+    sys.exit(run_script(COMMANDS[args.command][0], rest))
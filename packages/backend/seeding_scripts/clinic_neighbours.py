@@ -0,0 +1,290 @@
+"""
+Clinic Neighbour Tables
+-----------------------
+
+Precomputes the k nearest clinics of every clinic into `clinic_neighbours`
+(see migrations/add_clinic_neighbours.sql), so the API's "nearby
+alternatives" (`GET /api/clinics/:id/nearby`) is a primary-key read instead
+of a Haversine over every candidate on each request.
+
+    - clinic coordinates are read page by page in `clinic_id` order;
+    - all clinics go into a `GeoIndex` and are queried together with
+      `GeoIndex.nearest_many` (grid blocks ranked with vectorized NumPy);
+    - each row stores the neighbour IDs and distances as parallel arrays,
+      plus the coordinates they were computed from.
+
+Reruns are incremental: the stored coordinates are compared with the
+current ones, and only the rows that can have changed are recomputed:
+clinics that are new or moved, clinics whose list mentions a moved or
+deleted clinic, and clinics whose k-th neighbour is farther away than a
+moved or new clinic's position now is. Rows of deleted clinics are removed.
+A change of k, or `--full`, recomputes everything.
+
+Usage:
+    python clinic_neighbours.py --k 10
+    python clinic_neighbours.py --full --dry-run
+    python clinic_neighbours.py bench --clinics 100000
+"""
+
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from geo_index import GeoIndex
+from seed_supabase import get_supabase_client
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+DEFAULT_K = 10
+CELL_DEG = 0.01  # ~1.1 km; sparse areas are covered by widening the search block
+PAGE_SIZE = 1000
+WRITE_BATCH_SIZE = 500
+DISTANCE_TOLERANCE_KM = 0.001  # stored distances are rounded to the metre
+
+Snapshot = Dict[int, Tuple[float, float]]  # clinic_id → (lat, lng)
+
+
+# ============================================================
+# --- READING ---
+# ============================================================
+
+def iter_pages(supabase, table: str, columns: str, page_size: int = PAGE_SIZE) -> Iterator[List[Dict]]:
+    """Yield every row of `table` in clinic_id order (keyset pagination)."""
+    after_id = 0
+    while True:
+        page = (
+            supabase.table(table)
+            .select(columns)
+            .gt("clinic_id", after_id)
+            .order("clinic_id")
+            .limit(page_size)
+            .execute()
+            .data
+        )
+        if not page:
+            return
+        yield page
+        after_id = page[-1]["clinic_id"]
+
+
+def load_clinic_coordinates(supabase) -> Snapshot:
+    """Current coordinates of every clinic that has them."""
+    coordinates = {}
+    for page in iter_pages(supabase, "clinics", "clinic_id,latitude,longitude"):
+        for row in page:
+            if row.get("latitude") is not None and row.get("longitude") is not None:
+                coordinates[row["clinic_id"]] = (float(row["latitude"]), float(row["longitude"]))
+    return coordinates
+
+
+def load_stored_neighbours(supabase) -> Dict[int, Dict]:
+    """Stored neighbour rows, keyed by clinic_id."""
+    stored = {}
+    for page in iter_pages(supabase, "clinic_neighbours", "clinic_id,latitude,longitude,neighbour_ids,distances_km"):
+        for row in page:
+            stored[row["clinic_id"]] = row
+    return stored
+
+
+# ============================================================
+# --- PLANNING ---
+# ============================================================
+
+def clinics_to_refresh(coordinates: Snapshot, stored: Dict[int, Dict], index: GeoIndex,
+                       ids: np.ndarray, k: int) -> Tuple[List[int], List[int]]:
+    """
+    Work out which rows a rerun has to recompute and which to delete.
+
+    Parameters:
+        coordinates: Current clinic coordinates.
+        stored: Rows currently in clinic_neighbours.
+        index (GeoIndex): Index over the current coordinates (ordinals follow `ids`).
+        ids (np.ndarray): clinic_id of each index ordinal.
+        k (int): Neighbours per clinic.
+
+    Returns:
+        tuple: (clinic_ids to recompute, clinic_ids whose rows are deleted)
+    """
+    deleted = [cid for cid in stored if cid not in coordinates]
+    moved = [cid for cid, position in coordinates.items()
+             if cid not in stored or (stored[cid]["latitude"], stored[cid]["longitude"]) != position]
+    expected = min(k, len(coordinates) - 1)
+    if any(len(row["neighbour_ids"]) != expected for cid, row in stored.items() if cid in coordinates):
+        return list(coordinates), deleted
+
+    refresh = set(moved)
+    changed = set(moved) | set(deleted)
+    if not changed:
+        return [], deleted
+
+    # Lists that mention a moved or deleted clinic
+    for cid, row in stored.items():
+        if cid in coordinates and changed.intersection(row["neighbour_ids"]):
+            refresh.add(cid)
+
+    # Clinics a moved or new clinic now comes closer to than their k-th neighbour
+    # (clinics without a stored row are already in `moved`)
+    kth_km = np.array([stored[cid]["distances_km"][-1] if cid in stored and stored[cid]["distances_km"]
+                       else 0.0 for cid in ids.tolist()])
+    reach_km = float(kth_km.max()) if len(kth_km) else 0.0
+    for cid in moved:
+        lat, lng = coordinates[cid]
+        for ordinal, distance in index.within_radius(lat, lng, reach_km):
+            if distance <= kth_km[ordinal] + DISTANCE_TOLERANCE_KM:
+                refresh.add(int(ids[ordinal]))
+
+    return sorted(refresh), deleted
+
+
+# ============================================================
+# --- COMPUTATION ---
+# ============================================================
+
+def compute_neighbours(index: GeoIndex, ids: np.ndarray, ordinals: np.ndarray,
+                       k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    k nearest clinics of the clinics at `ordinals`, excluding each clinic itself.
+
+    Returns:
+        tuple: (neighbour clinic_ids, distances_km), both (len(ordinals), k);
+        -1 / inf pad rows when there are fewer than k other clinics.
+    """
+    neighbours, distances = index.nearest_many(index.lats[ordinals], index.lngs[ordinals], k=k, exclude=ordinals)
+    neighbour_ids = np.where(neighbours >= 0, ids[np.maximum(neighbours, 0)], -1)
+    return neighbour_ids, distances
+
+
+def neighbour_rows(clinic_ids, coordinates: Snapshot, neighbour_ids: np.ndarray,
+                   distances: np.ndarray) -> List[Dict]:
+    """Table rows for the computed neighbours (padding dropped, distances to the metre)."""
+    computed_at = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for cid, nids, dists in zip(clinic_ids, neighbour_ids.tolist(), distances.tolist()):
+        found = [i for i, nid in enumerate(nids) if nid >= 0]
+        rows.append({
+            "clinic_id": cid,
+            "latitude": coordinates[cid][0],
+            "longitude": coordinates[cid][1],
+            "neighbour_ids": [nids[i] for i in found],
+            "distances_km": [round(dists[i], 3) for i in found],
+            "computed_at": computed_at,
+        })
+    return rows
+
+
+# ============================================================
+# --- WRITING ---
+# ============================================================
+
+def write_neighbour_rows(supabase, rows: List[Dict], deleted: List[int], batch_size: int = WRITE_BATCH_SIZE):
+    """Upsert computed rows and delete the rows of clinics that no longer exist."""
+    for start in range(0, len(rows), batch_size):
+        supabase.table("clinic_neighbours").upsert(rows[start:start + batch_size], on_conflict="clinic_id").execute()
+    for start in range(0, len(deleted), batch_size):
+        supabase.table("clinic_neighbours").delete().in_("clinic_id", deleted[start:start + batch_size]).execute()
+
+
+def refresh_clinic_neighbours(supabase, k: int = DEFAULT_K, full: bool = False, dry_run: bool = False,
+                              cell_deg: float = CELL_DEG) -> dict:
+    """
+    Recompute the neighbour table, incrementally unless `full`.
+
+    Parameters:
+        supabase: Supabase client.
+        k (int): Neighbours stored per clinic.
+        full (bool): Recompute every clinic.
+        dry_run (bool): Compute but do not write.
+        cell_deg (float): Grid cell size of the spatial index.
+
+    Returns:
+        dict: Counts of clinics, recomputed rows and deleted rows.
+    """
+    started = time.perf_counter()
+    coordinates = load_clinic_coordinates(supabase)
+    stored = {} if full else load_stored_neighbours(supabase)
+    print(f"Loaded {len(coordinates)} clinics with coordinates and {len(stored)} stored rows "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    ids = np.fromiter(coordinates.keys(), dtype=np.int64, count=len(coordinates))
+    positions = np.array(list(coordinates.values()), dtype=np.float64).reshape(-1, 2)
+    index = GeoIndex(positions[:, 0], positions[:, 1], ids=ids.tolist(), cell_deg=cell_deg)
+
+    if full:
+        refresh, deleted = list(coordinates), []
+    else:
+        refresh, deleted = clinics_to_refresh(coordinates, stored, index, ids, k)
+
+    ordinal_of = {cid: ordinal for ordinal, cid in enumerate(ids.tolist())}
+    ordinals = np.array([ordinal_of[cid] for cid in refresh], dtype=np.int64)
+    compute_started = time.perf_counter()
+    neighbour_ids, distances = compute_neighbours(index, ids, ordinals, k)
+    print(f"Computed {k} neighbours for {len(refresh)} clinics in {time.perf_counter() - compute_started:.2f}s")
+
+    rows = neighbour_rows(refresh, coordinates, neighbour_ids, distances)
+    if not dry_run:
+        write_neighbour_rows(supabase, rows, deleted)
+
+    print(f"✅ {len(rows)} rows recomputed, {len(deleted)} removed "
+          f"({len(coordinates) - len(rows)} unchanged) in {time.perf_counter() - started:.1f}s"
+          f"{' [dry run]' if dry_run else ''}")
+    return {"clinics": len(coordinates), "recomputed": len(rows), "deleted": len(deleted)}
+
+
+# ============================================================
+# --- BENCHMARK ---
+# ============================================================
+
+def _synthetic_clinics(count: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Kenya-shaped test data: 80% spread over the country, 20% packed around Nairobi."""
+    rng = np.random.default_rng(seed)
+    urban = count // 5
+    lats = np.concatenate([rng.uniform(-4.6, 4.6, count - urban), rng.normal(-1.29, 0.1, urban)])
+    lngs = np.concatenate([rng.uniform(34.0, 41.9, count - urban), rng.normal(36.82, 0.1, urban)])
+    return lats, lngs
+
+
+def run_benchmark(sizes=(15_000, 100_000), k: int = DEFAULT_K, cell_deg: float = CELL_DEG,
+                  check: int = 200):
+    """Time the all-clinics kNN and spot-check it against single-point `nearest()`."""
+    for size in sizes:
+        lats, lngs = _synthetic_clinics(size)
+        started = time.perf_counter()
+        index = GeoIndex(lats, lngs, cell_deg=cell_deg)
+        ordinals = np.arange(size)
+        _, distances = index.nearest_many(lats, lngs, k=k, exclude=ordinals)
+        elapsed = time.perf_counter() - started
+
+        sample = np.random.default_rng(1).choice(size, size=min(check, size), replace=False)
+        mismatches = 0
+        for ordinal in sample.tolist():
+            expected = [d for o, d in index.nearest(lats[ordinal], lngs[ordinal], k + 1) if o != ordinal][:k]
+            mismatches += not np.allclose(distances[ordinal, :len(expected)], expected)
+        print(f"{size:>8} clinics: {elapsed:.2f}s ({size / elapsed:,.0f} clinics/s), "
+              f"{mismatches} of {len(sample)} spot checks differ")
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the clinic_neighbours table.")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="Neighbours stored per clinic")
+    parser.add_argument("--full", action="store_true", help="Recompute every clinic")
+    parser.add_argument("--dry-run", action="store_true", help="Compute without writing to Supabase")
+    parser.add_argument("--cell-deg", type=float, default=CELL_DEG, help="Grid cell size in degrees")
+    subparsers = parser.add_subparsers(dest="command")
+    bench_parser = subparsers.add_parser("bench", help="Time the kNN on synthetic clinics")
+    bench_parser.add_argument("--clinics", type=int, nargs="+", default=[15_000, 100_000])
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        run_benchmark(args.clinics, k=args.k, cell_deg=args.cell_deg)
+    else:
+        refresh_clinic_neighbours(get_supabase_client(), k=args.k, full=args.full, dry_run=args.dry_run,
+                                  cell_deg=args.cell_deg)
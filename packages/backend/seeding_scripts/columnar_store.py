@@ -0,0 +1,491 @@
+"""
+Columnar Facility Store
+-----------------------
+
+Compact, dictionary-encoded columnar format for the KMHFL detail dataset.
+
+`all_kmhfl_facilities_details.json` repeats the same category names,
+service strings, counties and owners thousands of times. This format keeps
+every distinct string once in a shared string pool and stores each field as
+a fixed-width column of pool codes (or of numbers), so the file is opened
+with `mmap` and columns are read as zero-copy `memoryview`s.
+
+    - scalar string fields      -> uint32 pool codes (0 = null)
+    - integer fields            -> int64 values
+    - coordinates / google_location -> two float64 columns (NaN = null)
+    - list fields (contacts, services, infrastructure, human_resources)
+                                -> uint32 offsets + child columns
+
+Round trips are lossless: each row also keeps its key order (a pooled JSON
+key list, so only a handful of distinct shapes are stored), and any value
+that does not fit its column type is kept verbatim in a per-row JSON
+"extra" entry.
+
+File layout:
+    8 bytes   magic (b"KMCOL001")
+    4 bytes   header length (little-endian uint32)
+    N bytes   JSON header: row count, column name -> (typecode, offset, count)
+    ...       8-byte aligned column buffers, offsets relative to file start
+
+Usage:
+    python columnar_store.py export
+    python columnar_store.py import --out roundtrip.json
+    python columnar_store.py bench
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+import tracemalloc
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+from stream_io import dump_json, load_json
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+DETAIL_INPUT_FILE = os.path.join(os.path.dirname(__file__), "all_kmhfl_facilities_details.json")
+COLUMNAR_OUTPUT_FILE = os.path.join(os.path.dirname(__file__), "all_kmhfl_facilities_details.kmcol")
+
+MAGIC = b"KMCOL001"
+ALIGNMENT = 8
+
+# Field names of a detail record, grouped by how they are encoded
+STRING_FIELDS = [
+    "id", "name", "type", "owner", "county", "sub_county", "ward", "keph_level",
+    "status", "admission_status", "location_desc", "date_established",
+    "formatted_address", "google_name", "google_place_id",
+]
+INT_FIELDS = ["code", "catchment_population"]
+STRING_LIST_FIELDS = ["contacts", "infrastructure"]
+STRUCT_LIST_FIELDS = {
+    "services": (("category", "str"), ("service", "str")),
+    "human_resources": (("name", "str"), ("category", "str"), ("count", "int")),
+}
+POINT_FIELDS = ["coordinates", "google_location"]
+KNOWN_FIELDS = set(STRING_FIELDS + INT_FIELDS + STRING_LIST_FIELDS + POINT_FIELDS) | set(STRUCT_LIST_FIELDS)
+
+INT_MIN, INT_MAX = -(2 ** 63), 2 ** 63 - 1
+NULL_INT = INT_MIN  # int64 sentinel for null
+
+if sys.byteorder != "little":
+    raise ImportError("columnar_store requires a little-endian platform")
+
+
+# ============================================================
+# --- ENCODING HELPERS ---
+# ============================================================
+
+class _StringPool:
+    """Interns strings to uint32 codes; code 0 is reserved for None."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = self.codes.get(value)
+        if code is None:
+            self.values.append(value)
+            code = self.codes[value] = len(self.values)
+        return code
+
+
+def _is_str(value) -> bool:
+    return value is None or isinstance(value, str)
+
+
+def _is_int(value) -> bool:
+    return value is None or (
+        isinstance(value, int) and not isinstance(value, bool) and INT_MIN < value <= INT_MAX
+    )
+
+
+def _is_float(value) -> bool:
+    return isinstance(value, float) and not math.isnan(value)
+
+
+def _point(field: str, value):
+    """Return (lat, lng) floats for an encodable point value, None for null, or False."""
+    if value is None:
+        return None
+    if field == "coordinates" and isinstance(value, list) and len(value) == 2 \
+            and all(_is_float(v) for v in value):
+        return value[0], value[1]
+    if field == "google_location" and isinstance(value, dict) and list(value) == ["lat", "lng"] \
+            and _is_float(value["lat"]) and _is_float(value["lng"]):
+        return value["lat"], value["lng"]
+    return False
+
+
+def _struct_items(value, spec) -> bool:
+    """Whether a list of dicts matches a struct-list spec exactly (keys, order, types)."""
+    if not isinstance(value, list):
+        return False
+    keys = [name for name, _ in spec]
+    for item in value:
+        if not isinstance(item, dict) or list(item) != keys:
+            return False
+        for name, kind in spec:
+            if not (_is_str(item[name]) if kind == "str" else _is_int(item[name])):
+                return False
+    return True
+
+
+# ============================================================
+# --- WRITER ---
+# ============================================================
+
+def write_columnar(records: List[dict], file_path: str = COLUMNAR_OUTPUT_FILE) -> int:
+    """
+    Encode detail records into the columnar file at `file_path`.
+
+    Returns:
+        int: Size of the written file in bytes.
+    """
+    pool = _StringPool()
+    columns: Dict[str, array] = {}
+
+    def column(name: str, typecode: str) -> array:
+        if name not in columns:
+            columns[name] = array(typecode)
+        return columns[name]
+
+    for record in records:
+        extra = {}
+
+        column("_keys", "I").append(pool.code(json.dumps(list(record), ensure_ascii=False)))
+
+        for field in STRING_FIELDS:
+            value = record.get(field)
+            if not _is_str(value):
+                extra[field], value = value, None
+            column(field, "I").append(pool.code(value))
+
+        for field in INT_FIELDS:
+            value = record.get(field)
+            if not _is_int(value):
+                extra[field], value = value, None
+            column(field, "q").append(NULL_INT if value is None else value)
+
+        for field in POINT_FIELDS:
+            point = _point(field, record.get(field))
+            if point is False:
+                extra[field], point = record.get(field), None
+            lat, lng = point if point is not None else (math.nan, math.nan)
+            column(f"{field}.lat", "d").append(lat)
+            column(f"{field}.lng", "d").append(lng)
+
+        for field in STRING_LIST_FIELDS:
+            values = record.get(field) or []
+            if not isinstance(record.get(field, []), list) or not all(_is_str(v) for v in values):
+                extra[field], values = record.get(field), []
+            offsets = column(f"{field}.offsets", "I")
+            if not offsets:
+                offsets.append(0)
+            child = column(f"{field}.values", "I")
+            child.extend(pool.code(v) for v in values)
+            offsets.append(len(child))
+
+        for field, spec in STRUCT_LIST_FIELDS.items():
+            items = record.get(field, [])
+            if not _struct_items(items, spec):
+                extra[field], items = items, []
+            offsets = column(f"{field}.offsets", "I")
+            if not offsets:
+                offsets.append(0)
+            for name, kind in spec:
+                child = column(f"{field}.{name}", "I" if kind == "str" else "q")
+                if kind == "str":
+                    child.extend(pool.code(item[name]) for item in items)
+                else:
+                    child.extend(NULL_INT if item[name] is None else item[name] for item in items)
+            offsets.append(offsets[-1] + len(items))
+
+        # Anything that is not one of the known fields travels as JSON
+        for key, value in record.items():
+            if key not in extra and key not in KNOWN_FIELDS:
+                extra[key] = value
+        column("_extra", "I").append(pool.code(json.dumps(extra, ensure_ascii=False)) if extra else 0)
+
+    # The string pool itself is two columns: utf-8 bytes and their end offsets
+    pool_offsets = array("Q", [0])
+    pool_bytes = bytearray()
+    for value in pool.values:
+        pool_bytes += value.encode("utf-8")
+        pool_offsets.append(len(pool_bytes))
+    buffers = {name: (col.typecode, len(col), col.tobytes()) for name, col in columns.items()}
+    buffers["_pool.offsets"] = ("Q", len(pool_offsets), pool_offsets.tobytes())
+    buffers["_pool.data"] = ("B", len(pool_bytes), bytes(pool_bytes))
+
+    # Column offsets depend on the header length, so lay out until it is stable
+    layout: Dict[str, list] = {name: [typecode, 0, count] for name, (typecode, count, _) in buffers.items()}
+    header = b""
+    while True:
+        position = _align(len(MAGIC) + 4 + len(header))
+        for name, (_, _, blob) in buffers.items():
+            layout[name][1] = position
+            position = _align(position + len(blob))
+        encoded = json.dumps({"rows": len(records), "columns": layout}).encode("utf-8")
+        encoded += b" " * (_align(len(encoded)) - len(encoded))
+        if len(encoded) == len(header):
+            header = encoded
+            break
+        header = encoded
+
+    with open(file_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for name, (_, _, blob) in buffers.items():
+            f.write(b"\0" * (layout[name][1] - f.tell()))
+            f.write(blob)
+        return f.tell()
+
+
+def _align(position: int) -> int:
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+
+# ============================================================
+# --- READER ---
+# ============================================================
+
+class FacilityTable:
+    """
+    Memory-mapped, read-only view over a columnar facility file.
+
+    Columns are exposed as zero-copy memoryviews; strings are decoded from
+    the pool on first use and cached by code.
+    """
+
+    def __init__(self, file_path: str = COLUMNAR_OUTPUT_FILE):
+        with open(file_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        if self._view[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{file_path} is not a columnar facility file")
+        (header_len,) = struct.unpack_from("<I", self._mmap, len(MAGIC))
+        header = json.loads(bytes(self._view[len(MAGIC) + 4:len(MAGIC) + 4 + header_len]))
+
+        self.rows: int = header["rows"]
+        self._layout: Dict[str, list] = header["columns"]
+        self._columns: Dict[str, memoryview] = {}
+
+        self._pool_offsets = self.column("_pool.offsets")
+        self._pool_data = self.column("_pool.data")
+        self._strings: List[Optional[str]] = [None] * len(self._pool_offsets)
+        self._decoded = bytearray(len(self._pool_offsets))
+        self._decoded[0] = 1  # code 0 is None
+        self._json: Dict[int, object] = {}  # parsed `_keys` / `_extra` entries by code
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __enter__(self) -> "FacilityTable":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the column views and unmap the file."""
+        for view in self._columns.values():
+            view.release()
+        self._columns.clear()
+        self._view.release()
+        self._mmap.close()
+
+    # ------------- COLUMN ACCESS -------------
+
+    def column(self, name: str) -> memoryview:
+        """Zero-copy typed view of a raw column (codes, numbers or offsets)."""
+        view = self._columns.get(name)
+        if view is None:
+            typecode, offset, count = self._layout[name]
+            size = array(typecode).itemsize * count
+            view = self._view[offset:offset + size].cast(typecode)
+            self._columns[name] = view
+        return view
+
+    def string(self, code: int) -> Optional[str]:
+        """Decode one string pool code (0 -> None)."""
+        if not self._decoded[code]:
+            start, end = self._pool_offsets[code - 1], self._pool_offsets[code]
+            self._strings[code] = str(self._pool_data[start:end], "utf-8")
+            self._decoded[code] = 1
+        return self._strings[code]
+
+    def values(self, field: str) -> List:
+        """Decoded values of a scalar string or integer field for every row."""
+        if field in STRING_FIELDS:
+            return [self.string(code) for code in self.column(field)]
+        if field in INT_FIELDS:
+            return [None if v == NULL_INT else v for v in self.column(field)]
+        raise KeyError(f"'{field}' is not a scalar column")
+
+    # ------------- ROW ACCESS -------------
+
+    def row(self, i: int) -> dict:
+        """Reassemble row `i` into the scraper's original dict."""
+        keys = self._parsed(self.column("_keys")[i])
+        extra = self._parsed(self.column("_extra")[i]) or {}
+
+        record = {}
+        for key in keys:
+            record[key] = extra[key] if key in extra else self._field(key, i)
+        return record
+
+    def _parsed(self, code: int):
+        if code not in self._json:
+            self._json[code] = json.loads(self.string(code)) if code else None
+        return self._json[code]
+
+    def _field(self, field: str, i: int):
+        if field in STRING_FIELDS:
+            return self.string(self.column(field)[i])
+
+        if field in INT_FIELDS:
+            value = self.column(field)[i]
+            return None if value == NULL_INT else value
+
+        if field in POINT_FIELDS:
+            lat, lng = self.column(f"{field}.lat")[i], self.column(f"{field}.lng")[i]
+            if math.isnan(lat):
+                return None
+            return [lat, lng] if field == "coordinates" else {"lat": lat, "lng": lng}
+
+        offsets = self.column(f"{field}.offsets")
+        start, end = offsets[i], offsets[i + 1]
+
+        if field in STRING_LIST_FIELDS:
+            child = self.column(f"{field}.values")
+            return [self.string(child[j]) for j in range(start, end)]
+
+        spec = STRUCT_LIST_FIELDS[field]
+        children = [(name, kind, self.column(f"{field}.{name}")) for name, kind in spec]
+        items = []
+        for j in range(start, end):
+            item = {}
+            for name, kind, child in children:
+                if kind == "str":
+                    item[name] = self.string(child[j])
+                else:
+                    item[name] = None if child[j] == NULL_INT else child[j]
+            items.append(item)
+        return items
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(self.rows):
+            yield self.row(i)
+
+    def to_records(self) -> List[dict]:
+        """Decode every row back into the original list of dicts."""
+        return list(self)
+
+
+def read_columnar(file_path: str = COLUMNAR_OUTPUT_FILE) -> List[dict]:
+    """Load a columnar file back into the scraper's JSON record format."""
+    with FacilityTable(file_path) as table:
+        return table.to_records()
+
+
+# ============================================================
+# --- BENCHMARK ---
+# ============================================================
+
+def run_benchmark(records: List[dict], size: int = 20_000):
+    """
+    Compare the pretty-printed JSON dump with the columnar file on a dataset
+    scaled up to `size` records: file size, load time and traced memory.
+    """
+    scaled = []
+    for i in range(size):
+        record = dict(records[i % len(records)])
+        record["id"] = f"{record.get('id')}-{i}"
+        record["name"] = f"{record.get('name')} #{i}"
+        scaled.append(record)
+
+    json_file = COLUMNAR_OUTPUT_FILE + ".bench.json"
+    col_file = COLUMNAR_OUTPUT_FILE + ".bench"
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(scaled, f, ensure_ascii=False, indent=4)
+    write_columnar(scaled, col_file)
+
+    def measure(load):
+        # Time and memory are taken in separate runs; tracing slows Python code down
+        start = time.perf_counter()
+        result = load()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        tracemalloc.start()
+        load()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result, elapsed_ms, peak
+
+    def load_json():
+        with open(json_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def county_column():
+        with FacilityTable(col_file) as table:
+            return table.values("county")
+
+    _, json_ms, json_peak = measure(load_json)
+    _, column_ms, column_peak = measure(county_column)
+    restored, records_ms, records_peak = measure(lambda: read_columnar(col_file))
+    assert restored == scaled, "columnar round trip is not lossless"
+
+    print(f"--- {size:,} facilities ---")
+    print(f"  {'':30} {'size KB':>10} {'load ms':>10} {'peak KB':>10}")
+    print(f"  {'JSON (indent=4), json.load':30} {os.path.getsize(json_file) / 1024:10.1f} "
+          f"{json_ms:10.2f} {json_peak / 1024:10.1f}")
+    print(f"  {'columnar, open + county column':30} {os.path.getsize(col_file) / 1024:10.1f} "
+          f"{column_ms:10.2f} {column_peak / 1024:10.1f}")
+    print(f"  {'columnar, all rows as dicts':30} {'':10} {records_ms:10.2f} {records_peak / 1024:10.1f}")
+
+    os.remove(json_file)
+    os.remove(col_file)
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the KMHFL detail dump to and from the columnar format.")
+    parser.add_argument("--file", default=DETAIL_INPUT_FILE, help="Scraper detail output file")
+    parser.add_argument("--columnar", default=COLUMNAR_OUTPUT_FILE, help="Columnar file path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("export", help="Write the detail dump as a columnar file")
+    import_parser = subparsers.add_parser("import", help="Write a columnar file back as JSON")
+    import_parser.add_argument("--out", required=True, help="JSON output path")
+    bench_parser = subparsers.add_parser("bench", help="Compare JSON and columnar load cost")
+    bench_parser.add_argument("--size", type=int, default=20_000, help="Scaled dataset size")
+
+    args = parser.parse_args()
+
+    if args.command == "import":
+        facilities = read_columnar(args.columnar)
+        dump_json(facilities, args.out)
+        print(f"✅ Wrote {len(facilities)} facilities to {args.out}")
+    else:
+        facilities = load_json(args.file)
+
+        if args.command == "export":
+            size = write_columnar(facilities, args.columnar)
+            print(f"✅ Wrote {len(facilities)} facilities to {args.columnar} ({size} bytes)")
+        else:
+            run_benchmark(facilities, size=args.size)
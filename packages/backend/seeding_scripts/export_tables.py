@@ -0,0 +1,364 @@
+"""
+Table Export
+------------
+
+Snapshots Supabase tables to NDJSON or Parquet files for analytics and
+offline benchmarks, instead of one unbounded `select("*")` that is capped
+at the server's row limit and held in memory at once.
+
+    - the primary key range [min, max] of a table is cut into contiguous
+      key ranges (several per worker, so uneven ranges balance out);
+    - worker threads read the ranges concurrently, each with keyset
+      pagination (`key > last_key AND key <= range_end ORDER BY key
+      LIMIT page_size`), so every page is an index range scan;
+    - each range streams into its own part file (one page in memory, plus
+      one row group per worker for Parquet); parts are then concatenated
+      in key order into the output file, which is sorted by primary key.
+
+NDJSON files ending in .gz / .zst are compressed (see `stream_io.py`).
+Parquet needs pyarrow (`pip install pyarrow`); column types come from the
+table definitions (`pg_copy.LOCAL_SCHEMA` and `../migrations/*.sql`), and
+columns without a known type are written as text (arrays and objects as
+JSON).
+
+Ranges are read at slightly different moments, so rows written during an
+export may or may not appear; stop writers for an exact snapshot.
+
+Usage:
+    python export_tables.py                                   # users, clinics, appointments, reviews
+    python export_tables.py clinics reviews --format parquet --workers 8
+    python export_tables.py users --compress gz --output-dir /tmp/exports
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import stream_io
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+# Exportable tables and their integer primary keys
+EXPORT_TABLES = {
+    "users": "user_id",
+    "clinics": "clinic_id",
+    "appointments": "appointment_id",
+    "reviews": "review_id",
+    "clinic_neighbours": "clinic_id",
+}
+DEFAULT_TABLES = ("users", "clinics", "appointments", "reviews")
+
+FORMATS = ("ndjson", "parquet")
+EXPORT_DIR = os.path.join(os.path.dirname(__file__), "exports")
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "migrations")
+
+PAGE_SIZE = 1000  # PostgREST's default max rows per request
+DEFAULT_WORKERS = 4
+RANGES_PER_WORKER = 4
+ROW_GROUP_ROWS = 50_000  # Parquet rows buffered per worker before a row group is written
+
+TABLE_PATTERN = re.compile(r"CREATE TABLE IF NOT EXISTS public\.(\w+)\s*\((.*?)\n\);", re.S)
+COLUMN_PATTERN = re.compile(r"^\s*(\w+)\s+([a-z][a-z ]*?(?:\[\])?)(?=\s+[A-Z]|,|\s*$)", re.M)
+ADD_COLUMN_PATTERN = re.compile(r"ALTER TABLE public\.(\w+) ADD COLUMN IF NOT EXISTS (\w+) ([a-z][a-z ]*?(?:\[\])?)(?=\s+[A-Z]|;)")
+
+
+@dataclass
+class ExportStats:
+    table: str
+    path: str
+    rows: int = 0
+    pages: int = 0
+    ranges: int = 0
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        rate = self.rows / self.seconds if self.seconds else 0.0
+        size = os.path.getsize(self.path) / 1e6 if os.path.exists(self.path) else 0.0
+        return (f"{self.table:<18} rows={self.rows:<9} pages={self.pages:<6} ranges={self.ranges:<3} "
+                f"{self.seconds:7.2f}s {rate:10.1f} rows/s  {size:8.2f} MB  {self.path}")
+
+
+# ============================================================
+# --- COLUMN TYPES ---
+# ============================================================
+
+def column_types(table: str) -> Dict[str, str]:
+    """Postgres type of each column of `table` from the known table definitions (column → type)."""
+    from pg_copy import LOCAL_SCHEMA
+
+    sources = [LOCAL_SCHEMA]
+    for path in sorted(glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql"))):
+        with open(path, encoding="utf-8") as f:
+            sources.append(f.read())
+
+    types: Dict[str, str] = {}
+    for source in sources:
+        for name, body in TABLE_PATTERN.findall(source):
+            if name == table:
+                types.update(COLUMN_PATTERN.findall(body))
+        for name, column, column_type in ADD_COLUMN_PATTERN.findall(source):
+            if name == table:
+                types[column] = column_type
+    return types
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def _arrow_type(pa, postgres_type: Optional[str]):
+    if postgres_type and postgres_type.endswith("[]"):
+        return pa.list_(_arrow_type(pa, postgres_type[:-2]))
+    return {
+        "bigint": pa.int64(), "integer": pa.int64(), "smallint": pa.int64(),
+        "double precision": pa.float64(), "real": pa.float64(), "numeric": pa.float64(),
+        "boolean": pa.bool_(),
+    }.get(postgres_type, pa.string())
+
+
+def _as_text(value):
+    return value if value is None or isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+# ============================================================
+# --- READING ---
+# ============================================================
+
+def key_bounds(supabase, table: str, key: str) -> Optional[Tuple[int, int]]:
+    """(min, max) primary key of `table`, or None when it is empty."""
+    def edge(desc: bool):
+        rows = supabase.table(table).select(key).order(key, desc=desc).limit(1).execute().data
+        return rows[0][key] if rows else None
+
+    low = edge(False)
+    return None if low is None else (low, edge(True))
+
+
+def split_key_range(low: int, high: int, parts: int) -> List[Tuple[int, int]]:
+    """Cut [low, high] into up to `parts` contiguous (after, upto] ranges of near-equal width."""
+    span = high - low + 1
+    parts = max(1, min(parts, span))
+    bounds = [low - 1 + span * i // parts for i in range(parts + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def iter_range_pages(supabase, table: str, key: str, after: int, upto: int,
+                     page_size: int = PAGE_SIZE) -> Iterator[List[Dict]]:
+    """Yield the rows with after < key <= upto, page by page in key order (keyset pagination)."""
+    while True:
+        page = (
+            supabase.table(table)
+            .select("*")
+            .gt(key, after)
+            .lte(key, upto)
+            .order(key)
+            .limit(page_size)
+            .execute()
+            .data
+        )
+        if not page:
+            return
+        yield page
+        # Keep going until an empty page: the server may cap pages below page_size
+        after = page[-1][key]
+
+
+# ============================================================
+# --- WRITING ---
+# ============================================================
+
+class _NdjsonPart:
+    def __init__(self, path: str, table: str):
+        self.path = path
+        self._file = stream_io.open_text(path, "w")
+
+    def write(self, rows: List[Dict]):
+        self._file.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetPart:
+    def __init__(self, path: str, table: str):
+        self.path = path
+        self._pa = _pyarrow()
+        self._types = column_types(table)
+        self._schema = None
+        self._writer = None
+        self._buffer: List[Dict] = []
+
+    def write(self, rows: List[Dict]):
+        self._buffer += rows
+        if len(self._buffer) >= ROW_GROUP_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        pa = self._pa
+        if self._schema is None:
+            self._schema = pa.schema([(c, _arrow_type(pa, self._types.get(c))) for c in self._buffer[0]])
+            self._writer = pa.parquet.ParquetWriter(self.path, self._schema)
+        columns = {}
+        for field in self._schema:
+            values = [row.get(field.name) for row in self._buffer]
+            columns[field.name] = [_as_text(v) for v in values] if pa.types.is_string(field.type) else values
+        self._writer.write_table(pa.Table.from_pydict(columns, schema=self._schema))
+        self._buffer = []
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+PART_WRITERS = {"ndjson": _NdjsonPart, "parquet": _ParquetPart}
+
+
+def _part_path(output: str, index: int) -> str:
+    """Part file name, keeping a compression suffix last so the part is compressed too."""
+    compression = stream_io.compression_of(output)
+    root, suffix = (output[:-len(compression) - 1], "." + compression) if compression else (output, "")
+    return f"{root}.part{index:04d}{suffix}"
+
+
+def _merge_parts(parts: List[str], output: str, fmt: str, table: str):
+    """Concatenate part files in order into `output` (gzip members / zstd frames concatenate too)."""
+    existing = [p for p in parts if os.path.exists(p)]
+    if fmt == "ndjson":
+        with open(output, "wb") as out:
+            for part in existing:
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out)
+    else:
+        pa = _pyarrow()
+        writer = None
+        try:
+            for part in existing:
+                parquet_file = pa.parquet.ParquetFile(part)
+                if writer is None:
+                    writer = pa.parquet.ParquetWriter(output, parquet_file.schema_arrow)
+                for group in range(parquet_file.num_row_groups):
+                    writer.write_table(parquet_file.read_row_group(group))
+            if writer is None:  # empty table: schema of the known columns only
+                types = column_types(table)
+                schema = pa.schema([(c, _arrow_type(pa, t)) for c, t in types.items()])
+                writer = pa.parquet.ParquetWriter(output, schema)
+        finally:
+            if writer is not None:
+                writer.close()
+    for part in existing:
+        os.remove(part)
+
+
+# ============================================================
+# --- EXPORT ---
+# ============================================================
+
+def export_table(supabase, table: str, output: str, fmt: str = "ndjson", workers: int = DEFAULT_WORKERS,
+                 page_size: int = PAGE_SIZE, key: Optional[str] = None) -> ExportStats:
+    """
+    Export every row of `table` to `output`, sorted by primary key.
+
+    Parameters:
+        supabase: Supabase client (shared by the workers).
+        table (str): Table name.
+        output (str): Output file (.ndjson[.gz|.zst] or .parquet).
+        fmt (str): "ndjson" or "parquet".
+        workers (int): Concurrent key-range readers.
+        page_size (int): Rows per request (at most the server's row limit).
+        key (str): Integer primary key (default: from EXPORT_TABLES).
+
+    Returns:
+        ExportStats: Row, page and range counts and the elapsed time.
+    """
+    if fmt not in PART_WRITERS:
+        raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    key = key or EXPORT_TABLES.get(table)
+    if key is None:
+        raise ValueError(f"No primary key known for table '{table}'")
+    if fmt == "parquet":
+        _pyarrow()
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    stats = ExportStats(table, output)
+    start = time.perf_counter()
+
+    bounds = key_bounds(supabase, table, key)
+    ranges = split_key_range(*bounds, workers * RANGES_PER_WORKER) if bounds else []
+    stats.ranges = len(ranges)
+    parts = [_part_path(output, i) for i in range(len(ranges))]
+
+    def export_range(index: int) -> Tuple[int, int]:
+        after, upto = ranges[index]
+        writer, rows, pages = None, 0, 0
+        try:
+            for page in iter_range_pages(supabase, table, key, after, upto, page_size):
+                writer = writer or PART_WRITERS[fmt](parts[index], table)
+                writer.write(page)
+                rows += len(page)
+                pages += 1
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows, pages
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=f"export-{table}") as pool:
+            for rows, pages in pool.map(export_range, range(len(ranges))):
+                stats.rows += rows
+                stats.pages += pages
+        _merge_parts(parts, output, fmt, table)
+    except BaseException:
+        for part in parts:
+            if os.path.exists(part):
+                os.remove(part)
+        raise
+
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def output_path(table: str, fmt: str, directory: str = EXPORT_DIR, compress: Optional[str] = None) -> str:
+    extension = "parquet" if fmt == "parquet" else "ndjson" + (f".{compress}" if compress else "")
+    return os.path.join(directory, f"{table}.{extension}")
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export Supabase tables to NDJSON or Parquet.")
+    parser.add_argument("tables", nargs="*", default=list(DEFAULT_TABLES),
+                        help=f"Tables to export (default: {' '.join(DEFAULT_TABLES)})")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson", help="Output format")
+    parser.add_argument("--compress", choices=["gz", "zst"], help="Compress NDJSON output")
+    parser.add_argument("--output-dir", default=EXPORT_DIR, help="Directory for the exported files")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent key-range readers")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="Rows per request")
+    args = parser.parse_args()
+
+    from seed_supabase import get_supabase_client
+
+    client = get_supabase_client()
+    print("--- Export summary ---")
+    for name in args.tables:
+        result = export_table(client, name, output_path(name, args.format, args.output_dir, args.compress),
+                              args.format, args.workers, args.page_size)
+        print(result.summary())
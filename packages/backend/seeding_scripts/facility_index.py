@@ -0,0 +1,380 @@
+"""
+Facility Search Index
+---------------------
+
+Inverted index over the scraped KMHFL facility details.
+
+Every (field, term) pair - e.g. ("county", "Kiambu") or
+("service", "Psychiatric clinic") - maps to a posting list stored as a
+bitmap keyed by facility ordinal (the record's position in the detail
+dump). Python integers are arbitrary-precision bitsets, so AND/OR filters
+are single C-level `&` / `|` operations over ~2 KB per 15k facilities.
+
+The index is saved to a single file that is memory-mapped on load: only the
+small JSON header is parsed up front, and each posting list is decoded the
+first time it is used.
+
+File layout:
+    8 bytes   magic (b"KMFIDX01")
+    4 bytes   header length (little-endian uint32)
+    N bytes   JSON header: ordinal -> id, field -> term -> (offset, length)
+    ...       posting bitmaps (little-endian), offsets relative to this point
+
+Usage:
+    python facility_index.py build
+    python facility_index.py query --county Kiambu --service "Psychiatric clinic" --keph-min 4
+    python facility_index.py bench
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from stream_io import load_json
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+DETAIL_INPUT_FILE = os.path.join(os.path.dirname(__file__), "all_kmhfl_facilities_details.json")
+INDEX_OUTPUT_FILE = os.path.join(os.path.dirname(__file__), "all_kmhfl_facilities.idx")
+
+MAGIC = b"KMFIDX01"
+
+# Single-valued fields of a detail record: index field -> record key
+SCALAR_FIELDS = {
+    "county": "county",
+    "sub_county": "sub_county",
+    "ward": "ward",
+    "type": "type",
+    "owner": "owner",
+    "keph_level": "keph_level",
+    "status": "status",
+    "admission_status": "admission_status",
+}
+
+# Multi-valued fields: index field -> function returning the record's terms
+LIST_FIELDS = {
+    "service": lambda r: [s.get("service") for s in r.get("services") or []],
+    "category": lambda r: [s.get("category") for s in r.get("services") or []],
+    "infrastructure": lambda r: r.get("infrastructure") or [],
+}
+
+KEPH_LEVEL_PATTERN = re.compile(r"(\d+)")
+
+
+def keph_level_number(level: Optional[str]) -> Optional[int]:
+    """Extract the numeric part of a KEPH level name, e.g. "Level 4" -> 4."""
+    match = KEPH_LEVEL_PATTERN.search(level or "")
+    return int(match.group(1)) if match else None
+
+
+def _normalize(term: str) -> str:
+    return " ".join(term.split()).casefold()
+
+
+def _bitmap_from_ordinals(ordinals: Iterable[int], size: int) -> int:
+    """Pack ordinals into an integer bitmap through a byte buffer."""
+    buffer = bytearray(size)
+    for ordinal in ordinals:
+        buffer[ordinal >> 3] |= 1 << (ordinal & 7)
+    return int.from_bytes(buffer, "little")
+
+
+# ============================================================
+# --- INDEX ---
+# ============================================================
+
+class FacilityIndex:
+    """
+    Bitmap posting lists for each (field, term) pair of the detail dump.
+
+    Build one with `FacilityIndex.build(records)` or load a saved file with
+    `FacilityIndex.load(path)`; both expose the same query methods.
+    """
+
+    def __init__(self, ids: List, terms: Dict[str, Dict[str, object]], buffer=None):
+        self.ids = ids
+        self.count = len(ids)
+        self.all = (1 << self.count) - 1
+        # field -> term -> bitmap (int) or (offset, length) into `buffer`
+        self._terms = terms
+        self._buffer = buffer
+        self._lookup = {
+            field: {_normalize(term): term for term in field_terms}
+            for field, field_terms in terms.items()
+        }
+
+    # ------------- BUILD & PERSIST -------------
+
+    @classmethod
+    def build(cls, records: Iterable[dict]) -> "FacilityIndex":
+        """
+        Build posting lists from scraped detail records (ordinal = position).
+        """
+        ids = []
+        postings: Dict[str, Dict[str, List[int]]] = {field: {} for field in (*SCALAR_FIELDS, *LIST_FIELDS)}
+
+        for ordinal, record in enumerate(records):
+            ids.append(record.get("id"))
+
+            for field, key in SCALAR_FIELDS.items():
+                value = record.get(key)
+                if value:
+                    postings[field].setdefault(value, []).append(ordinal)
+
+            for field, extract in LIST_FIELDS.items():
+                for value in set(extract(record)):
+                    if value:
+                        postings[field].setdefault(value, []).append(ordinal)
+
+        size = (len(ids) + 7) // 8
+        terms = {
+            field: {term: _bitmap_from_ordinals(ordinals, size) for term, ordinals in field_postings.items()}
+            for field, field_postings in postings.items()
+        }
+        return cls(ids, terms)
+
+    def save(self, file_path: str = INDEX_OUTPUT_FILE) -> int:
+        """
+        Write the index to `file_path`.
+
+        Returns:
+            int: Size of the written file in bytes.
+        """
+        blobs = []
+        offset = 0
+        layout: Dict[str, Dict[str, List[int]]] = {}
+        for field, field_terms in self._terms.items():
+            layout[field] = {}
+            for term in sorted(field_terms):
+                blob = self.bitmap(field, term).to_bytes((self.count + 7) // 8, "little")
+                layout[field][term] = [offset, len(blob)]
+                blobs.append(blob)
+                offset += len(blob)
+
+        header = json.dumps({"ids": self.ids, "terms": layout}, ensure_ascii=False).encode("utf-8")
+        with open(file_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for blob in blobs:
+                f.write(blob)
+        return len(MAGIC) + 4 + len(header) + offset
+
+    @classmethod
+    def load(cls, file_path: str = INDEX_OUTPUT_FILE) -> "FacilityIndex":
+        """
+        Memory-map a saved index; posting lists are decoded lazily.
+        """
+        with open(file_path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{file_path} is not a facility index file")
+        (header_len,) = struct.unpack_from("<I", buffer, len(MAGIC))
+        data_start = len(MAGIC) + 4 + header_len
+        header = json.loads(buffer[len(MAGIC) + 4:data_start].decode("utf-8"))
+
+        terms = {
+            field: {term: (data_start + offset, length) for term, (offset, length) in field_terms.items()}
+            for field, field_terms in header["terms"].items()
+        }
+        return cls(header["ids"], terms, buffer=buffer)
+
+    # ------------- POSTING LISTS -------------
+
+    def bitmap(self, field: str, term: str) -> int:
+        """
+        Posting list of one term (case and whitespace insensitive); 0 if unknown.
+        """
+        field_terms = self._terms.get(field)
+        if field_terms is None:
+            raise KeyError(f"Unknown index field '{field}'")
+
+        stored = field_terms.get(term)
+        if stored is None:
+            term = self._lookup[field].get(_normalize(term))
+            if term is None:
+                return 0
+            stored = field_terms[term]
+
+        if isinstance(stored, tuple):
+            start, length = stored
+            stored = int.from_bytes(self._buffer[start:start + length], "little")
+            field_terms[term] = stored
+        return stored
+
+    def any_of(self, field: str, terms: Iterable[str]) -> int:
+        """OR of the posting lists of `terms` within one field."""
+        result = 0
+        for term in terms:
+            result |= self.bitmap(field, term)
+        return result
+
+    def all_of(self, field: str, terms: Iterable[str]) -> int:
+        """AND of the posting lists of `terms` within one field."""
+        result = self.all
+        for term in terms:
+            result &= self.bitmap(field, term)
+        return result
+
+    def keph_at_least(self, level: int) -> int:
+        """Facilities whose KEPH level number is `level` or higher."""
+        return self.any_of(
+            "keph_level",
+            [t for t in self.terms("keph_level") if (keph_level_number(t) or 0) >= level],
+        )
+
+    def terms(self, field: str) -> List[str]:
+        """All indexed terms of a field."""
+        return list(self._terms[field])
+
+    def select(self, keph_min: Optional[int] = None, **filters) -> int:
+        """
+        AND together per-field filters.
+
+        Each keyword is an index field; a string value matches that term, a
+        list matches any of its terms (OR). `keph_min` keeps facilities at
+        that KEPH level or above.
+
+        Example:
+            index.select(county="Kiambu", service=["Psychiatric clinic"], keph_min=4)
+        """
+        result = self.all
+        for field, value in filters.items():
+            if value is None:
+                continue
+            result &= self.bitmap(field, value) if isinstance(value, str) else self.any_of(field, value)
+        if keph_min is not None:
+            result &= self.keph_at_least(keph_min)
+        return result
+
+    # ------------- RESULTS -------------
+
+    @staticmethod
+    def ordinals(bitmap: int) -> Iterator[int]:
+        """Yield the ordinals set in a bitmap in ascending order."""
+        data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+        for byte_index, byte in enumerate(data):
+            while byte:
+                low = byte & -byte
+                yield byte_index * 8 + low.bit_length() - 1
+                byte ^= low
+
+    def facility_ids(self, bitmap: int) -> List:
+        """Facility IDs for the ordinals set in a bitmap."""
+        return [self.ids[ordinal] for ordinal in self.ordinals(bitmap)]
+
+    def close(self):
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+
+
+# ============================================================
+# --- BENCHMARK ---
+# ============================================================
+
+def _scan(records: List[dict], county: str, service: str, keph_min: int) -> List[int]:
+    """Baseline: filter every record in Python."""
+    return [
+        ordinal for ordinal, r in enumerate(records)
+        if r.get("county") == county
+        and (keph_level_number(r.get("keph_level")) or 0) >= keph_min
+        and any(s.get("service") == service for s in r.get("services") or [])
+    ]
+
+
+def run_benchmark(records: List[dict], size: int = 20_000, queries: int = 200):
+    """
+    Compare a full scan with the mmap-loaded index on a dataset scaled up to `size`.
+
+    Sample records are cycled with their county and KEPH level varied so the
+    posting lists have realistic selectivity.
+    """
+    counties = ["Kiambu", "Nairobi", "Mombasa", "Kisumu", "Nakuru", "Machakos", "Kirinyaga", "West Pokot"]
+    scaled = []
+    for i in range(size):
+        record = dict(records[i % len(records)])
+        record["id"] = f"{record.get('id')}-{i}"
+        record["county"] = counties[i % len(counties)]
+        record["keph_level"] = f"Level {2 + i % 5}"
+        scaled.append(record)
+
+    start = time.perf_counter()
+    index = FacilityIndex.build(scaled)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    bench_file = INDEX_OUTPUT_FILE + ".bench"
+    file_size = index.save(bench_file)
+    start = time.perf_counter()
+    loaded = FacilityIndex.load(bench_file)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    service = "Psychiatric clinic"
+    start = time.perf_counter()
+    for _ in range(queries):
+        expected = _scan(scaled, "Kiambu", service, 4)
+    scan_ms = (time.perf_counter() - start) / queries * 1000
+
+    start = time.perf_counter()
+    for _ in range(queries):
+        hits = list(loaded.ordinals(loaded.select(county="Kiambu", service=service, keph_min=4)))
+    index_ms = (time.perf_counter() - start) / queries * 1000
+
+    assert hits == expected, "index and scan disagree"
+    loaded.close()
+    os.remove(bench_file)
+
+    print(f"--- {size:,} facilities, {len(hits)} matches ---")
+    print(f"  build:      {build_ms:10.2f} ms")
+    print(f"  file size:  {file_size / 1024:10.1f} KB")
+    print(f"  mmap load:  {load_ms:10.2f} ms")
+    print(f"  scan:       {scan_ms:10.3f} ms/query")
+    print(f"  index:      {index_ms:10.3f} ms/query")
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the facility search index.")
+    parser.add_argument("--file", default=DETAIL_INPUT_FILE, help="Scraper detail output file")
+    parser.add_argument("--index", default=INDEX_OUTPUT_FILE, help="Index file path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("build", help="Build the index file from the detail dump")
+
+    query_parser = subparsers.add_parser("query", help="Query a saved index")
+    for field in (*SCALAR_FIELDS, *LIST_FIELDS):
+        query_parser.add_argument(f"--{field.replace('_', '-')}", dest=field, action="append",
+                                  help=f"Match {field} (repeat to OR several values)")
+    query_parser.add_argument("--keph-min", type=int, help="Minimum KEPH level number")
+
+    bench_parser = subparsers.add_parser("bench", help="Compare a full scan with the index")
+    bench_parser.add_argument("--size", type=int, default=20_000, help="Scaled dataset size")
+
+    args = parser.parse_args()
+
+    if args.command == "query":
+        index = FacilityIndex.load(args.index)
+        filters = {field: getattr(args, field) for field in (*SCALAR_FIELDS, *LIST_FIELDS)}
+        matches = index.facility_ids(index.select(keph_min=args.keph_min, **filters))
+        print(f"{len(matches)} matching facilities")
+        for facility_id in matches:
+            print(facility_id)
+    else:
+        facilities = load_json(args.file)
+
+        if args.command == "build":
+            size = FacilityIndex.build(facilities).save(args.index)
+            print(f"✅ Indexed {len(facilities)} facilities into {args.index} ({size} bytes)")
+        else:
+            run_benchmark(facilities, size=args.size)
@@ -0,0 +1,302 @@
+"""
+Facility Record Model
+---------------------
+
+Typed, memory-lean representation of the records produced by
+`extract_facility_details` in `webscrapping.py`.
+
+A parsed facility is a dict holding nested per-service and per-staff dicts,
+and the same category names ("MENTAL HEALTH SERVICES"), counties and owners
+are repeated as separate string objects in every record. Here:
+
+    - Facility, Service and HumanResource are `__slots__` dataclasses;
+    - repeated strings go through `sys.intern`, so each distinct value
+      exists once;
+    - identical Service / HumanResource entries are shared between
+      facilities, and lists are stored as tuples.
+
+`Facility.from_dict(d).to_dict() == d` for every scraper record, including
+the optional Google fields and any keys this model does not know about.
+
+Usage:
+    python facility_records.py bench
+"""
+
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from stream_io import iter_json_array, load_json
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+DETAIL_INPUT_FILE = os.path.join(os.path.dirname(__file__), "all_kmhfl_facilities_details.json")
+
+# Marks optional keys (the Google enrichment) that a record did not have
+MISSING: Any = type("Missing", (), {"__repr__": lambda self: "MISSING", "__slots__": ()})()
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# ============================================================
+# --- RECORD TYPES ---
+# ============================================================
+
+@dataclass(frozen=True, slots=True)
+class Service:
+    """One entry of a facility's `services` list."""
+    category: Optional[str]
+    service: Optional[str]
+
+    def to_dict(self) -> dict:
+        return {"category": self.category, "service": self.service}
+
+
+@dataclass(frozen=True, slots=True)
+class HumanResource:
+    """One entry of a facility's `human_resources` list."""
+    name: Optional[str]
+    category: Optional[str]
+    count: Optional[int]
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "category": self.category, "count": self.count}
+
+
+# Shared instances: identical services / staff entries are stored once
+_services: Dict[Tuple, Service] = {}
+_human_resources: Dict[Tuple, HumanResource] = {}
+
+
+def _service(entry: dict) -> Service:
+    key = (entry["category"], entry["service"])
+    shared = _services.get(key)
+    if shared is None:
+        shared = _services[key] = Service(_intern(key[0]), _intern(key[1]))
+    return shared
+
+
+def _human_resource(entry: dict) -> HumanResource:
+    key = (entry["name"], entry["category"], entry["count"])
+    shared = _human_resources.get(key)
+    if shared is None:
+        shared = _human_resources[key] = HumanResource(_intern(key[0]), _intern(key[1]), key[2])
+    return shared
+
+
+@dataclass(slots=True)
+class Facility:
+    """
+    One facility from the KMHFL detail dump.
+
+    Field order follows `extract_facility_details`; the Google fields hold
+    MISSING when the record was not enriched.
+    """
+    id: Optional[str]
+    name: Optional[str]
+    code: Optional[int]
+    type: Optional[str]
+    owner: Optional[str]
+    county: Optional[str]
+    sub_county: Optional[str]
+    ward: Optional[str]
+    keph_level: Optional[str]
+    status: Optional[str]
+    admission_status: Optional[str]
+    contacts: Tuple[str, ...]
+    services: Tuple[Service, ...]
+    infrastructure: Tuple[str, ...]
+    human_resources: Tuple[HumanResource, ...]
+    coordinates: Optional[Tuple[float, float]]
+    location_desc: Optional[str]
+    catchment_population: Optional[int]
+    date_established: Optional[str]
+    formatted_address: Optional[str] = MISSING
+    google_name: Optional[str] = MISSING
+    google_location: Optional[Tuple[float, float]] = MISSING
+    google_place_id: Optional[str] = MISSING
+    # Keys and values this model does not cover, kept verbatim
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "Facility":
+        """Build a Facility from a scraper record (the dict is not modified)."""
+        extra = {}
+        values = {}
+
+        for key, value in record.items():
+            converter = _FROM_DICT.get(key)
+            converted = MISSING if converter is None else converter(value)
+            if converted is MISSING:
+                extra[key] = value
+                value = MISSING if key in _OPTIONAL_FIELDS else None
+            else:
+                value = converted
+            if key in _FIELD_NAMES:
+                values[key] = value
+
+        # Required keys the record did not carry at all are remembered too
+        for key in _REQUIRED_FIELDS:
+            if key not in record:
+                values[key] = None
+                extra.setdefault("__absent__", []).append(key)
+
+        return cls(**values, extra=extra or None)
+
+    def to_dict(self) -> dict:
+        """Convert back to the exact dict layout written by the scraper."""
+        extra = self.extra or {}
+        absent = extra.get("__absent__", ())
+        record = {}
+        for key in _FIELD_NAMES:
+            if key in absent:
+                continue
+            if key in extra:
+                record[key] = extra[key]
+                continue
+            value = getattr(self, key)
+            if value is MISSING:
+                continue
+            record[key] = _TO_DICT[key](value) if key in _TO_DICT and value is not None else value
+        for key, value in extra.items():
+            if key != "__absent__" and key not in record and key not in absent:
+                record[key] = value
+        return record
+
+
+# ============================================================
+# --- DICT CONVERSION ---
+# ============================================================
+
+def _str_value(value):
+    return _intern(value) if value is None or isinstance(value, str) else MISSING
+
+
+def _int_value(value):
+    return value if value is None or (isinstance(value, int) and not isinstance(value, bool)) else MISSING
+
+
+def _str_list(value):
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return tuple(_intern(v) for v in value)
+    return MISSING
+
+
+def _entry_list(keys, build):
+    def convert(value):
+        if isinstance(value, list) and all(isinstance(v, dict) and list(v) == keys for v in value):
+            return tuple(build(v) for v in value)
+        return MISSING
+    return convert
+
+
+def _coordinates(value):
+    if value is None:
+        return None
+    if isinstance(value, list) and len(value) == 2 and all(isinstance(v, float) for v in value):
+        return value[0], value[1]
+    return MISSING
+
+
+def _google_location(value):
+    if value is None:
+        return None
+    if isinstance(value, dict) and list(value) == ["lat", "lng"] \
+            and all(isinstance(v, float) for v in value.values()):
+        return value["lat"], value["lng"]
+    return MISSING
+
+
+_FIELD_NAMES = [name for name in Facility.__dataclass_fields__ if name != "extra"]
+_OPTIONAL_FIELDS = {"formatted_address", "google_name", "google_location", "google_place_id"}
+_REQUIRED_FIELDS = [name for name in _FIELD_NAMES if name not in _OPTIONAL_FIELDS]
+
+_FROM_DICT = {name: _str_value for name in _FIELD_NAMES}
+_FROM_DICT.update({
+    "code": _int_value,
+    "catchment_population": _int_value,
+    "contacts": _str_list,
+    "infrastructure": _str_list,
+    "services": _entry_list(["category", "service"], _service),
+    "human_resources": _entry_list(["name", "category", "count"], _human_resource),
+    "coordinates": _coordinates,
+    "google_location": _google_location,
+})
+
+_TO_DICT = {
+    "contacts": list,
+    "infrastructure": list,
+    "services": lambda entries: [e.to_dict() for e in entries],
+    "human_resources": lambda entries: [e.to_dict() for e in entries],
+    "coordinates": list,
+    "google_location": lambda point: {"lat": point[0], "lng": point[1]},
+}
+
+
+def load_facilities(file_path: str = DETAIL_INPUT_FILE) -> List[Facility]:
+    """Load the scraper's detail output as Facility records."""
+    return [Facility.from_dict(record) for record in iter_json_array(file_path)]
+
+
+# ============================================================
+# --- BENCHMARK ---
+# ============================================================
+
+def run_benchmark(records: List[dict], size: int = 20_000):
+    """
+    Compare the memory held by `size` facilities as plain dicts (what
+    `json.load` returns) and as Facility records.
+
+    Sample records are cycled with unique IDs, names and codes; both
+    representations are decoded from the same JSON text so every string is
+    counted in both.
+    """
+    scaled = []
+    for i in range(size):
+        record = dict(records[i % len(records)])
+        record["id"] = f"{record.get('id')}-{i}"
+        record["name"] = f"{record.get('name')} #{i}"
+        record["code"] = i
+        scaled.append(record)
+    text = json.dumps(scaled, ensure_ascii=False)
+
+    def measure(build):
+        tracemalloc.start()
+        result = build()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return result, current
+
+    dicts, dict_bytes = measure(lambda: json.loads(text))
+    del dicts
+    facilities, record_bytes = measure(lambda: [Facility.from_dict(r) for r in json.loads(text)])
+
+    assert [f.to_dict() for f in facilities] == scaled, "Facility round trip is not lossless"
+
+    print(f"--- {size:,} facilities ---")
+    print(f"  dicts:      {dict_bytes / 1024 / 1024:8.1f} MB")
+    print(f"  Facility:   {record_bytes / 1024 / 1024:8.1f} MB")
+    print(f"  ratio:      {record_bytes / dict_bytes:8.2f}")
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Facility record model utilities.")
+    parser.add_argument("--file", default=DETAIL_INPUT_FILE, help="Scraper detail output file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    bench_parser = subparsers.add_parser("bench", help="Compare dict and Facility memory use")
+    bench_parser.add_argument("--size", type=int, default=20_000, help="Scaled dataset size")
+    args = parser.parse_args()
+
+    run_benchmark(load_json(args.file), size=args.size)
@@ -0,0 +1,451 @@
+"""
+Facility Geo Index
+------------------
+
+Spatial index over the scraped KMHFL facility coordinates.
+
+Answering "facilities within R km of a point" with a per-row Haversine
+(as the backend's `calculateDistance` does) means touching every record.
+This module buckets the points into a fixed lat/lng grid, sorts them by
+cell key and keeps everything in flat NumPy arrays:
+
+    - a radius query only visits the grid rows/columns overlapping the
+      query's bounding box (one `searchsorted` per grid row), then runs a
+      vectorized Haversine on the candidates;
+    - a k-nearest query widens the search radius until it holds k points,
+      which makes the result exact;
+    - `nearest_many` answers k-nearest for many points at once (e.g. every
+      clinic, see clinic_neighbours.py) with array operations only.
+
+Usage:
+    python geo_index.py --lat -1.2921 --lng 36.8219 --radius 5
+    python geo_index.py --lat -1.2921 --lng 36.8219 --k 3
+    python geo_index.py --bench
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from stream_io import iter_json_array
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+EARTH_RADIUS_KM = 6371.0  # Same radius as the backend's calculateDistance
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+
+DEFAULT_CELL_DEG = 0.05  # ~5.5 km cells, a couple of urban neighbourhoods each
+
+DETAIL_INPUT_FILE = os.path.join(os.path.dirname(__file__), "all_kmhfl_facilities_details.json")
+
+
+# ============================================================
+# --- DISTANCE HELPERS ---
+# ============================================================
+
+def haversine_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """
+    Vectorized great-circle distance in kilometers.
+
+    All arguments may be scalars or NumPy arrays; they are broadcast
+    against each other, so one point can be compared with many.
+
+    Returns:
+        np.ndarray: Distances in kilometers.
+    """
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    dlat = lat2 - lat1
+    dlng = np.radians(lng2) - np.radians(lng1)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def facility_lat_lng(record: dict) -> Optional[Tuple[float, float]]:
+    """
+    Pick the coordinates of a scraped facility record.
+
+    KMHFL's own `coordinates` ([lat, lng]) are preferred; `google_location`
+    only comes from Google's first text-search candidate, so it is used as
+    a fallback when KMHFL has no position.
+
+    Returns:
+        tuple | None: (lat, lng) or None when the record has no usable position.
+    """
+    coords = record.get("coordinates")
+    if coords and len(coords) == 2 and None not in coords:
+        return float(coords[0]), float(coords[1])
+
+    location = record.get("google_location")
+    if location and location.get("lat") is not None and location.get("lng") is not None:
+        return float(location["lat"]), float(location["lng"])
+    return None
+
+
+# ============================================================
+# --- GRID INDEX ---
+# ============================================================
+
+class GeoIndex:
+    """
+    Grid index over (lat, lng) points, answering radius and k-nearest queries.
+
+    Points are addressed by their ordinal (position in the arrays passed in),
+    and `ids` maps ordinals back to facility IDs when built from records.
+    """
+
+    def __init__(self, lats, lngs, ids: Optional[List] = None, cell_deg: float = DEFAULT_CELL_DEG):
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        if lats.shape != lngs.shape or lats.ndim != 1:
+            raise ValueError("lats and lngs must be 1-D arrays of the same length")
+
+        self.lats = lats
+        self.lngs = lngs
+        self.ids = ids
+        self.cell_deg = float(cell_deg)
+        self.n_rows = int(math.ceil(180.0 / self.cell_deg)) + 1
+        self.n_cols = int(math.ceil(360.0 / self.cell_deg)) + 1
+
+        # Sort the points by cell key so every cell is a contiguous slice
+        keys = self._row(lats) * self.n_cols + self._col(lngs)
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+        self.sorted_lats = lats[self.order]
+        self.sorted_lngs = lngs[self.order]
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    @classmethod
+    def from_facilities(cls, records: Iterable[dict], cell_deg: float = DEFAULT_CELL_DEG) -> "GeoIndex":
+        """
+        Build an index from scraped detail records, skipping records without coordinates.
+        """
+        lats, lngs, ids = [], [], []
+        for record in records:
+            position = facility_lat_lng(record)
+            if position is None:
+                continue
+            lats.append(position[0])
+            lngs.append(position[1])
+            ids.append(record.get("id"))
+        return cls(lats, lngs, ids=ids, cell_deg=cell_deg)
+
+    @classmethod
+    def from_file(cls, file_path: str = DETAIL_INPUT_FILE, cell_deg: float = DEFAULT_CELL_DEG) -> "GeoIndex":
+        """
+        Build an index from the scraper's detail output file.
+        """
+        return cls.from_facilities(iter_json_array(file_path), cell_deg=cell_deg)
+
+    def _row(self, lats):
+        return np.floor((np.asarray(lats) + 90.0) / self.cell_deg).astype(np.int64)
+
+    def _col(self, lngs):
+        return np.floor((np.asarray(lngs) + 180.0) / self.cell_deg).astype(np.int64)
+
+    def _candidates(self, lat: float, lng: float, radius_km: float) -> Optional[np.ndarray]:
+        """
+        Sorted-array positions of the points inside the query's bounding box cells.
+
+        Returns None when the box is too wide for the grid to help (it spans
+        a pole or the antimeridian), in which case callers scan everything.
+        """
+        dlat = radius_km / KM_PER_DEGREE
+        lat_lo, lat_hi = lat - dlat, lat + dlat
+        if lat_lo <= -90.0 or lat_hi >= 90.0:
+            return None
+
+        widest = max(abs(lat_lo), abs(lat_hi))
+        dlng = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+        lng_lo, lng_hi = lng - dlng, lng + dlng
+        if lng_lo < -180.0 or lng_hi >= 180.0:
+            return None
+
+        row_lo, row_hi = int(self._row(lat_lo)), int(self._row(lat_hi))
+        col_lo, col_hi = int(self._col(lng_lo)), int(self._col(lng_hi))
+
+        # Each grid row contributes one contiguous run of keys
+        rows = np.arange(row_lo, row_hi + 1, dtype=np.int64) * self.n_cols
+        starts = np.searchsorted(self.sorted_keys, rows + col_lo, side="left")
+        ends = np.searchsorted(self.sorted_keys, rows + col_hi, side="right")
+        spans = [np.arange(s, e) for s, e in zip(starts, ends) if e > s]
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(spans)
+
+    def within_radius(self, lat: float, lng: float, radius_km: float) -> List[Tuple[int, float]]:
+        """
+        Find every point within `radius_km` of (lat, lng).
+
+        Returns:
+            list: (ordinal, distance_km) pairs sorted by distance.
+        """
+        positions = self._candidates(lat, lng, radius_km)
+        if positions is None:
+            positions = np.arange(len(self.sorted_keys))
+
+        distances = haversine_km(lat, lng, self.sorted_lats[positions], self.sorted_lngs[positions])
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+
+        by_distance = np.argsort(distances, kind="stable")
+        ordinals = self.order[positions[by_distance]]
+        return list(zip(ordinals.tolist(), distances[by_distance].tolist()))
+
+    def nearest(self, lat: float, lng: float, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Find the k points closest to (lat, lng).
+
+        The search starts at one cell width and doubles the radius until at
+        least k points fall inside it; everything within that radius has been
+        ranked, so the k closest are exact.
+
+        Returns:
+            list: Up to k (ordinal, distance_km) pairs sorted by distance.
+        """
+        if k <= 0 or len(self) == 0:
+            return []
+
+        radius_km = self.cell_deg * KM_PER_DEGREE
+        while radius_km < math.pi * EARTH_RADIUS_KM:
+            hits = self.within_radius(lat, lng, radius_km)
+            if len(hits) >= k:
+                return hits[:k]
+            radius_km *= 2
+
+        return self.within_radius(lat, lng, math.pi * EARTH_RADIUS_KM)[:k]
+
+    def nearest_many(self, lats, lngs, k: int = 5, exclude=None,
+                     max_pairs: int = 4_000_000) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k-nearest search for many query points at once.
+
+        Every query is paired with the points of the block of cells `ring`
+        cells around its own (one `searchsorted` per grid row offset, for
+        all queries together), the pairs are ranked in one sort, and a
+        query's answer is final once its k-th distance is shorter than the
+        distance to its block's edge. The remaining queries retry with the
+        ring doubled.
+
+        Parameters:
+            lats, lngs: Query coordinates (1-D arrays).
+            k (int): Neighbours per query.
+            exclude: Optional ordinal per query to leave out (e.g. the query
+                point itself when querying the indexed points).
+            max_pairs (int): Cap on (query, candidate) pairs ranked per step.
+
+        Returns:
+            tuple: (ordinals, distances_km), both shaped (n, k) and sorted
+            by distance; missing neighbours are -1 / inf.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        exclude = np.full(len(lats), -1, dtype=np.int64) if exclude is None else np.asarray(exclude, dtype=np.int64)
+        n = len(lats)
+        ordinals = np.full((n, k), -1, dtype=np.int64)
+        distances = np.full((n, k), np.inf)
+        if n == 0 or k <= 0 or len(self) == 0:
+            return ordinals, distances
+
+        rows, cols = self._row(lats), self._col(lngs)
+        pending = np.arange(n)
+        ring = 1
+
+        while len(pending):
+            # Blocks that would wrap the antimeridian or cover the globe: exact scan
+            wraps = (cols[pending] - ring < 0) | (cols[pending] + ring >= self.n_cols)
+            if ring * self.cell_deg >= 180.0:
+                wraps[:] = True
+            for q in pending[wraps]:
+                hits = [h for h in self.nearest(lats[q], lngs[q], k + 1) if h[0] != exclude[q]][:k]
+                ordinals[q, :len(hits)] = [h[0] for h in hits]
+                distances[q, :len(hits)] = [h[1] for h in hits]
+            pending = pending[~wraps]
+            if not len(pending):
+                break
+
+            # One contiguous run of sorted keys per query and grid row offset
+            offsets = np.arange(-ring, ring + 1, dtype=np.int64)
+            block_rows = np.clip(rows[pending][:, None] + offsets[None, :], 0, self.n_rows - 1) * self.n_cols
+            starts = np.searchsorted(self.sorted_keys, block_rows + (cols[pending] - ring)[:, None], side="left")
+            ends = np.searchsorted(self.sorted_keys, block_rows + (cols[pending] + ring)[:, None], side="right")
+            # Rows clipped at a pole repeat; count them once
+            duplicate = np.zeros_like(starts, dtype=bool)
+            duplicate[:, 1:] = block_rows[:, 1:] == block_rows[:, :-1]
+            lengths = np.where(duplicate, 0, ends - starts)
+
+            # Rank in chunks of queries holding at most ~max_pairs candidate pairs
+            pairs_before = np.concatenate(([0], np.cumsum(lengths.sum(axis=1))))
+            retry = []
+            lo = 0
+            while lo < len(pending):
+                hi = max(lo + 1, int(np.searchsorted(pairs_before, pairs_before[lo] + max_pairs, side="right")) - 1)
+                retry.append(self._rank_pairs(pending[lo:hi], lats, lngs, starts[lo:hi], lengths[lo:hi],
+                                              exclude, k, ordinals, distances, ring))
+                lo = hi
+            pending = np.concatenate(retry) if retry else np.empty(0, dtype=np.int64)
+            ring *= 2
+        return ordinals, distances
+
+    def _rank_pairs(self, queries, lats, lngs, starts, lengths, exclude, k, ordinals, distances,
+                    ring: int) -> np.ndarray:
+        """
+        Rank the (query, candidate) pairs of one step and store the k best
+        per query; returns the queries whose answer is not yet proven exact.
+        """
+        flat_lengths = lengths.ravel()
+        total = int(flat_lengths.sum())
+        pair_query = np.repeat(np.repeat(np.arange(len(queries)), lengths.shape[1]), flat_lengths)
+        run_offsets = np.repeat(np.cumsum(flat_lengths) - flat_lengths, flat_lengths)
+        positions = np.repeat(starts.ravel(), flat_lengths) + (np.arange(total) - run_offsets)
+
+        pair_dist = haversine_km(lats[queries][pair_query], lngs[queries][pair_query],
+                                 self.sorted_lats[positions], self.sorted_lngs[positions])
+        pair_ord = self.order[positions]
+        pair_dist[pair_ord == exclude[queries][pair_query]] = np.inf
+
+        # pair_query is already grouped; fold the distance into the fractional
+        # part of one float key so a single argsort ranks every query at once
+        finite = np.isfinite(pair_dist)
+        scale = 2.0 * (pair_dist[finite].max() if finite.any() else 1.0) + 1.0
+        by_query_distance = np.argsort(pair_query + np.where(finite, pair_dist, scale / 2.0) / scale)
+        pair_query, pair_dist, pair_ord = pair_query[by_query_distance], pair_dist[by_query_distance], \
+            pair_ord[by_query_distance]
+        first = np.searchsorted(pair_query, np.arange(len(queries)))
+        rank = np.arange(total) - first[pair_query]
+        keep = (rank < k) & np.isfinite(pair_dist)
+
+        found_ord = np.full((len(queries), k), -1, dtype=np.int64)
+        found_dist = np.full((len(queries), k), np.inf)
+        found_ord[pair_query[keep], rank[keep]] = pair_ord[keep]
+        found_dist[pair_query[keep], rank[keep]] = pair_dist[keep]
+        ordinals[queries] = found_ord
+        distances[queries] = found_dist
+
+        # Lower bound on the distance to any point outside the block: a gap of
+        # `ring` cells in latitude, or in longitude at the block's widest latitude
+        gap = np.radians(ring * self.cell_deg)
+        rows = self._row(lats[queries])
+        edges = np.maximum(np.abs((rows - ring) * self.cell_deg - 90.0), np.abs((rows + ring + 1) * self.cell_deg - 90.0))
+        widest = np.radians(np.minimum(edges, 90.0))
+        safe_km = np.minimum(
+            EARTH_RADIUS_KM * gap,
+            2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.cos(widest) * np.sin(gap / 2), 0.0, 1.0)),
+        )
+        return queries[~(found_dist[:, -1] <= safe_km)]
+
+    def facility_id(self, ordinal: int):
+        """Map an ordinal back to the facility ID it was built from."""
+        return self.ids[ordinal] if self.ids is not None else ordinal
+
+
+# ============================================================
+# --- BENCHMARK ---
+# ============================================================
+
+# Rough bounding box of Kenya, so synthetic points have a realistic density
+KENYA_BBOX = (-4.7, 5.0, 33.9, 41.9)
+
+
+def _scan_radius(lats, lngs, lat: float, lng: float, radius_km: float) -> List[int]:
+    """Baseline: per-row Haversine in pure Python, like calculateDistance."""
+    hits = []
+    for i, (plat, plng) in enumerate(zip(lats, lngs)):
+        dlat = math.radians(plat - lat)
+        dlng = math.radians(plng - lng)
+        a = (math.sin(dlat / 2) ** 2
+             + math.cos(math.radians(lat)) * math.cos(math.radians(plat)) * math.sin(dlng / 2) ** 2)
+        if 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a)) <= radius_km:
+            hits.append(i)
+    return hits
+
+
+def run_benchmark(sizes=(10_000, 1_000_000), queries: int = 200, radius_km: float = 5.0, k: int = 10):
+    """
+    Time index build, radius and k-nearest queries on synthetic Kenyan points.
+    """
+    rng = np.random.default_rng(42)
+    lat_lo, lat_hi, lng_lo, lng_hi = KENYA_BBOX
+
+    for size in sizes:
+        lats = rng.uniform(lat_lo, lat_hi, size)
+        lngs = rng.uniform(lng_lo, lng_hi, size)
+        query_lats = rng.uniform(lat_lo, lat_hi, queries)
+        query_lngs = rng.uniform(lng_lo, lng_hi, queries)
+
+        start = time.perf_counter()
+        index = GeoIndex(lats, lngs)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for qlat, qlng in zip(query_lats, query_lngs):
+            index.within_radius(qlat, qlng, radius_km)
+        radius_ms = (time.perf_counter() - start) / queries * 1000
+
+        start = time.perf_counter()
+        for qlat, qlng in zip(query_lats, query_lngs):
+            index.nearest(qlat, qlng, k)
+        knn_ms = (time.perf_counter() - start) / queries * 1000
+
+        start = time.perf_counter()
+        for qlat, qlng in zip(query_lats, query_lngs):
+            haversine_km(qlat, qlng, lats, lngs) <= radius_km
+        vector_scan_ms = (time.perf_counter() - start) / queries * 1000
+
+        # The pure Python scan is only worth timing on a handful of queries
+        scan_queries = min(queries, 5)
+        py_lats, py_lngs = lats.tolist(), lngs.tolist()
+        start = time.perf_counter()
+        for qlat, qlng in zip(query_lats[:scan_queries], query_lngs[:scan_queries]):
+            _scan_radius(py_lats, py_lngs, qlat, qlng, radius_km)
+        python_scan_ms = (time.perf_counter() - start) / scan_queries * 1000
+
+        print(f"--- {size:,} points ---")
+        for label, value in (
+            ("build (ms)", build_s * 1000),
+            (f"radius {radius_km:g} km, index (ms/query)", radius_ms),
+            (f"{k}-nearest, index (ms/query)", knn_ms),
+            ("radius, NumPy full scan (ms/query)", vector_scan_ms),
+            ("radius, Python scan (ms/query)", python_scan_ms),
+        ):
+            print(f"  {label:<36} {value:10.3f}")
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nearest-facility queries over the KMHFL detail dump.")
+    parser.add_argument("--file", default=DETAIL_INPUT_FILE, help="Scraper detail output file")
+    parser.add_argument("--lat", type=float, help="Query latitude")
+    parser.add_argument("--lng", type=float, help="Query longitude")
+    parser.add_argument("--radius", type=float, help="Return facilities within this many km")
+    parser.add_argument("--k", type=int, default=5, help="Number of nearest facilities (default: 5)")
+    parser.add_argument("--bench", action="store_true", help="Benchmark at 10k and 1M synthetic points")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark()
+    elif args.lat is None or args.lng is None:
+        parser.error("--lat and --lng are required unless --bench is given")
+    else:
+        facilities = [r for r in iter_json_array(args.file) if facility_lat_lng(r) is not None]
+        index = GeoIndex.from_facilities(facilities)
+
+        if args.radius is not None:
+            hits = index.within_radius(args.lat, args.lng, args.radius)
+        else:
+            hits = index.nearest(args.lat, args.lng, args.k)
+
+        for ordinal, distance in hits:
+            print(f"{distance:8.2f} km  {facilities[ordinal].get('name')} ({index.facility_id(ordinal)})")
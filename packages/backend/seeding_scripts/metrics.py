@@ -0,0 +1,259 @@
+"""
+Scraper Metrics
+---------------
+
+Lightweight, dependency-free instrumentation for the seeding scripts.
+
+    - `span(stage)` times a block into a per-stage latency histogram
+      (p50 / p95 / p99 are computed on export);
+    - `inc(counter, value, **labels)` bumps counters such as bytes
+      downloaded, retries and failures;
+    - `export(directory)` writes a Prometheus textfile (for node_exporter's
+      textfile collector) and a JSON summary;
+    - `profiled(mode, path)` wraps a run in cProfile or, if installed,
+      pyinstrument and dumps the profile.
+
+All methods are thread-safe so pipeline workers can share one registry.
+"""
+
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def quantile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank quantile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+# ============================================================
+# --- REGISTRY ---
+# ============================================================
+
+class Metrics:
+    """
+    Registry of latency histograms and counters for one job.
+
+    Parameters:
+        namespace (str): Prefix of every exported metric name.
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._durations: Dict[LabelKey, List[float]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.started = time.time()
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self.started = time.time()
+
+    # ------------- RECORDING -------------
+
+    @contextlib.contextmanager
+    def span(self, stage: str, **labels):
+        """Time the enclosed block as one observation of `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def observe(self, stage: str, seconds: float, **labels):
+        key = _label_key({"stage": stage, **labels})
+        with self._lock:
+            self._durations.setdefault(key, []).append(seconds)
+
+    def inc(self, counter: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(counter, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, gauge: str, value: float, **labels):
+        with self._lock:
+            self._gauges.setdefault(gauge, {})[_label_key(labels)] = value
+
+    # ------------- REPORTING -------------
+
+    def summary(self) -> dict:
+        """Snapshot of every histogram (count, sum, quantiles) and counter."""
+        with self._lock:
+            durations = {key: sorted(values) for key, values in self._durations.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+
+        return {
+            "namespace": self.namespace,
+            "started": self.started,
+            "elapsed_seconds": time.time() - self.started,
+            "stages": [
+                {
+                    **dict(key),
+                    "count": len(values),
+                    "sum_seconds": sum(values),
+                    **{f"p{int(q * 100)}_seconds": quantile(values, q) for q in QUANTILES},
+                    "max_seconds": values[-1] if values else 0.0,
+                }
+                for key, values in sorted(durations.items())
+            ],
+            "counters": [
+                {"name": name, **dict(key), "value": value}
+                for name, series in sorted(counters.items()) for key, value in sorted(series.items())
+            ],
+            "gauges": [
+                {"name": name, **dict(key), "value": value}
+                for name, series in sorted(gauges.items()) for key, value in sorted(series.items())
+            ],
+        }
+
+    def prometheus_text(self) -> str:
+        """Render the registry in the Prometheus text exposition format."""
+        ns = self.namespace
+        with self._lock:
+            durations = {key: sorted(values) for key, values in self._durations.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+
+        lines = [
+            f"# HELP {ns}_stage_duration_seconds Time spent per stage operation.",
+            f"# TYPE {ns}_stage_duration_seconds summary",
+        ]
+        for key, values in sorted(durations.items()):
+            for q in QUANTILES:
+                lines.append(f"{ns}_stage_duration_seconds{_format_labels(key, {'quantile': str(q)})} "
+                             f"{quantile(values, q):.6f}")
+            lines.append(f"{ns}_stage_duration_seconds_sum{_format_labels(key)} {sum(values):.6f}")
+            lines.append(f"{ns}_stage_duration_seconds_count{_format_labels(key)} {len(values)}")
+
+        for name, series in sorted(counters.items()):
+            lines.append(f"# TYPE {ns}_{name} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{ns}_{name}{_format_labels(key)} {value:g}")
+
+        for name, series in sorted(gauges.items()):
+            lines.append(f"# TYPE {ns}_{name} gauge")
+            for key, value in sorted(series.items()):
+                lines.append(f"{ns}_{name}{_format_labels(key)} {value:g}")
+
+        lines.append(f"# TYPE {ns}_last_export_timestamp_seconds gauge")
+        lines.append(f"{ns}_last_export_timestamp_seconds {time.time():.0f}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: str, phase: Optional[str] = None,
+               basename: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Write `<namespace>.prom` and `<namespace>.json` into `directory`.
+
+        Files are written to a temporary name and renamed, so a textfile
+        collector never reads a half-written file. `basename` replaces the
+        namespace in the file names, e.g. for one file per crawl shard.
+
+        Returns:
+            tuple: Paths of the Prometheus and JSON files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        basename = basename or self.namespace
+        prom_path = os.path.join(directory, f"{basename}.prom")
+        json_path = os.path.join(directory, f"{basename}.json")
+
+        summary = self.summary()
+        if phase:
+            summary["phase"] = phase
+
+        for path, content in ((prom_path, self.prometheus_text()),
+                              (json_path, json.dumps(summary, indent=4) + "\n")):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return prom_path, json_path
+
+    def print_summary(self):
+        """Print one line per stage with its latency percentiles."""
+        for stage in self.summary()["stages"]:
+            labels = ",".join(f"{k}={v}" for k, v in stage.items() if not isinstance(v, (int, float)))
+            print(f"  {labels:<24} n={stage['count']:<6} "
+                  f"p50={stage['p50_seconds'] * 1000:8.1f}ms "
+                  f"p95={stage['p95_seconds'] * 1000:8.1f}ms "
+                  f"p99={stage['p99_seconds'] * 1000:8.1f}ms")
+
+
+# ============================================================
+# --- PROFILING ---
+# ============================================================
+
+@contextlib.contextmanager
+def profiled(mode: Optional[str], output_path: str):
+    """
+    Profile the enclosed block.
+
+    Parameters:
+        mode (str | None): "cprofile", "pyinstrument" or None (no profiling).
+        output_path (str): Where to write the profile; cProfile writes a
+            pstats file, pyinstrument an HTML report.
+    """
+    if not mode:
+        yield
+        return
+
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise RuntimeError("pyinstrument is not installed (pip install pyinstrument)")
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            print(f"Profile written to {output_path}")
+        return
+
+    if mode != "cprofile":
+        raise ValueError(f"Unknown profile mode '{mode}'")
+
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(output_path)
+        print(f"Profile written to {output_path} (view with: python -m pstats {output_path})")
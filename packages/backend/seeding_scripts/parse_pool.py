@@ -0,0 +1,140 @@
+"""
+Process-Pool Page Parsing
+-------------------------
+
+Parses KMHFL facility detail pages in worker processes so a fast crawl is
+not held back by the GIL.
+
+Raw page bytes are sent to the workers, which run
+`webscrapping.parse_facility_page` and send back only the detail record.
+Pages are handed out in chunks (`chunksize`), so each round trip pickles
+many pages and records at once and the per-item IPC cost is amortised;
+records come back in input order.
+
+Usage:
+    python parse_pool.py bench --pages 2000 --workers 1,2,4,8 --chunksize 16
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import webscrapping
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+DEFAULT_CHUNKSIZE = 16
+SAMPLE_PAGE_FILE = os.path.join(os.path.dirname(__file__), "benchmarks", "fixtures", "kmhfl_facility_1.html")
+
+
+def _parse(page) -> Tuple[Optional[dict], Optional[str]]:
+    """Worker entry point: (record, None) on success, (None, error) otherwise."""
+    try:
+        return webscrapping.parse_facility_page(page), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+# ============================================================
+# --- POOL ---
+# ============================================================
+
+class ParsePool:
+    """
+    A process pool that turns raw facility pages into detail records.
+
+    Parameters:
+        workers (int): Number of worker processes (default: CPU count).
+        chunksize (int): Pages sent to a worker per round trip.
+
+    Use as a context manager, or call `close()` when done.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunksize: int = DEFAULT_CHUNKSIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def map(self, pages: Iterable) -> Iterator[Tuple[Optional[dict], Optional[str]]]:
+        """
+        Parse pages in the pool.
+
+        Returns:
+            Iterator of (record, error) pairs in input order; exactly one of
+            the two is None.
+        """
+        return self._executor.map(_parse, pages, chunksize=self.chunksize)
+
+    def parse_all(self, pages: Iterable) -> List[dict]:
+        """Parse pages and return the records, printing and skipping failures."""
+        records = []
+        for record, error in self.map(pages):
+            if error:
+                print(f"❌ Parsing error: {error}")
+                webscrapping.METRICS.inc("failures_total", stage="parse")
+            else:
+                records.append(record)
+        return records
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============================================================
+# --- BENCHMARK ---
+# ============================================================
+
+def run_benchmark(page: bytes, pages: int = 2000, worker_counts=(1, 2, 4, 8),
+                  chunksize: int = DEFAULT_CHUNKSIZE):
+    """
+    Print pages/sec for in-process parsing and for each pool size.
+
+    Pool start-up is excluded: each pool parses one warm-up chunk per worker
+    before timing starts.
+    """
+    batch = [page] * pages
+
+    start = time.perf_counter()
+    for p in batch:
+        webscrapping.parse_facility_page(p)
+    baseline = pages / (time.perf_counter() - start)
+    print(f"--- {pages:,} pages, chunksize {chunksize}, {os.cpu_count()} CPUs ---")
+    print(f"  in-process:   {baseline:9.1f} pages/s")
+
+    for workers in worker_counts:
+        with ParsePool(workers, chunksize) as pool:
+            pool.parse_all([page] * (workers * chunksize))
+            start = time.perf_counter()
+            records = pool.parse_all(batch)
+            rate = pages / (time.perf_counter() - start)
+        assert len(records) == pages
+        print(f"  {workers:>2} workers:   {rate:9.1f} pages/s  ({rate / baseline:4.2f}x)")
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process-pool parsing of KMHFL facility pages.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    bench_parser = subparsers.add_parser("bench", help="Measure pages/sec as the worker count grows")
+    bench_parser.add_argument("--page", default=SAMPLE_PAGE_FILE, help="Sample facility detail page")
+    bench_parser.add_argument("--pages", type=int, default=2000, help="Pages parsed per measurement")
+    bench_parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated pool sizes")
+    bench_parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Pages per worker round trip")
+    args = parser.parse_args()
+
+    with open(args.page, "rb") as f:
+        sample = f.read()
+    run_benchmark(sample, args.pages, [int(w) for w in args.workers.split(",")], args.chunksize)
@@ -0,0 +1,469 @@
+"""
+KMHFL Scrape → Seed Pipeline
+----------------------------
+
+Single entry point that runs the detail crawl, Google enrichment and the
+`clinics` seeding as one overlapping pipeline instead of three separate
+scripts:
+
+    ids ─▶ fetch ─▶ parse ─▶ enrich ─▶ transform ─▶ upsert
+          (N thr)  (M thr)  (K thr)    (1 thr)     (batches)
+                   or a process pool (--parse-processes)
+
+Stages are connected by bounded queues. Each stage runs its own number of
+worker threads, and a full queue blocks the stage feeding it
+(backpressure), so a slow database or Google quota throttles the crawl
+instead of piling records up in memory. Records reach Supabase while the
+crawl is still running, and the detail JSON file is still written as a
+side output of the transform stage. Likely duplicates of stored or already
+inserted clinics are skipped (name_matching.py), and each inserted batch
+is linked to its services in `clinic_services` (service_taxonomy.py).
+
+Per-stage throughput is printed periodically and summarised at the end.
+
+Usage:
+    python pipeline.py --fetch-workers 4 --enrich-workers 2 --batch-size 100
+    python pipeline.py --no-google --dry-run --max-facilities 50
+    python pipeline.py --fetch-workers 16 --parse-processes 4
+"""
+
+import argparse
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+import requests
+
+import webscrapping
+from parse_pool import DEFAULT_CHUNKSIZE, ParsePool
+from name_matching import DUPLICATE_CONFIDENCE, NameMatcher, county_of_address, normalize_name
+from seed_supabase import get_supabase_client, load_existing_clinics, transform_facility
+from service_taxonomy import clinic_service_rows, load_taxonomy, postgrest_store, save_taxonomy
+from sharding import Shard, in_shard, parse_shard, shard_output_file
+from stream_io import iter_json_array
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+# ============================================================
+# --- STAGE MACHINERY ---
+# ============================================================
+
+class StageStats:
+    """Counters for one stage, updated by its workers under a lock."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_s = 0.0      # time spent inside the stage function
+        self.blocked_s = 0.0   # time spent waiting on a full output queue
+        self.started = None
+        self.finished = None
+        self.lock = threading.Lock()
+
+    def throughput(self) -> float:
+        end = self.finished or time.perf_counter()
+        elapsed = end - self.started if self.started else 0.0
+        return self.items_in / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.name:<10} workers={self.workers:<3} in={self.items_in:<6} out={self.items_out:<6} "
+                f"errors={self.errors:<4} {self.throughput():8.2f} items/s  "
+                f"busy={self.busy_s:7.1f}s  blocked={self.blocked_s:6.1f}s")
+
+
+class Stage:
+    """
+    A pool of worker threads applying `func` to items from `inbox`.
+
+    `func` returns the item to pass downstream, or None to drop it. When
+    every worker has seen the end marker, the stage closes its outbox.
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int, inbox: queue.Queue,
+                 outbox: Optional[queue.Queue], downstream_workers: int = 0):
+        self.name = name
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.downstream_workers = downstream_workers
+        self.stats = StageStats(name, workers)
+        self._remaining = workers
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True) for i in range(workers)
+        ]
+
+    def start(self):
+        self.stats.started = time.perf_counter()
+        for thread in self._threads:
+            thread.start()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def emit(self, item):
+        """Put an item downstream, accounting for time blocked by backpressure."""
+        if self.outbox is None:
+            return
+        start = time.perf_counter()
+        self.outbox.put(item)
+        with self.stats.lock:
+            self.stats.blocked_s += time.perf_counter() - start
+            self.stats.items_out += 1
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                break
+            self._process(item)
+        self._worker_finished()
+
+    def _process(self, item):
+        start = time.perf_counter()
+        try:
+            result = self.func(item)
+        except Exception as e:
+            result = None
+            print(f"❌ [{self.name}] {e}")
+            with self.stats.lock:
+                self.stats.errors += 1
+        with self.stats.lock:
+            self.stats.items_in += 1
+            self.stats.busy_s += time.perf_counter() - start
+        if result is not None:
+            self.emit(result)
+
+    def _worker_finished(self):
+        with self.stats.lock:
+            self._remaining -= 1
+            last = self._remaining == 0
+        if last:
+            self.stats.finished = time.perf_counter()
+            if self.outbox is not None:
+                for _ in range(self.downstream_workers):
+                    self.outbox.put(_DONE)
+
+
+class BatchStage(Stage):
+    """
+    A stage whose workers hand `func` lists of up to `batch_size` items.
+
+    A partial batch is flushed after `flush_s` seconds without new input so
+    rows keep flowing to the database during a slow crawl. `func` returns
+    either the number of items written (terminal stage) or a list of items
+    to pass downstream.
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int, inbox: queue.Queue,
+                 batch_size: int = 100, flush_s: float = 5.0,
+                 outbox: Optional[queue.Queue] = None, downstream_workers: int = 0):
+        super().__init__(name, func, workers, inbox, outbox, downstream_workers)
+        self.batch_size = batch_size
+        self.flush_s = flush_s
+
+    def _run(self):
+        batch: List = []
+        while True:
+            try:
+                item = self.inbox.get(timeout=self.flush_s)
+            except queue.Empty:
+                item = None
+            if item is _DONE:
+                break
+            if item is not None:
+                batch.append(item)
+            if batch and (item is None or len(batch) >= self.batch_size):
+                self._process_batch(batch)
+                batch = []
+        if batch:
+            self._process_batch(batch)
+        self._worker_finished()
+
+    def _process_batch(self, batch: List):
+        start = time.perf_counter()
+        try:
+            written = self.func(batch)
+        except Exception as e:
+            written = 0
+            print(f"❌ [{self.name}] batch of {len(batch)} failed: {e}")
+            with self.stats.lock:
+                self.stats.errors += 1
+        with self.stats.lock:
+            self.stats.items_in += len(batch)
+            self.stats.busy_s += time.perf_counter() - start
+        if isinstance(written, list):
+            for item in written:
+                self.emit(item)
+        else:
+            with self.stats.lock:
+                self.stats.items_out += written or 0
+
+
+# ============================================================
+# --- PIPELINE ---
+# ============================================================
+
+class ScrapeSeedPipeline:
+    """
+    Wires the fetch → parse → enrich → transform → upsert stages together.
+
+    Parameters:
+        fetch_workers / parse_workers / enrich_workers / upsert_workers (int):
+            Concurrency of each stage.
+        parse_processes (int): If set, pages are parsed in a process pool of
+            this size (see `parse_pool.py`); parse workers then collect pages
+            into batches of `parse_chunksize * parse_processes` and hand each
+            batch to the pool.
+        parse_chunksize (int): Pages per worker-process round trip.
+        queue_size (int): Capacity of every inter-stage queue.
+        batch_size (int): Rows per Supabase insert.
+        fetch_delay (float): Extra per-worker pause after each detail request;
+            the request rate itself is set by `webscrapping.KMHFL_LIMITER`,
+            shared by all fetch workers.
+        google (bool): Whether to enrich records through Google Places.
+        dry_run (bool): Skip the database stage (rows are only counted).
+    """
+
+    def __init__(self, fetch_workers: int = 4, parse_workers: int = 2, enrich_workers: int = 2,
+                 upsert_workers: int = 1, queue_size: int = 64, batch_size: int = 100,
+                 fetch_delay: float = 0.0, google: bool = True, dry_run: bool = False,
+                 detail_output_file: Optional[str] = None, parse_processes: int = 0,
+                 parse_chunksize: int = DEFAULT_CHUNKSIZE):
+        self.fetch_delay = fetch_delay
+        self.google = google
+        self.dry_run = dry_run
+        self.detail_output_file = detail_output_file or webscrapping.DETAIL_OUTPUT_FILE
+        self.supabase = None if dry_run else get_supabase_client()
+        self.parse_pool = ParsePool(parse_processes, parse_chunksize) if parse_processes else None
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._first_entry = True
+
+        # Duplicate check of the upsert stage: the clinics stored at start
+        # (loaded by `run`) and the rows inserted since
+        self._match_lock = threading.Lock()
+        self._existing: Optional[NameMatcher] = None
+        self._inserted: List[dict] = []
+        self._inserted_matcher: Optional[NameMatcher] = None
+        self._inserted_keys = set()
+        self.taxonomy = None  # service dictionary (loaded by `run`) for the clinic_services links
+
+        self.ids: queue.Queue = queue.Queue(maxsize=queue_size)
+        pages: queue.Queue = queue.Queue(maxsize=queue_size)
+        parsed: queue.Queue = queue.Queue(maxsize=queue_size)
+        enriched: queue.Queue = queue.Queue(maxsize=queue_size)
+        rows: queue.Queue = queue.Queue(maxsize=queue_size)
+
+        upsert = BatchStage("upsert", self.upsert, upsert_workers, rows, batch_size=batch_size)
+        transform = Stage("transform", self.transform, 1, enriched, rows, upsert_workers)
+        enrich = Stage("enrich", self.enrich, enrich_workers, parsed, enriched, 1)
+        if self.parse_pool:
+            parse = BatchStage("parse", self.parse_batch, parse_workers, pages,
+                               batch_size=parse_chunksize * parse_processes, flush_s=0.5,
+                               outbox=parsed, downstream_workers=enrich_workers)
+        else:
+            parse = Stage("parse", self.parse, parse_workers, pages, parsed, enrich_workers)
+        fetch = Stage("fetch", self.fetch, fetch_workers, self.ids, pages, parse_workers)
+        self.stages = [fetch, parse, enrich, transform, upsert]
+
+    # ------------- STAGE FUNCTIONS -------------
+
+    def fetch(self, facility_id: str):
+        """Download one facility detail page (one HTTP session per thread)."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        try:
+            response = webscrapping.http_get(
+                f"{webscrapping.DETAIL_API_BASE_URL}{facility_id}", session=session, timeout=30,
+            )
+            return response.content
+        finally:
+            webscrapping.polite_pause(self.fetch_delay)
+
+    def parse(self, html: bytes) -> dict:
+        return webscrapping.extract_facility_details(html, google_data=False)
+
+    def parse_batch(self, pages: List[bytes]) -> List[dict]:
+        with webscrapping.METRICS.span("parse", batch="true"):
+            return self.parse_pool.parse_all(pages)
+
+    def enrich(self, record: dict) -> dict:
+        if self.google and record.get("name"):
+            google_place_data = webscrapping.google_find_place(record["name"])
+            if google_place_data:
+                record.update(google_place_data)
+        return record
+
+    def transform(self, record: dict) -> Optional[tuple]:
+        """Stream the detail record to the JSON output, then map it to a (clinics row, record) pair."""
+        with self._write_lock:
+            webscrapping.append_stream(self.detail_output_file, record, is_first_entry=self._first_entry)
+            self._first_entry = False
+
+        row = transform_facility(record)
+        # Skip entries without name or coordinates, as seed_clinics does
+        if not row["name"] or not row["latitude"] or not row["longitude"]:
+            return None
+        return row, record
+
+    def upsert(self, batch: List[tuple]) -> int:
+        """
+        Insert the batch rows that are not likely duplicates of stored or
+        already inserted clinics, and link them to their services.
+        """
+        if self.dry_run:
+            return len(batch)
+
+        with self._match_lock:
+            new_pairs = self._new_rows(batch)
+        if not new_pairs:
+            return 0
+        inserted = self.supabase.table("clinics").insert([row for row, _ in new_pairs]).execute().data
+
+        records = [record for _, record in new_pairs]
+        save_taxonomy(postgrest_store(self.supabase), self.taxonomy.add_records(records))
+        links = clinic_service_rows(records, inserted, self.taxonomy)
+        if links:
+            self.supabase.table("clinic_services").upsert(links, on_conflict="clinic_id,service_id",
+                                                          ignore_duplicates=True).execute()
+        return len(inserted)
+
+    def _new_rows(self, batch: List[tuple]) -> List[tuple]:
+        """
+        The (row, record) pairs whose names match no clinic at
+        DUPLICATE_CONFIDENCE (as `seed_supabase.clinic_rows` does), reserved
+        as inserted so a concurrent batch does not insert them again.
+        """
+        if self._inserted_matcher is None or len(self._inserted_matcher) != len(self._inserted):
+            self._inserted_matcher = NameMatcher([row["name"] for row in self._inserted],
+                                                 [county_of_address(row["address"]) for row in self._inserted])
+        names = [row["name"] for row, _ in batch]
+        counties = [county_of_address(row["address"]) for row, _ in batch]
+        existing = self._existing.match(names, counties, min_confidence=DUPLICATE_CONFIDENCE)
+        inserted = self._inserted_matcher.match(names, counties, min_confidence=DUPLICATE_CONFIDENCE)
+
+        new_pairs = []
+        for pair, county, matches in zip(batch, counties, zip(existing, inserted)):
+            key = (normalize_name(pair[0]["name"]), county)
+            if any(matches) or key in self._inserted_keys:
+                continue
+            self._inserted_keys.add(key)
+            new_pairs.append(pair)
+        self._inserted += [row for row, _ in new_pairs]
+        return new_pairs
+
+    # ------------- RUN -------------
+
+    def run(self, facility_ids: Iterable[str], report_every: float = 10.0) -> List[StageStats]:
+        """
+        Feed facility IDs through every stage and wait for the last batch.
+
+        Returns:
+            list: StageStats of each stage, in pipeline order.
+        """
+        if not self.dry_run:
+            clinics = load_existing_clinics(self.supabase)
+            self._existing = NameMatcher([c["name"] for c in clinics],
+                                         [county_of_address(c.get("address")) for c in clinics])
+            self.taxonomy = load_taxonomy(self.supabase)
+        webscrapping.start_stream(self.detail_output_file)
+        for stage in self.stages:
+            stage.start()
+
+        reporter_stop = threading.Event()
+        reporter = threading.Thread(target=self._report, args=(reporter_stop, report_every), daemon=True)
+        reporter.start()
+
+        try:
+            for facility_id in facility_ids:
+                self.ids.put(facility_id)  # Blocks while the fetch stage is saturated
+        finally:
+            for _ in range(self.stages[0].stats.workers):
+                self.ids.put(_DONE)
+            for stage in self.stages:
+                stage.join()
+            reporter_stop.set()
+            webscrapping.end_stream(self.detail_output_file)
+            if self.parse_pool:
+                self.parse_pool.close()
+
+        print("\n--- Pipeline summary ---")
+        for stage in self.stages:
+            print(stage.stats.summary())
+        webscrapping.export_metrics("pipeline")
+        return [stage.stats for stage in self.stages]
+
+    def _report(self, stop: threading.Event, every: float):
+        while not stop.wait(every):
+            print(" | ".join(f"{s.name} {s.stats.items_in} ({s.stats.throughput():.1f}/s)" for s in self.stages))
+
+
+def iter_facility_ids(general_file: Optional[str] = None, limit: Optional[int] = None,
+                      shard: Optional[Shard] = None):
+    """
+    Yield facility IDs from the Phase 1 general data file.
+
+    With `shard` (i, N), only the IDs of that shard are yielded; `limit`
+    caps the IDs considered before partitioning, as in
+    `webscrapping.fetch_all_detail_data`.
+    """
+    count = 0
+    for facility in iter_json_array(general_file or webscrapping.GENERAL_OUTPUT_FILE):
+        if limit and count >= limit:
+            return
+        if facility.get("id"):
+            count += 1
+            if in_shard(facility["id"], shard):
+                yield facility["id"]
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl KMHFL facility details and seed clinics in one pass.")
+    parser.add_argument("--refresh-general", action="store_true", help="Run Phase 1 (general list) first")
+    parser.add_argument("--max-facilities", type=int, help="Stop after this many facility IDs")
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N", help="Only crawl shard I of N")
+    parser.add_argument("--fetch-workers", type=int, default=4)
+    parser.add_argument("--parse-workers", type=int, default=2)
+    parser.add_argument("--parse-processes", type=int, default=0, help="Parse pages in a process pool of this size")
+    parser.add_argument("--parse-chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Pages per parse process round trip")
+    parser.add_argument("--enrich-workers", type=int, default=2)
+    parser.add_argument("--upsert-workers", type=int, default=1)
+    parser.add_argument("--queue-size", type=int, default=64, help="Capacity of each inter-stage queue")
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows per clinics insert")
+    parser.add_argument("--fetch-delay", type=float, default=0.0,
+                        help="Extra seconds each fetch worker waits between requests (the adaptive limiter paces requests)")
+    parser.add_argument("--no-google", action="store_true", help="Skip Google Places enrichment")
+    parser.add_argument("--dry-run", action="store_true", help="Do not write to Supabase")
+    args = parser.parse_args()
+
+    if args.refresh_general and webscrapping.fetch_all_general_data() == 0:
+        print("No facilities retrieved in Phase 1. Nothing to do.")
+    else:
+        pipeline = ScrapeSeedPipeline(
+            fetch_workers=args.fetch_workers,
+            parse_workers=args.parse_workers,
+            parse_processes=args.parse_processes,
+            parse_chunksize=args.parse_chunksize,
+            enrich_workers=args.enrich_workers,
+            upsert_workers=args.upsert_workers,
+            queue_size=args.queue_size,
+            batch_size=args.batch_size,
+            fetch_delay=args.fetch_delay,
+            google=not args.no_google,
+            dry_run=args.dry_run,
+            detail_output_file=shard_output_file(webscrapping.DETAIL_OUTPUT_FILE, args.shard) if args.shard else None,
+        )
+        pipeline.run(iter_facility_ids(limit=args.max_facilities, shard=args.shard))
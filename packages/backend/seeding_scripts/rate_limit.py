@@ -0,0 +1,150 @@
+"""
+Adaptive Rate Limiting
+----------------------
+
+AIMD (additive increase, multiplicative decrease) request pacing for the
+KMHFL site and the Google Places API, replacing the fixed one-second sleep
+after every request.
+
+    - every request first takes a slot from `acquire()`, which spaces
+      requests 1 / rate seconds apart across all threads;
+    - after `increase_every` consecutive healthy responses the rate grows
+      by `increase` requests/second, up to `max_rate`;
+    - a 429, a 5xx, a network error or a latency spike (slower than
+      `latency_target`, or `spike_factor` times the recent average)
+      multiplies the rate by `decrease`, down to `min_rate`;
+    - a Retry-After header pauses every caller for that long.
+
+Rate changes are printed and exported as the `rate_limit_rps` gauge.
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delay in seconds or an HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Thread-safe AIMD rate limiter for one upstream service.
+
+    Parameters:
+        name (str): Label used in logs and metrics.
+        initial_rate (float): Starting rate, requests/second.
+        min_rate / max_rate (float): Bounds of the rate.
+        increase (float): Requests/second added after a healthy streak.
+        increase_every (int): Healthy responses needed per increase.
+        decrease (float): Factor applied to the rate on trouble.
+        latency_target (float): Seconds above which a response counts as slow.
+        spike_factor (float): A response this many times slower than the
+            recent average also counts as slow.
+        metrics: Optional `metrics.Metrics` registry for the rate gauge.
+    """
+
+    def __init__(self, name: str, initial_rate: float = 1.0, min_rate: float = 0.2, max_rate: float = 8.0,
+                 increase: float = 0.25, increase_every: int = 10, decrease: float = 0.5,
+                 latency_target: float = 3.0, spike_factor: float = 4.0, metrics=None):
+        self.name = name
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.increase_every = increase_every
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.spike_factor = spike_factor
+        self.metrics = metrics
+
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._healthy_streak = 0
+        self._latency_avg = None
+        self._last_decrease = 0.0
+        self._publish()
+
+    # ------------- PACING -------------
+
+    def acquire(self) -> float:
+        """Block until the caller may send its next request; return the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            self._next_slot = slot + 1.0 / self.rate
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return max(delay, 0.0)
+
+    # ------------- FEEDBACK -------------
+
+    def record(self, latency: float, status: Optional[int] = None, error: bool = False,
+               retry_after: Optional[float] = None):
+        """
+        Feed back the outcome of one request.
+
+        Parameters:
+            latency (float): Seconds the request took.
+            status (int): HTTP status, if a response was received.
+            error (bool): True for network errors and timeouts.
+            retry_after (float): Seconds from a Retry-After header.
+        """
+        with self._lock:
+            now = time.monotonic()
+            average = self._latency_avg
+            self._latency_avg = latency if average is None else 0.8 * average + 0.2 * latency
+
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+            reason = None
+            if error:
+                reason = "error"
+            elif status in RETRY_STATUSES:
+                reason = f"HTTP {status}"
+            elif latency > self.latency_target or (average and latency > self.spike_factor * average):
+                reason = f"slow response ({latency:.2f}s)"
+
+            if reason:
+                self._healthy_streak = 0
+                # In-flight requests fail together: back off once per interval
+                if now - self._last_decrease >= max(1.0, 1.0 / self.rate):
+                    self._last_decrease = now
+                    self._set_rate(self.rate * self.decrease, reason)
+                return
+
+            self._healthy_streak += 1
+            if self._healthy_streak >= self.increase_every:
+                self._healthy_streak = 0
+                self._set_rate(self.rate + self.increase, None)
+
+    def _set_rate(self, rate: float, reason: Optional[str]):
+        rate = min(self.max_rate, max(self.min_rate, rate))
+        if rate == self.rate:
+            return
+        previous, self.rate = self.rate, rate
+        if reason:
+            print(f"⚠️ [{self.name}] {reason}: rate {previous:.2f} → {rate:.2f} req/s")
+        elif int(rate) != int(previous):
+            print(f"[{self.name}] rate {previous:.2f} → {rate:.2f} req/s")
+        self._publish()
+
+    def _publish(self):
+        if self.metrics is not None:
+            self.metrics.set_gauge("rate_limit_rps", self.rate, client=self.name)
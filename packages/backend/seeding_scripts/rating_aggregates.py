@@ -0,0 +1,386 @@
+"""
+Clinic Rating Aggregates
+------------------------
+
+Keeps `clinics.rating` consistent with the `reviews` table without
+rescanning it (see migrations/add_clinic_rating_aggregates.sql):
+
+    - `clinic_rating_aggregates` holds the running review count and rating
+      sum of every reviewed clinic;
+    - `rating_aggregate_state` holds the watermark (last counted review_id)
+      and the prior of the smoothing;
+    - `clinics.rating` gets the Bayesian-smoothed average
+      (prior_weight * prior_mean + sum) / (prior_weight + count), so two
+      5-star reviews do not outrank two hundred 4.8s, and rating-sorted
+      listings read an indexed column.
+
+A run reads only the reviews past the watermark, adds them to the totals
+of the clinics they name and rewrites those clinics' ratings. The prior
+mean is the mean of all counted reviews; once it drifts by more than
+PRIOR_DRIFT, every reviewed clinic is re-smoothed from the stored totals
+(still without reading the reviews).
+
+Reviews are taken in review_id order up to the first one younger than
+SETTLE_SECONDS: IDs are handed out at insert time, so a review whose
+transaction is still open can get a lower ID than one already visible.
+Edited or deleted reviews are not seen by incremental runs; `--verify`
+recounts everything up to the watermark and reports drift, `--rebuild`
+recounts and rewrites. Clinics without reviews keep their rating (e.g.
+from Google Places).
+
+Usage:
+    python rating_aggregates.py
+    python rating_aggregates.py --verify
+    python rating_aggregates.py --rebuild --prior-weight 20
+"""
+
+import argparse
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from seed_supabase import get_supabase_client
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+PRIOR_WEIGHT = 10.0  # the prior counts as this many reviews at the global mean
+PRIOR_DRIFT = 0.02  # re-smooth every clinic once the global mean moves this far
+SETTLE_SECONDS = 60  # younger reviews wait for the next run
+PAGE_SIZE = 1000
+WRITE_BATCH_SIZE = 500
+RATING_DECIMALS = 2
+
+Totals = Dict[int, Tuple[int, int]]  # clinic_id → (review_count, rating_sum)
+
+
+# ============================================================
+# --- READING ---
+# ============================================================
+
+class ReviewBatch:
+    """Reviews read in review_id order, as parallel arrays."""
+
+    def __init__(self, review_ids: np.ndarray, clinic_ids: np.ndarray, ratings: np.ndarray,
+                 last_created_at: Optional[str] = None):
+        self.review_ids = review_ids
+        self.clinic_ids = clinic_ids
+        self.ratings = ratings
+        self.last_created_at = last_created_at
+
+    def __len__(self) -> int:
+        return len(self.review_ids)
+
+    @property
+    def last_review_id(self) -> Optional[int]:
+        return int(self.review_ids[-1]) if len(self.review_ids) else None
+
+    def totals(self, after: Optional[Dict[int, int]] = None) -> Totals:
+        """
+        Review count and rating sum per clinic.
+
+        Parameters:
+            after (dict): clinic_id → review_id already counted for that
+                clinic; only later reviews of the clinic are added.
+        """
+        clinic_ids, ratings = self.clinic_ids, self.ratings
+        if after:
+            floor = np.array([after.get(c, 0) for c in clinic_ids.tolist()], dtype=np.int64)
+            keep = self.review_ids > floor
+            clinic_ids, ratings = clinic_ids[keep], ratings[keep]
+        clinics, inverse = np.unique(clinic_ids, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(clinics))
+        sums = np.bincount(inverse, weights=ratings, minlength=len(clinics))
+        return {c: (n, int(s)) for c, n, s in zip(clinics.tolist(), counts.tolist(), sums.tolist())}
+
+
+def iter_review_pages(supabase, after_id: int = 0, upto_id: Optional[int] = None,
+                      page_size: int = PAGE_SIZE) -> Iterator[List[Dict]]:
+    """Yield the reviews with after_id < review_id [<= upto_id] in review_id order (keyset pagination)."""
+    while True:
+        query = supabase.table("reviews").select("review_id,clinic_id,rating,created_at").gt("review_id", after_id)
+        if upto_id is not None:
+            query = query.lte("review_id", upto_id)
+        page = query.order("review_id").limit(page_size).execute().data
+        if not page:
+            return
+        yield page
+        after_id = page[-1]["review_id"]
+
+
+def read_reviews(supabase, after_id: int = 0, upto_id: Optional[int] = None,
+                 settle_before: Optional[datetime] = None) -> ReviewBatch:
+    """
+    Read reviews past `after_id`, stopping before the first one created
+    at or after `settle_before` (when given).
+    """
+    review_ids, clinic_ids, ratings = [], [], []
+    last_created_at = None
+    settled = True
+    for page in iter_review_pages(supabase, after_id, upto_id):
+        for row in page:
+            created_at = row.get("created_at")
+            if settle_before is not None and created_at and datetime.fromisoformat(created_at) >= settle_before:
+                settled = False
+                break
+            review_ids.append(row["review_id"])
+            clinic_ids.append(row["clinic_id"])
+            ratings.append(row["rating"])
+            last_created_at = created_at
+        if not settled:
+            break
+    return ReviewBatch(np.array(review_ids, dtype=np.int64), np.array(clinic_ids, dtype=np.int64),
+                       np.array(ratings, dtype=np.int64), last_created_at)
+
+
+def load_state(supabase) -> Optional[Dict]:
+    """The job's state row, or None before the first run."""
+    rows = supabase.table("rating_aggregate_state").select("*").eq("id", True).limit(1).execute().data
+    return rows[0] if rows else None
+
+
+def load_aggregates(supabase, clinic_ids: Optional[List[int]] = None) -> Dict[int, Dict]:
+    """Stored aggregate rows keyed by clinic_id: all of them, or those of `clinic_ids`."""
+    columns = "clinic_id,review_count,rating_sum,last_review_id"
+    stored = {}
+    if clinic_ids is None:
+        after_id = 0
+        while True:
+            page = (supabase.table("clinic_rating_aggregates").select(columns)
+                    .gt("clinic_id", after_id).order("clinic_id").limit(PAGE_SIZE).execute().data)
+            if not page:
+                return stored
+            stored.update((row["clinic_id"], row) for row in page)
+            after_id = page[-1]["clinic_id"]
+    for start in range(0, len(clinic_ids), WRITE_BATCH_SIZE):
+        batch = clinic_ids[start:start + WRITE_BATCH_SIZE]
+        rows = supabase.table("clinic_rating_aggregates").select(columns).in_("clinic_id", batch).execute().data
+        stored.update((row["clinic_id"], row) for row in rows)
+    return stored
+
+
+def load_clinic_ratings(supabase, clinic_ids: List[int]) -> Dict[int, Optional[float]]:
+    """Current `clinics.rating` of the given clinics."""
+    ratings = {}
+    for start in range(0, len(clinic_ids), WRITE_BATCH_SIZE):
+        batch = clinic_ids[start:start + WRITE_BATCH_SIZE]
+        rows = supabase.table("clinics").select("clinic_id,rating").in_("clinic_id", batch).execute().data
+        ratings.update((row["clinic_id"], row["rating"]) for row in rows)
+    return ratings
+
+
+# ============================================================
+# --- SMOOTHING ---
+# ============================================================
+
+def smoothed_ratings(totals: Totals, prior_mean: float, prior_weight: float = PRIOR_WEIGHT) -> Dict[int, float]:
+    """Bayesian average of every clinic in `totals`, rounded to RATING_DECIMALS."""
+    if not totals:
+        return {}
+    counts, sums = np.array(list(totals.values()), dtype=np.float64).T
+    ratings = np.round((prior_weight * prior_mean + sums) / (prior_weight + counts), RATING_DECIMALS)
+    return dict(zip(totals.keys(), ratings.tolist()))
+
+
+# ============================================================
+# --- WRITING ---
+# ============================================================
+
+def write_aggregates(supabase, totals: Totals, last_review_id: int, batch_size: int = WRITE_BATCH_SIZE):
+    """Upsert the totals of the given clinics, stamped with the review_id they include."""
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [{"clinic_id": cid, "review_count": count, "rating_sum": total, "last_review_id": last_review_id,
+             "updated_at": now} for cid, (count, total) in totals.items()]
+    for start in range(0, len(rows), batch_size):
+        supabase.table("clinic_rating_aggregates").upsert(rows[start:start + batch_size],
+                                                          on_conflict="clinic_id").execute()
+
+
+def write_ratings(supabase, ratings: Dict[int, Optional[float]], batch_size: int = WRITE_BATCH_SIZE):
+    """
+    Set `clinics.rating`. Ratings are rounded, so clinics sharing a value
+    are updated together: one request per distinct rating and batch
+    instead of one per clinic.
+    """
+    by_rating = defaultdict(list)
+    for cid, rating in ratings.items():
+        by_rating[rating].append(cid)
+    for rating, clinic_ids in by_rating.items():
+        for start in range(0, len(clinic_ids), batch_size):
+            supabase.table("clinics").update({"rating": rating}).in_(
+                "clinic_id", clinic_ids[start:start + batch_size]).execute()
+
+
+def write_state(supabase, last_review_id: int, last_created_at: Optional[str], review_count: int,
+                rating_sum: int, prior_mean: float, prior_weight: float):
+    supabase.table("rating_aggregate_state").upsert({
+        "id": True, "last_review_id": last_review_id, "last_created_at": last_created_at,
+        "review_count": review_count, "rating_sum": rating_sum, "prior_mean": prior_mean,
+        "prior_weight": prior_weight, "updated_at": datetime.now(timezone.utc).isoformat(),
+    }, on_conflict="id").execute()
+
+
+# ============================================================
+# --- AGGREGATION ---
+# ============================================================
+
+def _grand_totals(totals: Totals) -> Tuple[int, int]:
+    return sum(count for count, _ in totals.values()), sum(total for _, total in totals.values())
+
+
+def rebuild_rating_aggregates(supabase, prior_weight: float = PRIOR_WEIGHT, settle_seconds: float = SETTLE_SECONDS,
+                              dry_run: bool = False) -> dict:
+    """Recount every settled review and rewrite the aggregates, ratings and state."""
+    started = time.perf_counter()
+    batch = read_reviews(supabase, settle_before=datetime.now(timezone.utc) - timedelta(seconds=settle_seconds))
+    totals = batch.totals()
+    review_count, rating_sum = _grand_totals(totals)
+    prior_mean = rating_sum / review_count if review_count else 0.0
+    stale = [cid for cid in load_aggregates(supabase) if cid not in totals]
+    print(f"Counted {len(batch)} reviews of {len(totals)} clinics in {time.perf_counter() - started:.1f}s")
+
+    ratings = smoothed_ratings(totals, prior_mean, prior_weight)
+    if not dry_run:
+        last_review_id = batch.last_review_id or 0
+        write_aggregates(supabase, totals, last_review_id)
+        for start in range(0, len(stale), WRITE_BATCH_SIZE):
+            supabase.table("clinic_rating_aggregates").delete().in_(
+                "clinic_id", stale[start:start + WRITE_BATCH_SIZE]).execute()
+        # Clinics whose reviews are all gone lose their review-based rating
+        write_ratings(supabase, {**ratings, **{cid: None for cid in stale}})
+        write_state(supabase, last_review_id, batch.last_created_at, review_count, rating_sum,
+                    prior_mean, prior_weight)
+
+    print(f"✅ Rebuilt {len(totals)} clinic aggregates (prior mean {prior_mean:.3f}), removed {len(stale)} "
+          f"in {time.perf_counter() - started:.1f}s{' [dry run]' if dry_run else ''}")
+    return {"reviews": len(batch), "clinics": len(totals), "rated": len(ratings), "removed": len(stale)}
+
+
+def refresh_rating_aggregates(supabase, settle_seconds: float = SETTLE_SECONDS, dry_run: bool = False,
+                              prior_weight: Optional[float] = None) -> dict:
+    """
+    Count the reviews past the watermark into the stored aggregates (a
+    rebuild on the first run).
+
+    Parameters:
+        supabase: Supabase client.
+        settle_seconds (float): Reviews younger than this wait for the next run.
+        dry_run (bool): Compute but do not write.
+        prior_weight (float): New prior weight; re-smooths every clinic.
+
+    Returns:
+        dict: Counts of new reviews, clinics updated and clinics re-rated.
+    """
+    state = load_state(supabase)
+    if state is None:
+        print("No aggregation state yet, rebuilding")
+        return rebuild_rating_aggregates(supabase, prior_weight or PRIOR_WEIGHT, settle_seconds, dry_run)
+
+    started = time.perf_counter()
+    batch = read_reviews(supabase, after_id=state["last_review_id"],
+                         settle_before=datetime.now(timezone.utc) - timedelta(seconds=settle_seconds))
+    resmooth = prior_weight is not None and prior_weight != state["prior_weight"]
+    if not len(batch) and not resmooth:
+        print(f"✅ No new reviews after review_id {state['last_review_id']}")
+        return {"reviews": 0, "clinics": 0, "rated": 0}
+
+    # A row stamped past the watermark already holds some of these reviews (a crashed run)
+    touched = sorted(set(batch.clinic_ids.tolist()))
+    stored = load_aggregates(supabase, touched)
+    added = batch.totals(after={cid: row["last_review_id"] for cid, row in stored.items()
+                                if row["last_review_id"] > state["last_review_id"]})
+    updated = {}
+    for cid in touched:
+        row = stored.get(cid, {"review_count": 0, "rating_sum": 0})
+        count, total = added.get(cid, (0, 0))
+        updated[cid] = (row["review_count"] + count, row["rating_sum"] + total)
+
+    batch_count, batch_sum = int(len(batch)), int(batch.ratings.sum())
+    review_count, rating_sum = state["review_count"] + batch_count, state["rating_sum"] + batch_sum
+    prior_weight = prior_weight if prior_weight is not None else state["prior_weight"]
+    prior_mean = state["prior_mean"]
+    mean = rating_sum / review_count if review_count else 0.0
+    if abs(mean - prior_mean) > PRIOR_DRIFT or resmooth:
+        # Every rating depends on the prior: re-smooth all clinics from their stored totals
+        prior_mean = mean
+        rerate = {cid: (row["review_count"], row["rating_sum"]) for cid, row in load_aggregates(supabase).items()}
+        rerate.update(updated)
+    else:
+        rerate = updated
+    ratings = smoothed_ratings(rerate, prior_mean, prior_weight)
+    print(f"Counted {len(batch)} new reviews of {len(updated)} clinics in {time.perf_counter() - started:.2f}s")
+
+    if not dry_run:
+        last_review_id = batch.last_review_id or state["last_review_id"]
+        write_aggregates(supabase, updated, last_review_id)
+        write_ratings(supabase, ratings)
+        write_state(supabase, last_review_id, batch.last_created_at or state["last_created_at"],
+                    review_count, rating_sum, prior_mean, prior_weight)
+
+    print(f"✅ {len(updated)} clinic aggregates updated, {len(ratings)} ratings written"
+          f"{' (re-smoothed, prior mean %.3f)' % prior_mean if rerate is not updated else ''} "
+          f"in {time.perf_counter() - started:.2f}s{' [dry run]' if dry_run else ''}")
+    return {"reviews": len(batch), "clinics": len(updated), "rated": len(ratings)}
+
+
+def verify_rating_aggregates(supabase) -> dict:
+    """
+    Recount the reviews up to the watermark and compare with the stored
+    aggregates and clinic ratings. Nothing is written.
+
+    Returns:
+        dict: Clinics checked and the clinic_ids of every mismatch.
+    """
+    state = load_state(supabase)
+    if state is None:
+        raise RuntimeError("No aggregation state: run rating_aggregates.py first")
+    started = time.perf_counter()
+    totals = read_reviews(supabase, upto_id=state["last_review_id"]).totals()
+    stored = load_aggregates(supabase)
+
+    stored_totals = {cid: (row["review_count"], row["rating_sum"]) for cid, row in stored.items()}
+    wrong_totals = sorted(cid for cid in set(totals) | set(stored_totals) if totals.get(cid) != stored_totals.get(cid))
+    expected = smoothed_ratings(totals, state["prior_mean"], state["prior_weight"])
+    current = load_clinic_ratings(supabase, list(expected))
+    wrong_ratings = sorted(cid for cid, rating in expected.items()
+                           if current.get(cid) is None or abs(float(current[cid]) - rating) > 10 ** -RATING_DECIMALS / 2)
+    review_count, rating_sum = _grand_totals(totals)
+    state_ok = (review_count, rating_sum) == (state["review_count"], state["rating_sum"])
+
+    status = "✅" if not wrong_totals and not wrong_ratings and state_ok else "❌"
+    print(f"{status} {len(totals)} reviewed clinics checked in {time.perf_counter() - started:.1f}s: "
+          f"{len(wrong_totals)} wrong aggregates, {len(wrong_ratings)} wrong ratings, "
+          f"state totals {'match' if state_ok else 'differ'}")
+    return {"clinics": len(totals), "wrong_totals": wrong_totals, "wrong_ratings": wrong_ratings,
+            "state_ok": state_ok}
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain clinic rating aggregates from the reviews table.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--rebuild", action="store_true", help="Recount every review and rewrite all aggregates")
+    mode.add_argument("--verify", action="store_true", help="Recount and compare with the stored aggregates")
+    parser.add_argument("--prior-weight", type=float, help=f"Weight of the prior mean in reviews "
+                        f"(default: stored value, or {PRIOR_WEIGHT:g} on a rebuild)")
+    parser.add_argument("--settle-seconds", type=float, default=SETTLE_SECONDS,
+                        help="Leave reviews younger than this for the next run")
+    parser.add_argument("--dry-run", action="store_true", help="Compute without writing to Supabase")
+    args = parser.parse_args()
+
+    client = get_supabase_client()
+    if args.verify:
+        result = verify_rating_aggregates(client)
+        sys.exit(1 if result["wrong_totals"] or result["wrong_ratings"] or not result["state_ok"] else 0)
+    elif args.rebuild:
+        rebuild_rating_aggregates(client, args.prior_weight or PRIOR_WEIGHT, args.settle_seconds, args.dry_run)
+    else:
+        refresh_rating_aggregates(client, args.settle_seconds, args.dry_run, args.prior_weight)
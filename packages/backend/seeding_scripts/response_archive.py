@@ -0,0 +1,270 @@
+"""
+Raw Response Archive
+--------------------
+
+A local, content-addressed store of the raw HTTP responses fetched by the
+scraper, so facility pages can be re-parsed after `extract_facility_details`
+changes without crawling KMHFL again.
+
+The archive is one SQLite file:
+
+    blobs      sha256 → zlib-compressed body (identical bodies stored once)
+    responses  url → sha256, status, content type, encoding, fetch time
+
+`webscrapping.py --archive PATH --archive-mode record` stores every response
+it fetches (and every Google Places lookup result, which later runs then
+reuse instead of calling Google again); `--archive-mode replay` serves them
+from the archive with no network I/O and no politeness delays.
+`reparse` rebuilds the detail file from the archived pages directly.
+
+Usage:
+    python response_archive.py stats --archive kmhfl_responses.sqlite
+    python response_archive.py reparse --archive kmhfl_responses.sqlite --processes 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Iterator, Optional, Tuple
+
+import requests
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+ARCHIVE_FILE = os.path.join(os.path.dirname(__file__), "kmhfl_responses.sqlite")
+COMPRESSION_LEVEL = 6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    data   BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS responses (
+    url          TEXT PRIMARY KEY,
+    sha256       TEXT NOT NULL REFERENCES blobs (sha256),
+    status       INTEGER NOT NULL,
+    content_type TEXT,
+    encoding     TEXT,
+    fetched_at   REAL NOT NULL
+);
+"""
+
+
+class ArchiveMiss(requests.exceptions.RequestException):
+    """Raised in replay mode for a URL that was never archived."""
+
+
+class ArchivedResponse:
+    """
+    The parts of `requests.Response` the scraper uses, served from the archive.
+    """
+
+    def __init__(self, url: str, content: bytes, status_code: int = 200,
+                 content_type: Optional[str] = None, encoding: Optional[str] = None):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.encoding = encoding or "utf-8"
+        self.headers = {"Content-Type": content_type} if content_type else {}
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} for url: {self.url} (archived)")
+
+
+# ============================================================
+# --- ARCHIVE ---
+# ============================================================
+
+class ResponseArchive:
+    """
+    SQLite-backed response store, safe to share between threads.
+
+    Parameters:
+        path (str): Archive file (created if missing).
+    """
+
+    def __init__(self, path: str = ARCHIVE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def put(self, url: str, content: bytes, status: int = 200,
+            content_type: Optional[str] = None, encoding: Optional[str] = None) -> str:
+        """Store a response body for `url` (replacing any previous one) and return its hash."""
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO blobs (sha256, data) VALUES (?, ?)",
+                (digest, zlib.compress(content, COMPRESSION_LEVEL)),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, sha256, status, content_type, encoding, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, digest, status, content_type, encoding, time.time()),
+            )
+        return digest
+
+    def put_response(self, response: requests.Response) -> str:
+        """Store a live `requests` response under its request URL."""
+        return self.put(response.request.url if response.request else response.url, response.content,
+                        response.status_code, response.headers.get("Content-Type"), response.encoding)
+
+    def get(self, url: str) -> Optional[ArchivedResponse]:
+        """Return the archived response for `url`, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT b.data, r.status, r.content_type, r.encoding FROM responses r "
+                "JOIN blobs b ON b.sha256 = r.sha256 WHERE r.url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        data, status, content_type, encoding = row
+        return ArchivedResponse(url, zlib.decompress(data), status, content_type, encoding)
+
+    def put_json(self, key: str, value) -> str:
+        """Store a JSON-serialisable result (e.g. a Google lookup) under a pseudo-URL key."""
+        return self.put(key, json.dumps(value, ensure_ascii=False).encode("utf-8"), content_type="application/json")
+
+    def get_json(self, key: str) -> Tuple[bool, object]:
+        """Return (found, value) for a key stored with `put_json`."""
+        archived = self.get(key)
+        return (False, None) if archived is None else (True, archived.json())
+
+    def iter_urls(self, prefix: str = "") -> Iterator[str]:
+        """Yield archived URLs starting with `prefix`, in URL order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url FROM responses WHERE substr(url, 1, ?) = ? ORDER BY url", (len(prefix), prefix),
+            ).fetchall()
+        for (url,) in rows:
+            yield url
+
+    def stats(self) -> dict:
+        with self._lock:
+            responses, blobs, stored = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM responses), COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM blobs"
+            ).fetchone()
+        return {"responses": responses, "unique_bodies": blobs, "stored_bytes": stored,
+                "file_bytes": os.path.getsize(self.path)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============================================================
+# --- REPARSE ---
+# ============================================================
+
+def reparse_detail_pages(archive: ResponseArchive, output_file: str, processes: int = 0,
+                         google_data: bool = True) -> int:
+    """
+    Rebuild the detail file from archived facility pages, with no network I/O.
+
+    Parameters:
+        archive (ResponseArchive): Archive recorded by a previous crawl.
+        output_file (str): Detail file to write (.gz / .zst compress it).
+        processes (int): Parse in a process pool of this size (0 = in process).
+        google_data (bool): Merge archived Google lookups into the records.
+
+    Returns:
+        int: Number of records written.
+    """
+    import webscrapping
+    from parse_pool import ParsePool
+
+    previous = webscrapping.ARCHIVE, webscrapping.ARCHIVE_MODE
+    webscrapping.ARCHIVE, webscrapping.ARCHIVE_MODE = archive, "replay"
+    urls = list(archive.iter_urls(webscrapping.DETAIL_API_BASE_URL))
+    pages = (archive.get(url).content for url in urls)
+
+    webscrapping.start_stream(output_file)
+    written = 0
+    try:
+        if processes:
+            with ParsePool(processes) as pool:
+                results = list(pool.map(pages))
+        else:
+            results = (_parse_or_error(webscrapping, page) for page in pages)
+
+        for url, (record, error) in zip(urls, results):
+            if error:
+                print(f"❌ Parsing error for {url}: {error}")
+                continue
+            if google_data and record.get("name"):
+                google_place_data = webscrapping.google_find_place(record["name"])
+                if google_place_data:
+                    record.update(google_place_data)
+            webscrapping.append_stream(output_file, record, is_first_entry=written == 0)
+            written += 1
+    finally:
+        webscrapping.end_stream(output_file)
+        webscrapping.ARCHIVE, webscrapping.ARCHIVE_MODE = previous
+
+    print(f"✅ Re-parsed {written} of {len(urls)} archived pages into {output_file}")
+    return written
+
+
+def _parse_or_error(webscrapping, page):
+    try:
+        return webscrapping.parse_facility_page(page), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or replay the raw response archive.")
+    parser.add_argument("--archive", default=ARCHIVE_FILE, help="Archive file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show archive size and deduplication")
+    reparse_parser = subparsers.add_parser("reparse", help="Rebuild the detail file from archived pages")
+    reparse_parser.add_argument("--output", help="Detail file (default: the scraper's detail output)")
+    reparse_parser.add_argument("--processes", type=int, default=0, help="Parse in a process pool of this size")
+    reparse_parser.add_argument("--no-google", action="store_true", help="Do not merge archived Google lookups")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.archive):
+        raise SystemExit(f"Archive '{args.archive}' not found.")
+
+    with ResponseArchive(args.archive) as archive:
+        if args.command == "stats":
+            stats = archive.stats()
+            print(f"{stats['responses']} responses, {stats['unique_bodies']} unique bodies, "
+                  f"{stats['stored_bytes'] / 1024 / 1024:.1f} MB compressed "
+                  f"({stats['file_bytes'] / 1024 / 1024:.1f} MB file)")
+        else:
+            import webscrapping
+            started = time.perf_counter()
+            count = reparse_detail_pages(archive, args.output or webscrapping.DETAIL_OUTPUT_FILE,
+                                         args.processes, google_data=not args.no_google)
+            elapsed = time.perf_counter() - started
+            print(f"{count / elapsed if elapsed else 0:.0f} pages/s")
@@ -0,0 +1,324 @@
+"""
+Seeding Orchestrator
+--------------------
+
+Runs table seeders as a dependency graph instead of one blocking insert
+per table in a fixed order:
+
+    users ─────┐
+               ├─▶ appointments
+    clinics ───┤
+               └─▶ reviews
+
+    - every table has a producer thread generating its rows and a pool of
+      chunk workers inserting them (`chunk_size` rows per insert), so
+      independent tables (users, clinics) load concurrently;
+    - inserted IDs are published batch by batch; a dependent table starts
+      as soon as its parents have IDs and draws its foreign keys from
+      the IDs available so far (`SeedContext.parent_ids`), waiting only
+      until each parent is as far along as the child itself, so keys
+      stay spread over the whole parent table;
+    - a chunk the database rejects is retried row by row so one bad row
+      does not drop the rest;
+    - a rows/sec summary per table is printed at the end.
+
+See `seed_supabase.py` for the MediMap tables.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from collections.abc import Sequence
+from typing import Callable, Dict, Iterator, List, Optional
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_WORKERS = 4
+
+InsertRows = Callable[[str, str, List[dict]], List[int]]  # (table, id_column, rows) → inserted IDs
+
+
+class ParentFailed(RuntimeError):
+    """Raised to a dependent table's producer when a parent table failed."""
+
+
+@dataclass
+class SeedTable:
+    """
+    One table in the seeding graph.
+
+    Parameters:
+        name (str): Table name.
+        id_column (str): Primary key returned by inserts.
+        rows (callable): `rows(context)` yields the rows to insert.
+        depends_on (tuple): Tables whose IDs `rows` reads.
+        prepare (callable): Optional per-chunk transform run in the chunk
+            workers (e.g. password hashing), keeping the producer cheap.
+        chunk_size (int): Rows per insert.
+        workers (int): Concurrent chunk inserts.
+    """
+    name: str
+    id_column: str
+    rows: Callable[["SeedContext"], Iterator[dict]]
+    depends_on: Sequence[str] = ()
+    prepare: Optional[Callable[[List[dict]], List[dict]]] = None
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    workers: int = DEFAULT_WORKERS
+
+
+@dataclass
+class TableStats:
+    name: str
+    rows: int = 0
+    chunks: int = 0
+    failed_rows: int = 0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    error: Optional[str] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def rows_per_second(self) -> float:
+        elapsed = (self.finished or time.perf_counter()) - self.started if self.started else 0.0
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        elapsed = (self.finished - self.started) if self.started and self.finished else 0.0
+        status = f"FAILED: {self.error}" if self.error else f"{self.failed_rows} rows rejected"
+        return (f"{self.name:<14} rows={self.rows:<8} chunks={self.chunks:<5} {elapsed:7.2f}s "
+                f"{self.rows_per_second():10.1f} rows/s  {status}")
+
+
+# ============================================================
+# --- ID REGISTRY ---
+# ============================================================
+
+class SeedContext:
+    """
+    IDs published by each table so far, shared by all producers.
+
+    Tables may announce how many rows they expect (`expect`), which lets a
+    child wait until every parent is proportionally as far along as itself.
+    """
+
+    def __init__(self, supabase, tables: Sequence[str], insert: Optional[InsertRows] = None):
+        self.supabase = supabase
+        self.insert = insert or postgrest_insert(supabase)
+        self._ids: Dict[str, List[int]] = {name: [] for name in tables}
+        self._expected: Dict[str, Optional[int]] = {name: None for name in tables}
+        self._done: Dict[str, bool] = {name: False for name in tables}
+        self._failed: Dict[str, bool] = {name: False for name in tables}
+        self._condition = threading.Condition()
+
+    def expect(self, table: str, count: int):
+        with self._condition:
+            self._expected[table] = count
+            self._condition.notify_all()
+
+    def publish(self, table: str, ids: Sequence[int]):
+        with self._condition:
+            self._ids[table].extend(ids)
+            self._condition.notify_all()
+
+    def finish(self, table: str, failed: bool = False):
+        with self._condition:
+            self._done[table] = True
+            self._failed[table] = failed
+            self._condition.notify_all()
+
+    def ids(self, table: str) -> List[int]:
+        """Every ID the table has published (complete once the table is done)."""
+        with self._condition:
+            return list(self._ids[table])
+
+    def _ready(self, table: str, progress: float) -> bool:
+        if self._done[table]:
+            return True
+        expected = self._expected[table]
+        if expected is None or not self._ids[table]:
+            return False
+        return len(self._ids[table]) >= min(progress, 1.0) * expected
+
+    def parent_ids(self, tables: Sequence[str], progress: float = 0.0) -> Dict[str, "IdView"]:
+        """
+        Block until each parent table has published IDs and is at least
+        `progress` (0..1) of the way through, then return their IDs so far.
+
+        Raises:
+            ParentFailed: If a parent failed or finished without any IDs.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: all(self._ready(t, progress) for t in tables))
+            for table in tables:
+                if self._failed[table] or not self._ids[table]:
+                    raise ParentFailed(f"parent table '{table}' {'failed' if self._failed[table] else 'is empty'}")
+            return {table: IdView(self._ids[table], len(self._ids[table])) for table in tables}
+
+    def finished_ids(self, tables: Sequence[str]) -> Dict[str, List[int]]:
+        """
+        Block until each table is done, then return all of its IDs (for
+        rows that need the complete parent table, not a growing pool).
+
+        Raises:
+            ParentFailed: If a table failed.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: all(self._done[t] for t in tables))
+            for table in tables:
+                if self._failed[table]:
+                    raise ParentFailed(f"parent table '{table}' failed")
+            return {table: list(self._ids[table]) for table in tables}
+
+
+class IdView(Sequence):
+    """
+    The first `length` IDs of a growing ID list, without copying it
+    (ID lists are only ever appended to). Works with `random.choice`.
+    """
+
+    def __init__(self, ids: List[int], length: int):
+        self._ids = ids
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._ids[:self._length][index]
+        if not -self._length <= index < self._length:
+            raise IndexError("ID view index out of range")
+        return self._ids[index % self._length]
+
+
+# ============================================================
+# --- EXECUTION ---
+# ============================================================
+
+def postgrest_insert(supabase) -> InsertRows:
+    """Insert through the Supabase (PostgREST) JSON API, one request per chunk."""
+    def insert(table: str, id_column: str, rows: List[dict]) -> List[int]:
+        return [row[id_column] for row in supabase.table(table).insert(rows).execute().data]
+    return insert
+
+
+def _insert_chunk(context: "SeedContext", table: SeedTable, rows: List[dict], stats: TableStats) -> List[int]:
+    """Insert one chunk and return its IDs; a rejected chunk is retried row by row."""
+    if table.prepare is not None:
+        rows = table.prepare(rows)
+    try:
+        ids = context.insert(table.name, table.id_column, rows)
+    except Exception as e:
+        print(f"⚠️ [{table.name}] chunk of {len(rows)} rejected ({e}), retrying row by row")
+        ids = []
+        for row in rows:
+            try:
+                ids += context.insert(table.name, table.id_column, [row])
+            except Exception as row_error:
+                print(f"❌ [{table.name}] row rejected: {row_error}")
+                with stats.lock:
+                    stats.failed_rows += 1
+    with stats.lock:
+        stats.rows += len(ids)
+        stats.chunks += 1
+    return ids
+
+
+def _run_table(context: SeedContext, table: SeedTable, stats: TableStats):
+    """Producer thread of one table: batch its rows and feed its chunk workers."""
+    in_flight = threading.BoundedSemaphore(table.workers * 2)  # backpressure on the producer
+    failed = False
+
+    def submit(pool, chunk):
+        in_flight.acquire()
+        future = pool.submit(_insert_chunk, context, table, chunk, stats)
+        future.add_done_callback(lambda f: (in_flight.release(), f.exception() or context.publish(table.name, f.result())))
+        return future
+
+    futures = []
+    try:
+        with ThreadPoolExecutor(max_workers=table.workers, thread_name_prefix=f"seed-{table.name}") as pool:
+            chunk = []
+            for row in table.rows(context):
+                if stats.started is None:
+                    stats.started = time.perf_counter()
+                chunk.append(row)
+                if len(chunk) >= table.chunk_size:
+                    futures.append(submit(pool, chunk))
+                    chunk = []
+            if chunk:
+                futures.append(submit(pool, chunk))
+        for future in futures:
+            future.result()
+    except Exception as e:
+        failed = True
+        stats.error = f"{type(e).__name__}: {e}"
+        print(f"❌ [{table.name}] {stats.error}")
+    finally:
+        stats.started = stats.started or time.perf_counter()
+        stats.finished = time.perf_counter()
+        context.finish(table.name, failed=failed)
+
+
+def _check_graph(tables: Sequence[SeedTable]):
+    names = {t.name for t in tables}
+    for table in tables:
+        missing = set(table.depends_on) - names
+        if missing:
+            raise ValueError(f"Table '{table.name}' depends on unknown tables: {', '.join(sorted(missing))}")
+
+    # Kahn's algorithm: anything left over sits on a cycle
+    remaining = {t.name: set(t.depends_on) for t in tables}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Dependency cycle between: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def run_seed_plan(supabase, tables: Sequence[SeedTable], insert: Optional[InsertRows] = None) -> Dict[str, TableStats]:
+    """
+    Seed every table of the graph, each as soon as its parents allow.
+
+    Parameters:
+        supabase: Supabase client (shared by all workers).
+        tables: The graph; order does not matter.
+        insert (callable): Insert backend, `insert(table, id_column, rows)`
+            returning the new IDs (default: PostgREST through `supabase`;
+            see `pg_copy.PgCopyLoader` for direct COPY loading).
+
+    Returns:
+        dict: TableStats per table name.
+
+    Raises:
+        RuntimeError: If any table failed (after every table has stopped).
+    """
+    _check_graph(tables)
+    context = SeedContext(supabase, [t.name for t in tables], insert)
+    stats = {t.name: TableStats(t.name) for t in tables}
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=_run_table, args=(context, t, stats[t.name]), name=f"seed-{t.name}")
+               for t in tables]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(s.rows for s in stats.values())
+    print("\n--- Seeding summary ---")
+    for table in tables:
+        print(stats[table.name].summary())
+    print(f"{'total':<14} rows={total:<8} {elapsed:7.2f}s {total / elapsed if elapsed else 0:10.1f} rows/s")
+
+    failed = [name for name, s in stats.items() if s.error]
+    if failed:
+        raise RuntimeError(f"Seeding failed for: {', '.join(failed)}")
+    return stats
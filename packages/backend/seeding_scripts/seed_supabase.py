@@ -1,14 +1,35 @@
+from __future__ import annotations
+
+import argparse
 import os
 import random
-from datetime import date, time, timedelta, datetime
-from typing import List, Dict
+from datetime import date, datetime, time
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional
 import bcrypt, json
 
-from dotenv import load_dotenv
-from supabase import create_client, Client
+from seed_orchestrator import DEFAULT_WORKERS, SeedContext, SeedTable, run_seed_plan
+from stream_io import load_json
+
+if TYPE_CHECKING:
+	from supabase import Client
+	from appointment_slots import SlotBook
+	from service_taxonomy import ServiceTaxonomy, StoreRows
+
+# supabase, dotenv, name_matching and appointment_slots (numpy) are imported
+# on first use, so the row builders can be imported without them
+
+# Path to the scraper output
+DATA_PATH = "all_kmhfl_facilities_details.json"
+
+CHUNK_SIZE = 500  # rows per insert
+USER_CHUNK_SIZE = 20  # bcrypt takes ~0.3s per user: small chunks spread it over the workers
+PARENT_REFRESH_ROWS = 100  # dependent rows drawn per snapshot of the parent ID pools
 
 
 def get_supabase_client() -> Client:
+	from dotenv import load_dotenv
+	from supabase import create_client
+
 	load_dotenv()
 	url: str = os.environ.get("SUPABASE_URL")
 	key: str = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
@@ -17,112 +38,279 @@ def get_supabase_client() -> Client:
 	return create_client(url, key)
 
 
-def seed_users(supabase: Client, count: int = 10) -> List[int]:
+SEED_PASSWORD = "Password123!"
+
+
+def user_rows(count: int = 10) -> Iterator[Dict]:
+	"""Random `users` rows; passwords are hashed later by `hash_passwords`."""
 	first_names = [
 		"Alex", "Sam", "Jordan", "Taylor", "Chris", "Morgan", "Casey", "Riley", "Jamie", "Drew",
 	]
 	last_names = [
 		"Smith", "Johnson", "Williams", "Brown", "Jones", "Miller", "Davis", "Garcia", "Rodriguez", "Wilson",
 	]
-	users_payload: List[Dict] = []
+	stamp = int(datetime.utcnow().timestamp())
 	for i in range(count):
 		name = f"{random.choice(first_names)} {random.choice(last_names)}"
-		email = f"user{i+1}_{int(datetime.utcnow().timestamp())}@example.com"
-		hashed_password = bcrypt.hashpw("Password123!".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-		users_payload.append(
-			{
-				"name": name,
-				"email": email,
-				"password": hashed_password,
-				"phone": f"+1-555-01{str(i).zfill(2)}",
-				"role": "user",
-			}
-		)
+		yield {
+			"name": name,
+			"email": f"user{i+1}_{stamp}@example.com",
+			"password": SEED_PASSWORD,
+			"phone": f"+1-555-01{str(i).zfill(2)}",
+			"role": "user",
+		}
 
+
+def hash_passwords(rows: List[Dict]) -> List[Dict]:
+	"""bcrypt the plain seed passwords of a chunk of user rows (slow: run it in the chunk workers)."""
+	return [
+		dict(row, password=bcrypt.hashpw(row["password"].encode('utf-8'), bcrypt.gensalt()).decode('utf-8'))
+		for row in rows
+	]
+
+
+def hash_passwords_once(rows: List[Dict]) -> List[Dict]:
+	"""
+	Bulk-load variant of `hash_passwords`: one bcrypt hash per distinct
+	seed password, shared by the chunk (bcrypt per row would dominate a
+	load of millions of users).
+	"""
+	hashes: Dict[str, str] = {}
+	for password in {row["password"] for row in rows}:
+		hashes[password] = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+	return [dict(row, password=hashes[row["password"]]) for row in rows]
+
+
+def seed_users(supabase: Client, count: int = 10) -> List[int]:
+	users_payload = hash_passwords(list(user_rows(count)))
 	resp = supabase.table("users").insert(users_payload).execute()
 	# Supabase Python client returns dict-like with data list
 	inserted = resp.data if hasattr(resp, "data") else resp["data"]
 	return [row["user_id"] for row in inserted]
 
 
+def transform_facility(record: Dict) -> Dict:
+	"""Convert a scraped facility detail record into a `clinics` table row."""
+	name = record.get("name")
+	contact = (record.get("contacts") or [None])[0]  # take first phone number if any
+	coords = record.get("coordinates") or [None, None]
+	latitude, longitude = coords if len(coords) == 2 else (None, None)
+
+	# join service names into a comma-separated string
+	services = ", ".join([s["service"] for s in record.get("services", []) if s.get("service")])
+
+	return {
+		"name": name,
+		"address": f"{record.get('ward', '')}, {record.get('sub_county', '')}, {record.get('county', '')}".strip(", "),
+		"latitude": latitude,
+		"longitude": longitude,
+		"services": services,
+		"consultation_fee": None,
+		"contact": contact,
+	}
+
+
+def load_existing_clinics(supabase: Client, page_size: int = 1000) -> List[Dict]:
+	"""Names and addresses of every clinic already in the table (keyset pagination)."""
+	clinics: List[Dict] = []
+	after_id = 0
+	while True:
+		page = (
+			supabase.table("clinics")
+			.select("clinic_id,name,address")
+			.gt("clinic_id", after_id)
+			.order("clinic_id")
+			.limit(page_size)
+			.execute()
+			.data
+		)
+		if not page:
+			return clinics
+		clinics += page
+		after_id = page[-1]["clinic_id"]
+
+
+def clinic_rows(supabase: Optional[Client], data_path: str = DATA_PATH,
+				expect: Optional[Callable[[int], None]] = None,
+				on_existing: Optional[Callable[[int], None]] = None,
+				existing: Optional[List[Dict]] = None) -> Iterator[Dict]:
+	"""
+	New `clinics` rows from the scraper output.
+
+	Records without a name or coordinates are skipped, and so are likely
+	duplicates of existing clinics (their clinic_id goes to `on_existing`)
+	and repeats within the file. `expect` receives the number of rows the
+	generator will yield at most, once the file is loaded. `existing`
+	(clinic_id, name, address dicts) replaces the PostgREST lookup of the
+	current clinics.
+	"""
+	# Also reads all_kmhfl_facilities_details.json.gz / .zst if only that exists
+	clinics = load_json(data_path)
+	print(f"Loaded {len(clinics)} records from {data_path}")
+
+	from name_matching import DUPLICATE_CONFIDENCE, NameMatcher, county_of_address, normalize_name
+
+	# Fuzzy-match every record against the existing clinics at once,
+	# so "St Marys Hospital" is caught as a duplicate of "St. Mary's"
+	if existing is None:
+		existing = load_existing_clinics(supabase)
+	matcher = NameMatcher([c["name"] for c in existing], [county_of_address(c.get("address")) for c in existing])
+	matches = matcher.match([c.get("name") for c in clinics], [c.get("county") for c in clinics],
+							min_confidence=DUPLICATE_CONFIDENCE)
+
+	rows = []
+	seen = set()
+	skipped = 0
+	for clinic, match in zip(clinics, matches):
+		data = transform_facility(clinic)
+
+		# Skip entries without name or coordinates
+		if not data["name"] or not data["latitude"] or not data["longitude"]:
+			skipped += 1
+			continue
+
+		# Skip likely duplicates of existing clinics (and repeats within the file)
+		if match:
+			ordinal, confidence = match[0]
+			print(f"Skipped: {data['name']} (matches '{existing[ordinal]['name']}', confidence {confidence:.2f})")
+			if on_existing is not None:
+				on_existing(existing[ordinal]["clinic_id"])
+			skipped += 1
+			continue
+		key = (normalize_name(data["name"]), clinic.get("county"))
+		if key in seen:
+			skipped += 1
+			continue
+		seen.add(key)
+		rows.append(data)
+
+	print(f"{len(rows)} new clinics to insert, {skipped} skipped")
+	if expect is not None:
+		expect(len(rows))
+	yield from rows
+
+
 def seed_clinics(supabase: Client, count: int = 10) -> List[int]:
-	# Path to the scraper output
-	DATA_PATH = "all_kmhfl_facilities_details.json"
-
-	# ------------- LOAD & CLEAN DATA -------------
-	def transform(record):
-			"""Convert your scraper's data format into your table schema."""
-			name = record.get("name")
-			contact = record.get("contacts", [None])[0]  # take first phone number if any
-			coords = record.get("coordinates", [None, None])
-			latitude, longitude = coords if len(coords) == 2 else (None, None)
-
-			# join service names into a comma-separated string
-			services = ", ".join([s["service"] for s in record.get("services", []) if s.get("service")])
-
-			return {
-					"name": name,
-					"address": f"{record.get('ward', '')}, {record.get('sub_county', '')}, {record.get('county', '')}".strip(", "),
-					"latitude": latitude,
-					"longitude": longitude,
-					"services": services,
-					"consultation_fee": None,
-					"contact": contact,
-			}
-
-	# ------------- MAIN INSERT FUNCTION -------------
-	def populate_clinics():
-			with open(DATA_PATH, "r", encoding="utf-8") as f:
-					clinics = json.load(f)
-
-			print(f"Loaded {len(clinics)} records from {DATA_PATH}")
-
-			inserted = 0
-			skipped = 0
-
-			for clinic in clinics:
-					data = transform(clinic)
-
-					# Skip entries without name or coordinates
-					if not data["name"] or not data["latitude"] or not data["longitude"]:
-							skipped += 1
-							continue
-
-					# Check for existing clinic (by name)
-					existing = supabase.table("clinics").select("clinic_id").eq("name", data["name"]).execute()
-
-					if existing.data:
-							skipped += 1
-							continue
-
-					# Insert new record
-					res = supabase.table("clinics").insert(data).execute()
-					if res.error:
-							print(f"Error inserting {data['name']}: {res.error}")
-					else:
-							inserted += 1
-							print(f"Inserted: {data['name']}")
-
-			print(f"\n✅ Done! Inserted: {inserted} of {len(clinics)}, Skipped: {skipped}")
-	
-	populate_clinics()
-
-def seed_appointments(supabase: Client, user_ids: List[int], clinic_ids: List[int], count: int = 10) -> List[int]:
+	"""
+	Insert the scraped facilities as clinics.
+
+	Returns:
+		list: IDs of the inserted clinics followed by the IDs of existing
+		clinics that records were matched to, for the dependent seeders.
+	"""
+	existing_ids: List[int] = []
+	rows = list(clinic_rows(supabase, on_existing=existing_ids.append))
+
+	inserted: List[Dict] = []
+	for start in range(0, len(rows), CHUNK_SIZE):
+		chunk = rows[start:start + CHUNK_SIZE]
+		# Insert new records (the v2 client raises on API errors); a rejected
+		# chunk is retried row by row so one bad record does not drop the rest
+		try:
+			inserted += supabase.table("clinics").insert(chunk).execute().data
+		except Exception:
+			for data in chunk:
+				try:
+					inserted += supabase.table("clinics").insert(data).execute().data
+				except Exception as e:
+					print(f"Error inserting {data['name']}: {e}")
+
+	print(f"\n✅ Done! Inserted: {len(inserted)} of {len(rows)} new clinics, matched existing: {len(existing_ids)}")
+	if inserted:
+		from service_taxonomy import sync_clinic_services
+
+		sync_clinic_services(supabase, DATA_PATH, clinics=inserted)
+	return [row["clinic_id"] for row in inserted] + list(dict.fromkeys(existing_ids))
+
+
+def appointment_row(user_ids: List[int], clinic_ids: List[int], slots: SlotBook) -> Dict:
+	"""
+	One appointment at a random clinic. The requested day and slot are
+	random; the appointment takes the first slot from there that still has
+	room (see appointment_slots.py), so no clinic is ever overbooked.
+	A cancelled appointment keeps the requested time without holding a slot.
+	"""
 	statuses = ["pending", "confirmed", "cancelled"]
-	appointments_payload: List[Dict] = []
-	start_day = date.today()
-	for i in range(count):
-		appt_date = start_day + timedelta(days=random.randint(0, 14))
-		appt_time = time(hour=random.randint(8, 16), minute=random.choice([0, 15, 30, 45]))
-		appointments_payload.append(
-			{
-				"user_id": random.choice(user_ids),
-				"clinic_id": random.choice(clinic_ids),
-				"date": appt_date.isoformat(),
-				"time": appt_time.strftime("%H:%M:%S"),
-				"status": random.choice(statuses),
-			}
+	clinic_id = random.choice(clinic_ids)
+	status = random.choice(statuses)
+	day, slot = random.randrange(slots.horizon), random.randrange(slots.slots_per_day)
+	if status != "cancelled":
+		day, slot = slots.book_next(clinic_id, day, slot)
+	return {
+		"user_id": random.choice(user_ids),
+		"clinic_id": clinic_id,
+		**slots.appointment_at(day, slot),
+		"status": status,
+	}
+
+
+def load_booked_appointments(supabase: Client, since: date, page_size: int = 1000) -> List[Dict]:
+	"""Clinic, date and time of every appointment from `since` on that holds a slot (keyset pagination)."""
+	appointments: List[Dict] = []
+	after_id = 0
+	while True:
+		page = (
+			supabase.table("appointments")
+			.select("appointment_id,clinic_id,date,time")
+			.gte("date", since.isoformat())
+			.neq("status", "cancelled")
+			.gt("appointment_id", after_id)
+			.order("appointment_id")
+			.limit(page_size)
+			.execute()
+			.data
 		)
+		if not page:
+			return appointments
+		appointments += page
+		after_id = page[-1]["appointment_id"]
+
+
+def slot_book(capacity: Optional[int] = None, booked: Iterable[Dict] = ()) -> SlotBook:
+	"""
+	A slot book starting today, holding the `booked` appointments
+	(clinic_id/date/time dicts, e.g. from `load_booked_appointments`) so new
+	ones are not put on top of them. numpy is only imported here.
+
+	Raises:
+		ValueError: If capacity is below 1.
+	"""
+	from appointment_slots import DEFAULT_CAPACITY, SlotBook, slot_of
+
+	today = date.today()
+	slots = SlotBook(today, DEFAULT_CAPACITY if capacity is None else capacity)
+	for row in booked:
+		day = row["date"] if isinstance(row["date"], date) else date.fromisoformat(row["date"])
+		start = row["time"] if isinstance(row["time"], time) else time.fromisoformat(row["time"])
+		try:
+			slot = slot_of(start)
+		except ValueError:
+			continue  # outside the seeded clinic hours: cannot clash with a seeded appointment
+		if day >= today:
+			slots.book(row["clinic_id"], (day - today).days, slot)
+	return slots
+
+
+REVIEW_COMMENTS = [
+	"Great service!", "Very professional staff.", "Clean facilities.", "Wait time was short.",
+	"Highly recommend.", "Could be better.", "Friendly doctors.", "Excellent care.",
+	"Average experience.", "Will visit again.",
+]
+
+
+def review_row(user_ids: List[int], clinic_ids: List[int], i: int) -> Dict:
+	return {
+		"user_id": random.choice(user_ids),
+		"clinic_id": random.choice(clinic_ids),
+		"rating": random.randint(3, 5),
+		"comment": REVIEW_COMMENTS[i % len(REVIEW_COMMENTS)],
+	}
+
+
+def seed_appointments(supabase: Client, user_ids: List[int], clinic_ids: List[int], count: int = 10,
+					  slot_capacity: Optional[int] = None) -> List[int]:
+	slots = slot_book(slot_capacity, load_booked_appointments(supabase, date.today()))
+	appointments_payload = [appointment_row(user_ids, clinic_ids, slots) for _ in range(count)]
 
 	resp = supabase.table("appointments").insert(appointments_payload).execute()
 	inserted = resp.data if hasattr(resp, "data") else resp["data"]
@@ -130,39 +318,162 @@ def seed_appointments(supabase: Client, user_ids: List[int], clinic_ids: List[in
 
 
 def seed_reviews(supabase: Client, user_ids: List[int], clinic_ids: List[int], count: int = 10) -> List[int]:
-	review_comments = [
-		"Great service!", "Very professional staff.", "Clean facilities.", "Wait time was short.",
-		"Highly recommend.", "Could be better.", "Friendly doctors.", "Excellent care.",
-		"Average experience.", "Will visit again.",
-	]
-	reviews_payload: List[Dict] = []
-	for i in range(count):
-		reviews_payload.append(
-			{
-				"user_id": random.choice(user_ids),
-				"clinic_id": random.choice(clinic_ids),
-				"rating": random.randint(3, 5),
-				"comment": review_comments[i % len(review_comments)],
-			}
-		)
+	reviews_payload = [review_row(user_ids, clinic_ids, i) for i in range(count)]
 
 	resp = supabase.table("reviews").insert(reviews_payload).execute()
 	inserted = resp.data if hasattr(resp, "data") else resp["data"]
 	return [row["review_id"] for row in inserted]
 
 
+# ------------- ORCHESTRATED SEEDING -------------
+
+def _dependent_rows(context: SeedContext, count: int, build: Callable[[List[int], List[int], int], Dict]) -> Iterator[Dict]:
+	"""
+	Rows referencing users and clinics, streamed while the parents load:
+	the ID pools are refreshed every PARENT_REFRESH_ROWS rows, and row i
+	waits until both parents are at least i / count of the way through.
+	"""
+	for start in range(0, count, PARENT_REFRESH_ROWS):
+		parents = context.parent_ids(("users", "clinics"), progress=start / count)
+		for i in range(start, min(start + PARENT_REFRESH_ROWS, count)):
+			yield build(parents["users"], parents["clinics"], i)
+
+
+def seeding_plan(users: int = 10, appointments: int = 10, reviews: int = 10,
+				 chunk_size: int = CHUNK_SIZE, workers: int = DEFAULT_WORKERS, bulk: bool = False,
+				 existing_clinics: Optional[Callable[[], List[Dict]]] = None,
+				 data_path: str = DATA_PATH, slot_capacity: Optional[int] = None,
+				 existing_appointments: Optional[Callable[[], List[Dict]]] = None,
+				 existing_taxonomy: Optional[Callable[[], ServiceTaxonomy]] = None,
+				 store_dictionary: Optional[StoreRows] = None) -> List[SeedTable]:
+	"""
+	The MediMap tables as a dependency graph for `run_seed_plan`.
+
+	Parameters:
+		users / appointments / reviews (int): Rows to create.
+		chunk_size (int): Rows per insert.
+		workers (int): Concurrent inserts per table.
+		bulk (bool): Bulk-load mode (COPY backend): one password hash per
+			chunk and full-size user chunks.
+		existing_clinics (callable): Returns the current clinics, when they
+			cannot be read through PostgREST.
+		data_path (str): Scraper output the clinics come from.
+		slot_capacity (int): Appointments per clinic and 15-minute slot.
+		existing_appointments (callable): Returns the booked appointments
+			(see `load_booked_appointments`), when they cannot be read
+			through PostgREST.
+		existing_taxonomy (callable): Returns the stored service dictionary,
+			when it cannot be read through PostgREST.
+		store_dictionary (callable): Stores new dictionary rows and returns
+			their IDs (see `service_taxonomy.StoreRows`), when they cannot be
+			written through PostgREST.
+	"""
+	matched_clinics = set()  # existing clinics records were matched to: their services are not relinked
+
+	def users_rows(context: SeedContext) -> Iterator[Dict]:
+		context.expect("users", users)
+		return user_rows(users)
+
+	def clinics_rows(context: SeedContext) -> Iterator[Dict]:
+		return clinic_rows(
+			context.supabase,
+			data_path,
+			expect=lambda n: context.expect("clinics", n),
+			on_existing=lambda clinic_id: (matched_clinics.add(clinic_id), context.publish("clinics", [clinic_id])),
+			existing=existing_clinics() if existing_clinics else None,
+		)
+
+	def appointments_rows(context: SeedContext) -> Iterator[Dict]:
+		if not appointments:
+			return iter(())
+		# Appointments already stored keep their slots
+		booked = (existing_appointments() if existing_appointments
+				  else load_booked_appointments(context.supabase, date.today()))
+		slots = slot_book(slot_capacity, booked)
+		return _dependent_rows(context, appointments, lambda u, c, i: appointment_row(u, c, slots))
+
+	def clinic_services_rows(context: SeedContext) -> Iterator[Dict]:
+		# The dictionary is extended and stored while the clinics load; the
+		# links need the IDs of every new clinic, so they wait for the table
+		from service_taxonomy import clinic_service_rows, load_taxonomy, postgrest_store, save_taxonomy
+
+		records = load_json(data_path)
+		taxonomy = existing_taxonomy() if existing_taxonomy else load_taxonomy(context.supabase)
+		save_taxonomy(store_dictionary or postgrest_store(context.supabase), taxonomy.add_records(records))
+		new_ids = set(context.finished_ids(("clinics",))["clinics"]) - matched_clinics
+		clinics = existing_clinics() if existing_clinics else load_existing_clinics(context.supabase)
+		return iter(clinic_service_rows(records, [c for c in clinics if c["clinic_id"] in new_ids], taxonomy))
+
+	return [
+		SeedTable("users", "user_id", users_rows, prepare=hash_passwords_once if bulk else hash_passwords,
+				  chunk_size=chunk_size if bulk else min(chunk_size, USER_CHUNK_SIZE), workers=workers),
+		SeedTable("clinics", "clinic_id", clinics_rows, chunk_size=chunk_size, workers=workers),
+		SeedTable("clinic_services", "clinic_id", clinic_services_rows, depends_on=("clinics",),
+				  chunk_size=chunk_size, workers=workers),
+		SeedTable("appointments", "appointment_id", appointments_rows, depends_on=("users", "clinics"),
+				  chunk_size=chunk_size, workers=workers),
+		SeedTable(
+			"reviews", "review_id",
+			lambda context: _dependent_rows(context, reviews, review_row),
+			depends_on=("users", "clinics"), chunk_size=chunk_size, workers=workers,
+		),
+	]
+
+
 def main() -> None:
-	supabase = get_supabase_client()
-	# seed base tables first
-	user_ids = seed_users(supabase, 10)
-	clinic_ids = seed_clinics(supabase, 10)
-	# dependent tables
-	seed_appointments(supabase, user_ids, clinic_ids, 10)
-	seed_reviews(supabase, user_ids, clinic_ids, 10)
+	parser = argparse.ArgumentParser(description="Seed the MediMap Supabase tables.")
+	parser.add_argument("--users", type=int, default=10, help="Users to create")
+	parser.add_argument("--appointments", type=int, default=10, help="Appointments to create")
+	parser.add_argument("--reviews", type=int, default=10, help="Reviews to create")
+	parser.add_argument("--slot-capacity", type=int, help="Appointments per clinic and 15-minute slot "
+						"(default: appointment_slots.DEFAULT_CAPACITY)")
+	parser.add_argument("--chunk-size", type=int, help=f"Rows per insert (default: {CHUNK_SIZE}, "
+						"or pg_copy.DEFAULT_CHUNK_SIZE with --backend copy)")
+	parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent inserts per table")
+	parser.add_argument("--backend", choices=["postgrest", "copy"], default="postgrest",
+						help="Insert through the Supabase API, or COPY straight into Postgres (see pg_copy.py)")
+	parser.add_argument("--dsn", help="Postgres connection string for --backend copy "
+						"(default: SUPABASE_DB_URL / DATABASE_URL)")
+	parser.add_argument("--copy-format", choices=["binary", "csv"], default="binary", help="COPY format")
+	args = parser.parse_args()
+	if args.slot_capacity is not None and args.slot_capacity < 1:
+		parser.error("--slot-capacity must be at least 1")
+	if args.chunk_size is not None and args.chunk_size < 1:
+		parser.error("--chunk-size must be at least 1")
+
+	# users and clinics load concurrently; appointments and reviews stream
+	# in as soon as both have IDs
+	if args.backend == "copy":
+		from pg_copy import (DEFAULT_CHUNK_SIZE as COPY_CHUNK_SIZE, PgCopyLoader, booked_appointments, database_url,
+							 dictionary_store)
+		from service_taxonomy import ServiceTaxonomy
+
+		chunk_size = args.chunk_size or COPY_CHUNK_SIZE
+		with PgCopyLoader(database_url(args.dsn), args.copy_format) as loader:
+			plan = seeding_plan(
+				args.users, args.appointments, args.reviews, chunk_size, args.workers, bulk=True,
+				slot_capacity=args.slot_capacity,
+				existing_clinics=lambda: [
+					{"clinic_id": cid, "name": name, "address": address}
+					for cid, name, address in loader.execute("SELECT clinic_id, name, address FROM clinics")
+				],
+				existing_appointments=lambda: booked_appointments(loader, date.today()),
+				existing_taxonomy=lambda: ServiceTaxonomy(
+					[{"category_id": cid, "name": name}
+					 for cid, name in loader.execute("SELECT category_id, name FROM service_categories")],
+					[{"service_id": sid, "category_id": cid, "name": name}
+					 for sid, cid, name in loader.execute("SELECT service_id, category_id, name FROM services")],
+				),
+				store_dictionary=dictionary_store(loader),
+			)
+			run_seed_plan(None, plan, insert=loader.insert)
+	else:
+		supabase = get_supabase_client()
+		plan = seeding_plan(args.users, args.appointments, args.reviews, args.chunk_size or CHUNK_SIZE, args.workers,
+							slot_capacity=args.slot_capacity)
+		run_seed_plan(supabase, plan)
 	print("Seeding complete.")
 
 
 if __name__ == "__main__":
 	main()
-
-
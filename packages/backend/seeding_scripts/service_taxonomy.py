@@ -0,0 +1,392 @@
+"""
+Service Taxonomy
+----------------
+
+Normalized clinic services (see migrations/add_service_taxonomy.sql).
+
+`transform_facility` flattens a clinic's services into one ", "-joined
+string, so filtering clinics by service is an ILIKE substring scan over
+every row, and the same long service names are stored thousands of times.
+Here:
+
+    - every (category, service) pair of the detail dump goes into a
+      dictionary: `service_categories` and `services` rows with integer IDs;
+    - names are matched case- and whitespace-insensitively, so "Breast" and
+      " breast" are one entry (the first spelling seen is kept);
+    - IDs come from the identity columns: new names are inserted with ON
+      CONFLICT DO NOTHING and their IDs read back, so the API (which adds
+      names the same way) and the seeders never hand out the same ID;
+    - `clinic_services` (clinic_id, service_id) links clinics to services,
+      with an index on service_id, so "clinics offering X" is an index scan.
+
+seed_supabase.py loads the new dictionary entries and the links of the
+clinics it inserts; `sync` links the clinics already in the database (from
+their `services` text when the dump has no record of them). The API keeps
+the links of clinics it creates or edits (src/lib/data.ts).
+
+Usage:
+    python service_taxonomy.py stats
+    python service_taxonomy.py sync --dry-run
+"""
+
+import argparse
+import itertools
+import json
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+DATA_PATH = "all_kmhfl_facilities_details.json"
+PAGE_SIZE = 1000
+LINK_CHUNK_SIZE = 1000
+
+NAME_CHUNK_SIZE = 100  # names per read-back query (they go into the URL)
+
+StoreRows = Callable[[str, List[dict]], List[dict]]  # (table, rows) → stored rows of those names, with IDs
+
+# Identity column and unique key of the dictionary tables
+DICTIONARY_KEYS = {
+    "service_categories": ("category_id", ("name",)),
+    "services": ("service_id", ("category_id", "name")),
+}
+
+
+def normalize_label(value) -> Optional[str]:
+    """Collapse whitespace; None for empty labels."""
+    if value is None:
+        return None
+    label = " ".join(str(value).split())
+    return label or None
+
+
+def _key(label: str) -> str:
+    return label.casefold()
+
+
+# ============================================================
+# --- DICTIONARY ---
+# ============================================================
+
+class ServiceTaxonomy:
+    """
+    Category and service dictionary with integer IDs.
+
+    Built from the rows already stored (`categories`: category_id/name,
+    `services`: service_id/category_id/name). Names added afterwards have no
+    ID until `save_taxonomy` stores them and registers the rows read back.
+    Thread-safe.
+    """
+
+    def __init__(self, categories: Iterable[Dict] = (), services: Iterable[Dict] = ()):
+        self._lock = threading.Lock()
+        self._categories: Dict[str, int] = {}
+        self._services: Dict[Tuple[Optional[int], str], int] = {}
+        self._by_name: Dict[str, int] = {}  # lowest service_id of each name, in any category
+        self._new_categories: Dict[str, str] = {}  # key → first spelling seen
+        self._new_services: Dict[Tuple[Optional[str], str], Tuple[Optional[str], str]] = {}
+        self._new_names = set()  # service keys of _new_services
+        self.register(categories, services)
+
+    def __len__(self) -> int:
+        return len(self._services)
+
+    @property
+    def category_count(self) -> int:
+        return len(self._categories)
+
+    def _lookup(self, category: Optional[str], service: str) -> Optional[int]:
+        if category is None:
+            return self._services.get((None, _key(service)))
+        category_id = self._categories.get(_key(category))
+        return None if category_id is None else self._services.get((category_id, _key(service)))
+
+    def register(self, categories: Iterable[Dict] = (), services: Iterable[Dict] = ()):
+        """Add stored rows (e.g. read back after `save_taxonomy` inserted them)."""
+        with self._lock:
+            for row in categories:
+                self._categories.setdefault(_key(row["name"]), row["category_id"])
+                self._new_categories.pop(_key(row["name"]), None)
+            for row in services:
+                self._services.setdefault((row["category_id"], _key(row["name"])), row["service_id"])
+                if row["service_id"] < self._by_name.get(_key(row["name"]), row["service_id"] + 1):
+                    self._by_name[_key(row["name"])] = row["service_id"]
+            self._new_services = {key: labels for key, labels in self._new_services.items()
+                                  if self._lookup(*labels) is None}
+            self._new_names = {key[1] for key in self._new_services}
+
+    def add(self, category, service):
+        """Note a (category, service) pair; a new one gets its ID from `save_taxonomy`."""
+        service, category = normalize_label(service), normalize_label(category)
+        if service is None:
+            return
+        with self._lock:
+            if self._lookup(category, service) is not None:
+                return
+            if category is not None and _key(category) not in self._categories:
+                self._new_categories.setdefault(_key(category), category)
+            key = (None if category is None else _key(category), _key(service))
+            self._new_services.setdefault(key, (category, service))
+            self._new_names.add(key[1])
+
+    def add_names(self, names: Iterable) -> "ServiceTaxonomy":
+        """Note service names without a category; names known in any category are not added."""
+        for name in names:
+            label = normalize_label(name)
+            if label is None:
+                continue
+            with self._lock:
+                known = _key(label) in self._by_name or _key(label) in self._new_names
+            if not known:
+                self.add(None, label)
+        return self
+
+    def add_records(self, records: Iterable[Dict]) -> "ServiceTaxonomy":
+        for record in records:
+            for category, service in _record_labels(record):
+                self.add(category, service)
+        return self
+
+    def service_id(self, category, service) -> Optional[int]:
+        """ID of a stored (category, service) pair; None if it has none yet or there is no service name."""
+        service, category = normalize_label(service), normalize_label(category)
+        if service is None:
+            return None
+        with self._lock:
+            return self._lookup(category, service)
+
+    def service_id_by_name(self, service) -> Optional[int]:
+        """ID of a stored service name in any category (as the API matches names)."""
+        label = normalize_label(service)
+        if label is None:
+            return None
+        with self._lock:
+            return self._by_name.get(_key(label))
+
+    def record_service_ids(self, record: Dict) -> List[int]:
+        """Sorted, distinct IDs of the stored services of a scraped facility record."""
+        ids = {self.service_id(category, service) for category, service in _record_labels(record)}
+        ids.discard(None)
+        return sorted(ids)
+
+    def new_rows(self) -> Tuple[List[str], List[Tuple[Optional[str], str]]]:
+        """Category names and (category, service) names added and not stored yet."""
+        with self._lock:
+            return list(self._new_categories.values()), list(self._new_services.values())
+
+    def category_id(self, name: Optional[str]) -> Optional[int]:
+        label = normalize_label(name)
+        if label is None:
+            return None
+        with self._lock:
+            return self._categories.get(_key(label))
+
+
+def _record_labels(record: Dict) -> List[Tuple[Optional[str], str]]:
+    """Distinct (case-insensitively) normalized (category, service) pairs of a record."""
+    labels = {}
+    for entry in record.get("services") or []:
+        category, service = normalize_label(entry.get("category")), normalize_label(entry.get("service"))
+        if service is not None:
+            labels.setdefault((category and _key(category), _key(service)), (category, service))
+    return list(labels.values())
+
+
+# ============================================================
+# --- READING ---
+# ============================================================
+
+def _read_all(supabase, table: str, columns: str, key: str) -> List[Dict]:
+    rows, after = [], 0
+    while True:
+        page = (supabase.table(table).select(columns).gt(key, after).order(key)
+                .limit(PAGE_SIZE).execute().data)
+        if not page:
+            return rows
+        rows += page
+        after = page[-1][key]
+
+
+def load_taxonomy(supabase) -> ServiceTaxonomy:
+    """The dictionary stored in Supabase."""
+    return ServiceTaxonomy(_read_all(supabase, "service_categories", "category_id,name", "category_id"),
+                           _read_all(supabase, "services", "service_id,category_id,name", "service_id"))
+
+
+def postgrest_store(supabase) -> StoreRows:
+    """Insert dictionary rows through PostgREST (ON CONFLICT DO NOTHING) and read them back by name."""
+    def store(table: str, rows: List[dict]) -> List[dict]:
+        id_column, unique_key = DICTIONARY_KEYS[table]
+        for start in range(0, len(rows), LINK_CHUNK_SIZE):
+            supabase.table(table).upsert(rows[start:start + LINK_CHUNK_SIZE], on_conflict=",".join(unique_key),
+                                         ignore_duplicates=True).execute()
+        names = list({row["name"] for row in rows})
+        stored = []
+        for start in range(0, len(names), NAME_CHUNK_SIZE):
+            stored += (supabase.table(table).select(",".join((id_column,) + unique_key))
+                       .in_("name", names[start:start + NAME_CHUNK_SIZE]).execute().data)
+        return stored
+    return store
+
+
+def dry_run_store() -> StoreRows:
+    """Keeps nothing: rows get negative IDs, which no stored row has (for dry runs and statistics)."""
+    counter = itertools.count(-1, -1)
+
+    def store(table: str, rows: List[dict]) -> List[dict]:
+        id_column = DICTIONARY_KEYS[table][0]
+        return [dict(row, **{id_column: next(counter)}) for row in rows]
+    return store
+
+
+def facility_key(record: Dict) -> Tuple[Optional[str], str]:
+    """(name, address) of a record's `clinics` row, as seed_supabase.transform_facility builds it."""
+    from seed_supabase import transform_facility
+
+    row = transform_facility(record)
+    return row["name"], row["address"]
+
+
+# ============================================================
+# --- LINKING ---
+# ============================================================
+
+def clinic_service_rows(records: Iterable[Dict], clinics: Iterable[Dict],
+                        taxonomy: ServiceTaxonomy) -> List[Dict]:
+    """
+    `clinic_services` rows of the given clinics (clinic_id/name/address
+    dicts), from the records their rows were made from.
+    """
+    clinic_ids = {(c["name"], c.get("address")): c["clinic_id"] for c in clinics}
+    links = {}
+    for record in records:
+        clinic_id = clinic_ids.get(facility_key(record))
+        if clinic_id is None:
+            continue
+        for service_id in taxonomy.record_service_ids(record):
+            links[clinic_id, service_id] = None
+    return [{"clinic_id": clinic_id, "service_id": service_id} for clinic_id, service_id in links]
+
+
+def text_service_names(clinic: Dict) -> List[str]:
+    """Service names of a clinic's `services` display text ("A, B, C")."""
+    return (clinic.get("services") or "").split(",")
+
+
+def text_service_rows(clinics: Iterable[Dict], taxonomy: ServiceTaxonomy) -> List[Dict]:
+    """
+    `clinic_services` rows from the clinics' `services` display text, for
+    clinics that did not come from the detail dump (created through the API
+    or Google discovery). These names have no category: they are matched by
+    name in any category, as the API does (add unknown names with
+    `add_names` and save the dictionary first).
+    """
+    links = {}
+    for clinic in clinics:
+        for name in text_service_names(clinic):
+            service_id = taxonomy.service_id_by_name(name)
+            if service_id is not None:
+                links[clinic["clinic_id"], service_id] = None
+    return [{"clinic_id": clinic_id, "service_id": service_id} for clinic_id, service_id in links]
+
+
+def save_taxonomy(store: StoreRows, taxonomy: ServiceTaxonomy) -> Tuple[int, int]:
+    """
+    Store the dictionary entries added since it was loaded (categories
+    first, for the foreign key) and register the IDs the database gave them.
+    Entries another writer stored in the meantime are kept as they are.
+
+    Returns:
+        tuple: New (categories, services).
+    """
+    categories, services = taxonomy.new_rows()
+    if categories:
+        taxonomy.register(categories=store("service_categories", [{"name": name} for name in categories]))
+    if services:
+        rows = [{"category_id": taxonomy.category_id(category), "name": service} for category, service in services]
+        taxonomy.register(services=store("services", rows))
+    print(f"✅ Service dictionary: {taxonomy.category_count} categories, {len(taxonomy)} services "
+          f"({len(categories)} / {len(services)} new)")
+    return len(categories), len(services)
+
+
+def sync_clinic_services(supabase, data_path: str = DATA_PATH, dry_run: bool = False,
+                         clinics: Optional[List[Dict]] = None) -> dict:
+    """
+    Link every clinic in Supabase (or only `clinics`, clinic_id/name/address
+    dicts) to its services from the detail dump; clinics the dump has no
+    record of are linked from their `services` text instead. Existing links
+    are left alone (upserts ignore duplicates).
+
+    Returns:
+        dict: Counts of new categories and services, and links written.
+    """
+    from stream_io import load_json
+
+    records = load_json(data_path)
+    if clinics is None:
+        clinics = _read_all(supabase, "clinics", "clinic_id,name,address,services", "clinic_id")
+    dump_keys = {facility_key(record) for record in records}
+    from_text = [c for c in clinics if (c["name"], c.get("address")) not in dump_keys]
+
+    taxonomy = load_taxonomy(supabase).add_records(records)
+    taxonomy.add_names(name for clinic in from_text for name in text_service_names(clinic))
+    new = save_taxonomy(dry_run_store() if dry_run else postgrest_store(supabase), taxonomy)
+    rows = clinic_service_rows(records, clinics, taxonomy) + text_service_rows(from_text, taxonomy)
+    if not dry_run:
+        for start in range(0, len(rows), LINK_CHUNK_SIZE):
+            supabase.table("clinic_services").upsert(rows[start:start + LINK_CHUNK_SIZE],
+                                                     on_conflict="clinic_id,service_id",
+                                                     ignore_duplicates=True).execute()
+    print(f"✅ {len(rows)} clinic-service links for {len(clinics)} clinics{' [dry run]' if dry_run else ''}")
+    return {"categories": new[0], "services": new[1], "links": len(rows)}
+
+
+# ============================================================
+# --- STATISTICS ---
+# ============================================================
+
+def taxonomy_stats(records: List[Dict]) -> dict:
+    """Storage of the joined `services` strings vs the dictionary and join rows."""
+    from seed_supabase import transform_facility
+
+    taxonomy = ServiceTaxonomy().add_records(records)
+    joined = sum(len(transform_facility(r)["services"].encode("utf-8")) for r in records)
+    links = sum(len(_record_labels(r)) for r in records)
+    categories, services = taxonomy.new_rows()
+    dictionary = sum(len(name.encode("utf-8")) + 8 for name in categories + [s for _, s in services])
+    return {
+        "records": len(records),
+        "service_mentions": sum(len(r.get("services") or []) for r in records),
+        "categories": len(categories),
+        "services": len(services),
+        "links": links,
+        "joined_bytes": joined,
+        "dictionary_bytes": dictionary,
+        "link_bytes": links * 12,  # bigint clinic_id + integer service_id
+    }
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service / category dictionary and clinic_services links.")
+    parser.add_argument("--file", default=DATA_PATH, help="Scraper detail output file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Dictionary size and storage vs joined strings (no database)")
+    sync_parser = subparsers.add_parser("sync", help="Link the clinics in Supabase to their services")
+    sync_parser.add_argument("--dry-run", action="store_true", help="Compute without writing to Supabase")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        from stream_io import load_json
+
+        print(json.dumps(taxonomy_stats(load_json(args.file)), indent=2))
+    else:
+        from seed_supabase import get_supabase_client
+
+        sync_clinic_services(get_supabase_client(), args.file, args.dry_run)
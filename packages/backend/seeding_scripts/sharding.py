@@ -0,0 +1,159 @@
+"""
+Crawl Sharding
+--------------
+
+Splits the Phase 2 detail crawl across several hosts, containers or local
+processes.
+
+    - `shard_of(facility_id, count)` assigns every facility to one shard
+      from a hash of its ID, so each worker can compute its own share from
+      the Phase 1 file without any coordination;
+    - each shard writes its own detail file (`shard_output_file`);
+    - `merge_detail_shards` builds the canonical detail file from the shard
+      files: one record per facility ID, ordered as in the Phase 1 general
+      file, so the result does not depend on the shard count or on which
+      worker finished first.
+
+Usage (see also `webscrapping.py --shard` / `--local-shards`):
+    python sharding.py merge --shards 4
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+from typing import Iterable, List, Optional, Tuple
+
+from stream_io import append_stream, compression_of, end_stream, find_existing, iter_json_array, start_stream
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+DATA_DIR = os.path.dirname(__file__)
+GENERAL_INPUT_FILE = os.path.join(DATA_DIR, "all_kmhfl_facilities_general.json")
+DETAIL_OUTPUT_FILE = os.path.join(DATA_DIR, "all_kmhfl_facilities_details.json")
+
+Shard = Tuple[int, int]  # (index, count), 1-based index as written on the CLI
+
+
+def parse_shard(value: str) -> Shard:
+    """
+    Parse an "i/N" shard spec (1 <= i <= N).
+
+    Raises:
+        ValueError: If the spec is malformed or out of range.
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{value}', expected i/N (e.g. 2/4)")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{value}', index must be between 1 and {max(count, 1)}")
+    return index, count
+
+
+def shard_of(facility_id: str, count: int) -> int:
+    """
+    Return the 1-based shard a facility belongs to.
+
+    A cryptographic hash is used rather than `hash()`, which is salted per
+    process and would disagree between hosts.
+    """
+    digest = hashlib.sha1(str(facility_id).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def in_shard(facility_id: str, shard: Optional[Shard]) -> bool:
+    return shard is None or shard_of(facility_id, shard[1]) == shard[0]
+
+
+def _split_ext(file_path: str) -> Tuple[str, str]:
+    """Split off the extension, keeping a compression suffix with it (".json.gz")."""
+    compression = compression_of(file_path)
+    base = file_path[:-len(compression) - 1] if compression else file_path
+    root, ext = os.path.splitext(base)
+    return root, ext + (f".{compression}" if compression else "")
+
+
+def shard_output_file(output_file: str, shard: Shard) -> str:
+    """all_kmhfl_facilities_details.json → all_kmhfl_facilities_details.shard-2-of-4.json"""
+    root, ext = _split_ext(output_file)
+    return f"{root}.shard-{shard[0]}-of-{shard[1]}{ext}"
+
+
+def find_shard_files(output_file: str, count: Optional[int] = None) -> List[str]:
+    """List the shard files written next to `output_file`, in shard order."""
+    root, ext = _split_ext(output_file)
+    if count:
+        return [shard_output_file(output_file, (i, count)) for i in range(1, count + 1)]
+    return sorted(glob.glob(f"{glob.escape(root)}.shard-*-of-*{ext}"))
+
+
+# ============================================================
+# --- MERGE ---
+# ============================================================
+
+def merge_detail_shards(shard_files: Iterable[str], output_file: str = DETAIL_OUTPUT_FILE,
+                        general_file: Optional[str] = GENERAL_INPUT_FILE) -> int:
+    """
+    Merge shard detail files into the canonical detail file.
+
+    Records are deduplicated by facility ID (the first occurrence, in shard
+    file order, wins) and written in the order of the general file;
+    facilities missing from it follow, sorted by ID.
+
+    Parameters:
+        shard_files: Shard detail files; missing files are reported and skipped.
+        output_file (str): Canonical detail file to write.
+        general_file (str): Phase 1 file that defines the order (optional).
+
+    Returns:
+        int: Number of records written.
+    """
+    records = {}
+    duplicates = 0
+    for path in shard_files:
+        if not os.path.exists(find_existing(path)):
+            print(f"❌ Shard file '{path}' not found, skipping.")
+            continue
+        for record in iter_json_array(path):
+            if record.get("id") in records:
+                duplicates += 1
+                continue
+            records[record.get("id")] = record
+
+    order = {}
+    if general_file and os.path.exists(find_existing(general_file)):
+        for position, facility in enumerate(iter_json_array(general_file)):
+            order.setdefault(facility.get("id"), position)
+    ordered_ids = sorted(records, key=lambda fid: (fid not in order, order.get(fid, 0), str(fid)))
+
+    # Written under a temporary name (same compression) and renamed
+    root, ext = _split_ext(output_file)
+    tmp_path = f"{root}.tmp{ext}"
+    start_stream(tmp_path)
+    for i, fid in enumerate(ordered_ids):
+        append_stream(tmp_path, records[fid], is_first_entry=i == 0)
+    end_stream(tmp_path)
+    os.replace(tmp_path, output_file)
+
+    print(f"✅ Merged {len(records)} records into {output_file} ({duplicates} duplicates dropped).")
+    return len(records)
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge sharded KMHFL detail crawls.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    merge_parser = subparsers.add_parser("merge", help="Merge shard files into the canonical detail file")
+    merge_parser.add_argument("--shards", type=int, help="Shard count (default: every shard file found)")
+    merge_parser.add_argument("--output", default=DETAIL_OUTPUT_FILE, help="Canonical detail file")
+    merge_parser.add_argument("--general", default=GENERAL_INPUT_FILE, help="Phase 1 file defining the order")
+    merge_parser.add_argument("files", nargs="*", help="Explicit shard files (overrides --shards)")
+    args = parser.parse_args()
+
+    merge_detail_shards(args.files or find_shard_files(args.output, args.shards), args.output, args.general)
@@ -0,0 +1,315 @@
+"""
+Streaming JSON I/O
+------------------
+
+File helpers shared by the scraper and the tools that read its outputs.
+
+Compression is picked from the file extension and is transparent to
+callers:
+
+    all_kmhfl_facilities_details.json       plain text
+    all_kmhfl_facilities_details.json.gz    gzip (standard library)
+    all_kmhfl_facilities_details.json.zst   zstandard (`pip install zstandard`)
+
+    - `start_stream` / `append_stream` / `end_stream` write a JSON array one
+      element at a time through a single open (compressed) stream, so the
+      whole file is never held in memory and a compressed file is one frame
+      rather than one per record;
+    - `iter_json_array` reads an array back element by element in constant
+      memory; `load_json` / `dump_json` handle whole documents;
+    - readers given a plain `.json` path that does not exist fall back to
+      the `.gz` / `.zst` file next to it.
+
+Usage:
+    python stream_io.py bench --size 15000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, TextIO
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+DETAIL_INPUT_FILE = os.path.join(os.path.dirname(__file__), "all_kmhfl_facilities_details.json")
+
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+READ_CHUNK_CHARS = 64 * 1024
+
+# Writers kept open between start_stream and end_stream, by path
+_open_streams: Dict[str, TextIO] = {}
+_open_streams_lock = threading.Lock()
+
+
+def compression_of(file_path: str):
+    """Return "gz", "zst" or None for a path, from its extension."""
+    for suffix in COMPRESSED_SUFFIXES:
+        if file_path.endswith(suffix):
+            return suffix[1:]
+    return None
+
+
+def find_existing(file_path: str) -> str:
+    """Return `file_path`, or its compressed sibling if only that exists."""
+    if os.path.exists(file_path) or compression_of(file_path):
+        return file_path
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(file_path + suffix):
+            return file_path + suffix
+    return file_path
+
+
+def open_text(file_path: str, mode: str = "r") -> TextIO:
+    """
+    Open a (possibly compressed) UTF-8 text file.
+
+    Parameters:
+        file_path (str): Path; `.gz` and `.zst` files are (de)compressed.
+        mode (str): "r", "w" or "a". Appending to a compressed file adds a
+            new gzip member / zstd frame, which readers handle transparently.
+    """
+    compression = compression_of(file_path)
+    if compression == "gz":
+        return gzip.open(file_path, mode + "t", encoding="utf-8", compresslevel=GZIP_LEVEL)
+    if compression == "zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(f"Reading or writing '{file_path}' requires zstandard (pip install zstandard)")
+        cctx = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if mode != "r" else None
+        return zstandard.open(file_path, mode + "t", cctx=cctx, encoding="utf-8")
+    return open(file_path, mode, encoding="utf-8")
+
+
+# ============================================================
+# --- STREAM WRITING ---
+# ============================================================
+
+def start_stream(file_path: str):
+    """
+    Initialize a JSON file as an open array for streaming append operations.
+
+    The file stays open until `end_stream`.
+
+    Parameters:
+        file_path (str): Path of the file to initialize.
+    """
+    f = open_text(file_path, "w")
+    f.write('[\n')
+    with _open_streams_lock:
+        previous = _open_streams.pop(file_path, None)
+        _open_streams[file_path] = f
+    if previous is not None:
+        previous.close()
+
+
+def append_stream(file_path: str, data: Any, is_first_entry: bool):
+    """
+    Append a JSON object to an open array file, formatted properly.
+
+    Parameters:
+        file_path (str): Target JSON file.
+        data (dict): Dictionary to serialize and append.
+        is_first_entry (bool): Whether this is the first element (controls comma placement).
+    """
+    json_string = json.dumps(data, ensure_ascii=False, indent=4)
+    text = json_string if is_first_entry else ',\n' + json_string  # Comma before all but the first entry
+
+    f = _open_streams.get(file_path)
+    if f is None:
+        # Not started in this process: append to the file on disk
+        with open_text(file_path, "a") as f:
+            f.write(text)
+        return
+    f.write(text)
+    if not compression_of(file_path):
+        f.flush()  # keep plain files readable while the crawl runs
+
+
+def end_stream(file_path: str):
+    """
+    Close the open JSON array by appending a closing bracket.
+
+    Parameters:
+        file_path (str): Path of the JSON file to close.
+    """
+    with _open_streams_lock:
+        f = _open_streams.pop(file_path, None)
+    if f is None:
+        f = open_text(file_path, "a")
+    with f:
+        f.write('\n]')
+
+
+def close_stream(file_path: str):
+    """
+    Close a stream opened by `start_stream` without terminating the array,
+    e.g. before the file is rewritten from scratch. Later appends reopen
+    the file in append mode.
+    """
+    with _open_streams_lock:
+        f = _open_streams.pop(file_path, None)
+    if f is not None:
+        f.close()
+
+
+# ============================================================
+# --- READING ---
+# ============================================================
+
+def iter_json_array(file_path: str, chunk_chars: int = READ_CHUNK_CHARS) -> Iterator[Any]:
+    """
+    Yield the elements of a JSON array file one at a time.
+
+    Only one read chunk plus the element being decoded are held in memory.
+
+    Raises:
+        ValueError: If the file is not a well-formed JSON array.
+    """
+    decoder = json.JSONDecoder()
+    with open_text(find_existing(file_path), "r") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+        expect = "["
+
+        def fill():
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_chars)
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            eof = not chunk
+
+        while True:
+            # Skip whitespace up to the next structural character
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                fill()
+
+            if pos >= len(buffer):
+                raise ValueError(f"Unexpected end of file in '{file_path}'")
+            char = buffer[pos]
+
+            if expect == "[":
+                if char != "[":
+                    raise ValueError(f"'{file_path}' does not contain a JSON array")
+                pos += 1
+                expect = "value"
+            elif char == "]" and expect in ("value", "separator"):
+                return
+            elif expect == "separator":
+                if char != ",":
+                    raise ValueError(f"Expected ',' or ']' in '{file_path}', found {char!r}")
+                pos += 1
+                expect = "element"
+            else:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    fill()
+                    continue
+                if end == len(buffer) and not eof:
+                    fill()  # a number may continue in the next chunk
+                    continue
+                pos = end
+                expect = "separator"
+                yield value
+
+
+def load_json(file_path: str) -> Any:
+    """Load a whole (possibly compressed) JSON document."""
+    with open_text(find_existing(file_path), "r") as f:
+        return json.load(f)
+
+
+def dump_json(data: Any, file_path: str, indent: int = 4):
+    """Write a whole JSON document atomically (temporary file, then rename)."""
+    directory, name = os.path.split(file_path)
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    if compression_of(file_path):
+        tmp_path += os.path.splitext(file_path)[1]  # keep the compression suffix
+    with open_text(tmp_path, "w") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp_path, file_path)
+
+
+# ============================================================
+# --- BENCHMARK ---
+# ============================================================
+
+def run_benchmark(records: list, size: int = 15_000, directory: str = None):
+    """
+    Write and read `size` detail records streamed as plain, gzip and zstd
+    JSON, printing file size and throughput for each.
+    """
+    import tempfile
+
+    scaled = []
+    for i in range(size):
+        record = dict(records[i % len(records)])
+        record["id"] = f"{record.get('id')}-{i}"
+        record["code"] = i
+        scaled.append(record)
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        print(f"--- {size:,} records ---")
+        plain_bytes = None
+        for suffix in ("", ".gz", ".zst"):
+            path = os.path.join(tmp, "details.json" + suffix)
+            try:
+                start = time.perf_counter()
+                start_stream(path)
+                for i, record in enumerate(scaled):
+                    append_stream(path, record, is_first_entry=i == 0)
+                end_stream(path)
+                write_s = time.perf_counter() - start
+            except RuntimeError as e:
+                print(f"  {suffix or 'plain':6} skipped: {e}")
+                continue
+
+            start = time.perf_counter()
+            count = sum(1 for _ in iter_json_array(path))
+            read_s = time.perf_counter() - start
+            assert count == size
+
+            file_bytes = os.path.getsize(path)
+            plain_bytes = plain_bytes or file_bytes
+            print(f"  {suffix or 'plain':6} {file_bytes / 1024 / 1024:8.2f} MB ({file_bytes / plain_bytes:5.1%})  "
+                  f"write {size / write_s:9.0f} rec/s  read {size / read_s:9.0f} rec/s")
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming (compressed) JSON helpers.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    bench_parser = subparsers.add_parser("bench", help="Compare plain, gzip and zstd streams")
+    bench_parser.add_argument("--file", default=DETAIL_INPUT_FILE, help="Scraper detail output file")
+    bench_parser.add_argument("--size", type=int, default=15_000, help="Scaled dataset size")
+    compress_parser = subparsers.add_parser("compress", help="Re-encode a JSON array file, e.g. .json → .json.zst")
+    compress_parser.add_argument("source")
+    compress_parser.add_argument("target")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        run_benchmark(load_json(args.file), size=args.size)
+    else:
+        start_stream(args.target)
+        for i, element in enumerate(iter_json_array(args.source)):
+            append_stream(args.target, element, is_first_entry=i == 0)
+        end_stream(args.target)
+        print(f"✅ Wrote {args.target} ({os.path.getsize(args.target) / 1024:.1f} KB)")
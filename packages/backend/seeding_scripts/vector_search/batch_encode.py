@@ -0,0 +1,230 @@
+"""
+Length-Bucketed Batch Encoding
+------------------------------
+
+Bulk embedding of facility and service strings with little padding.
+
+A transformer batch is padded to its longest member, so a batch holding
+"Breast" next to a 150-character mental-health service description costs
+as much as if every member were 150 characters long. `model.encode`
+already sorts its input by character length, so its padding is low
+(about 2% on the detail dump); what it keeps fixed is the batch size
+(32), which runs the short service names through many small batches.
+Here:
+
+    - every text is tokenized once to get its token length;
+    - texts are sorted by token length, so each batch holds texts of
+      the same length - contiguous length buckets;
+    - batch size follows a token budget: a batch grows while
+      `members * longest member` stays within `token_budget`, so short
+      texts go through in large batches (about 20x fewer forward passes
+      than batches of 32 on the detail dump) and long ones in small
+      batches with bounded memory;
+    - embeddings are written back to the input order.
+
+Usage:
+    python batch_encode.py bench
+    python batch_encode.py bench --estimate   # padding statistics only, no model
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+DETAIL_INPUT_FILE = os.path.join(os.path.dirname(__file__), "..", "all_kmhfl_facilities_details.json")
+
+TOKEN_BUDGET = 8192  # padded tokens per batch (e.g. 32 texts x 256 tokens, or 1024 x 8)
+MAX_BATCH = 1024
+FIXED_BATCH = 32  # sentence-transformers default batch size, for comparison
+
+ESTIMATE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+# ============================================================
+# --- PLANNING ---
+# ============================================================
+
+def token_lengths(model, texts: Sequence[str]) -> np.ndarray:
+    """Token count of each text as the model sees it (special tokens included, truncated)."""
+    encoded = model.tokenizer(list(texts), add_special_tokens=True, truncation=True,
+                              max_length=model.max_seq_length)
+    return np.array([len(ids) for ids in encoded["input_ids"]], dtype=np.int64)
+
+
+def estimate_token_lengths(texts: Sequence[str], max_length: int = 256) -> np.ndarray:
+    """Rough token counts without a tokenizer: words and punctuation plus [CLS]/[SEP]."""
+    return np.array([min(len(ESTIMATE_PATTERN.findall(t)) + 2, max_length) for t in texts], dtype=np.int64)
+
+
+def plan_batches(lengths: np.ndarray, token_budget: int = TOKEN_BUDGET,
+                 max_batch: int = MAX_BATCH) -> List[np.ndarray]:
+    """
+    Group text positions into length-sorted batches within the token budget.
+
+    Returns:
+        list: One array of original positions per batch, shortest texts first.
+    """
+    order = np.argsort(lengths, kind="stable")
+    batches, start = [], 0
+    while start < len(order):
+        end = start + 1
+        # Sorted ascending, so the padded cost of order[start:end + 1] is (end + 1 - start) * lengths[order[end]]
+        while end < len(order) and end - start < max_batch and \
+                (end + 1 - start) * lengths[order[end]] <= token_budget:
+            end += 1
+        batches.append(order[start:end])
+        start = end
+    return batches
+
+
+def padded_tokens(lengths: np.ndarray, batches: Sequence[np.ndarray]) -> int:
+    """Tokens processed once every batch is padded to its longest member."""
+    return int(sum(len(b) * lengths[b].max() for b in batches if len(b)))
+
+
+def fixed_batches(count: int, batch_size: int = FIXED_BATCH) -> List[np.ndarray]:
+    """Input-order batches of a fixed size (no sorting at all)."""
+    return [np.arange(start, min(start + batch_size, count)) for start in range(0, count, batch_size)]
+
+
+def model_encode_batches(texts: Sequence[str], batch_size: int = FIXED_BATCH) -> List[np.ndarray]:
+    """
+    The batches `model.encode(texts, batch_size=...)` runs: sentence-transformers
+    sorts by character length (longest first), then cuts fixed-size batches.
+    """
+    order = np.argsort([-len(t) for t in texts], kind="stable")
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+# ============================================================
+# --- ENCODING ---
+# ============================================================
+
+def encode_bucketed(model, texts: Sequence[str], token_budget: int = TOKEN_BUDGET, max_batch: int = MAX_BATCH,
+                    normalize_embeddings: bool = True, lengths: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Drop-in for `model.encode(texts)` on large inputs.
+
+    Parameters:
+        model: A SentenceTransformer.
+        texts: Strings to embed.
+        token_budget (int): Padded tokens per batch.
+        max_batch (int): Upper bound on texts per batch.
+        normalize_embeddings (bool): L2-normalize the embeddings.
+        lengths (np.ndarray): Precomputed token lengths (see `token_lengths`).
+
+    Returns:
+        np.ndarray: (len(texts), dim) float32 embeddings in input order.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+    if lengths is None:
+        lengths = token_lengths(model, texts)
+
+    output = None
+    for batch in plan_batches(lengths, token_budget, max_batch):
+        embeddings = model.encode([texts[i] for i in batch], batch_size=len(batch), convert_to_numpy=True,
+                                  normalize_embeddings=normalize_embeddings, show_progress_bar=False)
+        if output is None:
+            output = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+        output[batch] = embeddings
+    return output
+
+
+# ============================================================
+# --- BENCHMARK ---
+# ============================================================
+
+def benchmark_texts(records: List[dict], size: int) -> List[str]:
+    """Facility texts and individual service strings from the detail dump, cycled up to `size`."""
+    from quantized_index import facility_text
+
+    texts = []
+    for record in records:
+        texts.append(facility_text(record))
+        texts += [s.get("service") for s in record.get("services") or [] if s.get("service")]
+        texts += [s.get("category") for s in record.get("services") or [] if s.get("category")]
+    rng = np.random.default_rng(0)
+    return [texts[i] for i in rng.integers(0, len(texts), size)]  # arbitrary order, as jobs receive them
+
+
+def run_benchmark(records: List[dict], size: int = 20_000, estimate: bool = False,
+                  token_budget: int = TOKEN_BUDGET):
+    """
+    Padding waste and encode throughput of length-bucketed token-budget
+    batches against the current path, `model.encode(texts, batch_size=32)`
+    (which already sorts by character length); unsorted input-order batches
+    are listed for reference only.
+
+    Without the model (`estimate`) only batch and padded-token counts are
+    reported; they are not wall-clock throughput, which depends on the
+    per-batch overhead and the hardware.
+    """
+    texts = benchmark_texts(records, size)
+    model = None
+    if estimate:
+        lengths = estimate_token_lengths(texts)
+    else:
+        from quantized_index import load_model
+        model = load_model()
+        lengths = token_lengths(model, texts)
+
+    real = int(lengths.sum())
+    plans: List[Tuple[str, List[np.ndarray]]] = [
+        (f"model.encode, batch {FIXED_BATCH}", model_encode_batches(texts)),
+        (f"bucketed, {token_budget} tokens", plan_batches(lengths, token_budget)),
+        (f"unsorted {FIXED_BATCH} (reference)", fixed_batches(len(texts))),
+    ]
+    print(f"--- {len(texts):,} texts, {real:,} tokens, lengths {lengths.min()}-{lengths.max()} ---")
+    current = padded_tokens(lengths, plans[0][1])
+    for label, batches in plans:
+        padded = padded_tokens(lengths, batches)
+        print(f"  {label:<28} {len(batches):6} batches  {padded:12,} padded tokens  "
+              f"{100 * (1 - real / padded):5.1f}% padding  {padded / current:5.2f}x model.encode's tokens")
+    if model is None:
+        return
+
+    def measure(label, encode):
+        start = time.perf_counter()
+        embeddings = encode()
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<40} {elapsed:8.2f}s  {len(texts) / elapsed:9.1f} texts/s")
+        return embeddings
+
+    print()
+    baseline = measure(f"model.encode, batch {FIXED_BATCH}", lambda: model.encode(
+        texts, batch_size=FIXED_BATCH, normalize_embeddings=True, show_progress_bar=False))
+    bucketed = measure(f"bucketed, {token_budget} tokens", lambda: encode_bucketed(
+        model, texts, token_budget, lengths=lengths))
+    print(f"  max |difference| vs baseline: {np.abs(baseline - bucketed).max():.2e}")
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Length-bucketed embedding batches.")
+    parser.add_argument("--file", default=DETAIL_INPUT_FILE, help="Scraper detail output file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bench_parser = subparsers.add_parser("bench", help="Compare padding and throughput with model.encode")
+    bench_parser.add_argument("--size", type=int, default=20_000, help="Texts to encode")
+    bench_parser.add_argument("--token-budget", type=int, default=TOKEN_BUDGET, help="Padded tokens per batch")
+    bench_parser.add_argument("--estimate", action="store_true",
+                              help="Estimate token lengths and report padding only (no model needed)")
+
+    args = parser.parse_args()
+
+    with open(args.file, encoding="utf-8") as f:
+        run_benchmark(json.load(f), args.size, args.estimate, args.token_budget)
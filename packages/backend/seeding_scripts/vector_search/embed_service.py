@@ -1,20 +1,62 @@
+import os
+from typing import Optional
+
 from sentence_transformers import SentenceTransformer
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
 import uvicorn
 import dotenv
 
+from quantized_index import INDEX_DIRECTORY, QuantizedIndex
+from hybrid_search import BM25_FILE, HybridIndex
+
 app = FastAPI()
 model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
 
+# Vectors + BM25 + facility filters (python hybrid_search.py build); /search/hybrid needs them
+hybrid_index = HybridIndex.load(INDEX_DIRECTORY) if os.path.exists(os.path.join(INDEX_DIRECTORY, BM25_FILE)) else None
+# Quantized clinic vectors (python quantized_index.py build); /search is disabled without them
+if hybrid_index is not None:
+    clinic_index = hybrid_index.vectors
+else:
+    clinic_index = QuantizedIndex.load(INDEX_DIRECTORY) if os.path.exists(INDEX_DIRECTORY) else None
+
+MAX_K = 100  # results per search request
+
 class EmbedRequest(BaseModel):
     text: str
 
+class SearchRequest(BaseModel):
+    text: str
+    k: int = Field(10, ge=1, le=MAX_K)
+
+class HybridSearchRequest(BaseModel):
+    text: str
+    k: int = Field(10, ge=1, le=MAX_K)
+    county: Optional[str] = None
+    keph_min: Optional[int] = None
+
 @app.post("/embed")
 def embed(req: EmbedRequest):
     embedding = model.encode(req.text).tolist()
     return {"embedding": embedding}
 
+@app.post("/search")
+def search(req: SearchRequest):
+    if clinic_index is None:
+        raise HTTPException(status_code=503, detail="Clinic index not built")
+    query = model.encode(req.text, normalize_embeddings=True)
+    results = clinic_index.search(query, req.k)
+    return {"results": [{"id": clinic_index.ids[ordinal], "score": score} for ordinal, score in results]}
+
+@app.post("/search/hybrid")
+def search_hybrid(req: HybridSearchRequest):
+    if hybrid_index is None:
+        raise HTTPException(status_code=503, detail="Hybrid index not built")
+    query = model.encode(req.text, normalize_embeddings=True)
+    results = hybrid_index.search(req.text, query, req.k, county=req.county, keph_min=req.keph_min)
+    return {"results": results}
+
 if __name__ == "__main__":
     port = dotenv.get_key("backend\.env", "MICROSERVICE_PORT")
     print(port)
@@ -0,0 +1,354 @@
+"""
+Hybrid Clinic Search
+--------------------
+
+Keyword + semantic search over the KMHFL facilities for `embed_service.py`.
+
+Vector search alone misses exact terms (a service name such as
+"Prostate", a facility code such as 23349); keyword search alone misses
+paraphrases ("counselling for depression" vs "Mental Health Services").
+Both run on every query and their rankings are fused:
+
+    - keyword: BM25 over a CSR inverted index (term → facility ordinals and
+      term frequencies) of each facility's name, code, type, owner, KEPH
+      level, services and service categories;
+    - semantic: the quantized embedding index (`quantized_index.py`);
+    - fusion: reciprocal rank fusion, score = Σ 1 / (RRF_K + rank), over the
+      top `depth` results of each ranking; it needs no score calibration
+      between BM25 and cosine similarity;
+    - prefilter: county / KEPH level filters are resolved to ordinals through
+      the facility bitmap index (`facility_index.py`) before scoring, so both
+      rankings only ever score eligible facilities.
+
+All three indexes share ordinals (positions in the detail dump) and are
+saved in the same directory as the quantized index.
+
+Usage:
+    python hybrid_search.py build --mode int8
+    python hybrid_search.py query "prostate screening" --county Kiambu --keph-min 3
+    python hybrid_search.py bench --size 20000
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from quantized_index import (DEFAULT_SUBSPACES, DETAIL_INPUT_FILE, INDEX_DIRECTORY, MODES,
+                             QuantizedIndex, build_clinic_index, load_model, normalize)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from facility_index import FacilityIndex  # noqa: E402
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+BM25_FILE = "bm25.npz"
+FACILITY_INDEX_FILE = "facilities.idx"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # damps the weight of top ranks; 60 is the usual choice
+DEFAULT_DEPTH = 50  # results taken from each ranking before fusion
+
+TOKEN_PATTERN = re.compile(r"[0-9a-z]+")
+STOP_WORDS = {"a", "an", "and", "of", "the", "in", "for", "with", "to", "on", "at", "by", "or"}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric tokens without stop words ("HIV Counselling & Testing" → hiv, counselling, testing)."""
+    return [t for t in TOKEN_PATTERN.findall((text or "").casefold()) if t not in STOP_WORDS]
+
+
+def keyword_text(record: dict) -> str:
+    """Text indexed for keyword search: name, code, type, owner, KEPH level, services and categories."""
+    services = record.get("services") or []
+    parts = [record.get("name"), str(record.get("code") or ""), record.get("type"), record.get("owner"),
+             record.get("keph_level")]
+    parts += [s.get("service") for s in services] + list({s.get("category") for s in services})
+    return " ".join(p for p in parts if p)
+
+
+# ============================================================
+# --- BM25 ---
+# ============================================================
+
+class BM25Index:
+    """
+    BM25 over a CSR inverted index: the postings of term t are
+    `doc_ids[offsets[t]:offsets[t + 1]]` with frequencies `term_freqs[...]`.
+    """
+
+    def __init__(self, vocabulary: Sequence[str], offsets: np.ndarray, doc_ids: np.ndarray,
+                 term_freqs: np.ndarray, doc_lengths: np.ndarray):
+        self.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.count = len(doc_lengths)
+        document_frequency = np.diff(offsets)
+        self.idf = np.log(1 + (self.count - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        average = float(doc_lengths.mean()) if self.count else 1.0
+        # Per-document part of the BM25 denominator: k1 * (1 - b + b * |d| / avgdl)
+        self.length_norm = (BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / max(average, 1e-9))).astype(np.float32)
+
+    def __len__(self) -> int:
+        return self.count
+
+    @classmethod
+    def build(cls, texts: Sequence[str]) -> "BM25Index":
+        vocabulary: Dict[str, int] = {}
+        term_ids, doc_ids, lengths = [], [], []
+        for ordinal, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            term_ids.extend(vocabulary.setdefault(t, len(vocabulary)) for t in tokens)
+            doc_ids.extend([ordinal] * len(tokens))
+
+        # One posting per distinct (term, document), counted and sorted by term then document
+        pairs = np.array(term_ids, dtype=np.int64) * max(len(texts), 1) + np.array(doc_ids, dtype=np.int64)
+        unique, counts = np.unique(pairs, return_counts=True)
+        terms = unique // max(len(texts), 1)
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(vocabulary)), out=offsets[1:])
+        return cls(list(vocabulary), offsets, (unique % max(len(texts), 1)).astype(np.int32),
+                   counts.astype(np.float32), np.array(lengths, dtype=np.float32))
+
+    def save(self, file_path: str):
+        np.savez(file_path, vocabulary=np.array(list(self.vocabulary), dtype=str), offsets=self.offsets,
+                 doc_ids=self.doc_ids, term_freqs=self.term_freqs, doc_lengths=self.doc_lengths)
+
+    @classmethod
+    def load(cls, file_path: str) -> "BM25Index":
+        with np.load(file_path) as arrays:
+            return cls(arrays["vocabulary"].tolist(), arrays["offsets"], arrays["doc_ids"],
+                       arrays["term_freqs"], arrays["doc_lengths"])
+
+    def scores(self, query: str, allowed: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Dense BM25 scores of every document (0 where no query term occurs).
+
+        Parameters:
+            allowed (np.ndarray): Optional boolean mask; other documents are
+                never scored and stay 0.
+        """
+        scores = np.zeros(self.count, dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = self.vocabulary.get(term)
+            if t is None:
+                continue
+            docs = self.doc_ids[self.offsets[t]:self.offsets[t + 1]]
+            tf = self.term_freqs[self.offsets[t]:self.offsets[t + 1]]
+            if allowed is not None:
+                keep = allowed[docs]
+                docs, tf = docs[keep], tf[keep]
+            # Each document occurs once per term, so fancy-index += does not drop updates
+            scores[docs] += self.idf[t] * tf * (BM25_K1 + 1) / (tf + self.length_norm[docs])
+        return scores
+
+    def search(self, query: str, k: int = 10, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Top-k (ordinal, BM25 score) pairs, best first; only documents matching a query term."""
+        return _top_k(self.scores(query, allowed), k)
+
+
+def _top_k(scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    best = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [(int(i), float(scores[i])) for i in best]
+
+
+# ============================================================
+# --- RANK FUSION ---
+# ============================================================
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[Tuple[int, float]]], k: int = 10,
+                           rrf_k: int = RRF_K) -> List[dict]:
+    """
+    Fuse ranked lists of (ordinal, score) with reciprocal rank fusion.
+
+    Returns:
+        list: Up to `k` dicts {"ordinal", "score", "<name>_rank"...}, best
+        first; a rank is None when that ranking did not return the ordinal.
+    """
+    fused: Dict[int, dict] = {}
+    for name, ranking in rankings.items():
+        for rank, (ordinal, _) in enumerate(ranking, start=1):
+            entry = fused.setdefault(ordinal, {"ordinal": ordinal, "score": 0.0,
+                                               **{f"{n}_rank": None for n in rankings}})
+            entry["score"] += 1.0 / (rrf_k + rank)
+            entry[f"{name}_rank"] = rank
+    return sorted(fused.values(), key=lambda e: (-e["score"], e["ordinal"]))[:k]
+
+
+# ============================================================
+# --- HYBRID INDEX ---
+# ============================================================
+
+class HybridIndex:
+    """
+    Vector, BM25 and facility filter indexes over the same facility ordinals.
+    """
+
+    def __init__(self, vectors: QuantizedIndex, keywords: BM25Index, facilities: FacilityIndex):
+        if not (len(vectors) == len(keywords) == facilities.count):
+            raise ValueError(f"Index sizes differ: {len(vectors)} vectors, {len(keywords)} keyword documents, "
+                             f"{facilities.count} facilities")
+        self.vectors = vectors
+        self.keywords = keywords
+        self.facilities = facilities
+        self.ids = vectors.ids
+
+    @classmethod
+    def load(cls, directory: str = INDEX_DIRECTORY) -> "HybridIndex":
+        return cls(QuantizedIndex.load(directory), BM25Index.load(os.path.join(directory, BM25_FILE)),
+                   FacilityIndex.load(os.path.join(directory, FACILITY_INDEX_FILE)))
+
+    def prefilter(self, county: Optional[str] = None, keph_min: Optional[int] = None) -> Optional[np.ndarray]:
+        """Boolean mask of the facilities passing the filters (None when unfiltered)."""
+        if county is None and keph_min is None:
+            return None
+        bitmap = self.facilities.select(county=county, keph_min=keph_min)
+        data = np.frombuffer(bitmap.to_bytes((self.facilities.count + 7) // 8, "little"), dtype=np.uint8)
+        return np.unpackbits(data, bitorder="little")[:self.facilities.count].astype(bool)
+
+    def search(self, text: str, embedding: np.ndarray, k: int = 10, county: Optional[str] = None,
+               keph_min: Optional[int] = None, depth: int = DEFAULT_DEPTH) -> List[dict]:
+        """
+        Hybrid top-k for a query text and its embedding.
+
+        Parameters:
+            text (str): Query text (keyword side).
+            embedding (np.ndarray): Query embedding (semantic side).
+            county (str): Only facilities in this county.
+            keph_min (int): Only facilities at this KEPH level or above.
+            depth (int): Results taken from each ranking before fusion.
+
+        Returns:
+            list: Dicts with "id", "score" (RRF), "keyword_rank" and
+            "vector_rank", best first.
+        """
+        allowed = self.prefilter(county, keph_min)
+        ordinals = None if allowed is None else np.flatnonzero(allowed)
+        if ordinals is not None and not len(ordinals):
+            return []
+
+        depth = max(depth, k)
+        rankings = {
+            "keyword": self.keywords.search(text, depth, allowed),
+            "vector": self.vectors.search(embedding, depth, ordinals=ordinals),
+        }
+        results = reciprocal_rank_fusion(rankings, k)
+        for entry in results:
+            entry["id"] = self.ids[entry.pop("ordinal")]
+            entry["score"] = round(entry["score"], 6)
+        return results
+
+
+def build_hybrid_index(detail_file: str = DETAIL_INPUT_FILE, directory: str = INDEX_DIRECTORY,
+                       mode: str = "int8", subspaces: int = DEFAULT_SUBSPACES) -> HybridIndex:
+    """Embed the detail dump and save the vector, BM25 and facility indexes side by side."""
+    with open(detail_file, encoding="utf-8") as f:
+        records = json.load(f)
+    vectors = build_clinic_index(detail_file, directory, mode, subspaces)
+    keywords = BM25Index.build([keyword_text(r) for r in records])
+    keywords.save(os.path.join(directory, BM25_FILE))
+    FacilityIndex.build(records).save(os.path.join(directory, FACILITY_INDEX_FILE))
+    print(f"✅ Keyword index: {len(keywords.vocabulary)} terms, {len(keywords.doc_ids)} postings")
+    return HybridIndex(vectors, keywords, FacilityIndex.load(os.path.join(directory, FACILITY_INDEX_FILE)))
+
+
+# ============================================================
+# --- BENCHMARK ---
+# ============================================================
+
+def run_benchmark(records: List[dict], size: int = 20_000, queries: int = 200, dim: int = 384):
+    """
+    Per-query latency of each stage on the detail dump scaled up to `size`.
+
+    Records are cycled with their name, code, county and KEPH level varied;
+    embeddings are random (the model is not needed to time the index side).
+    """
+    counties = ["Kiambu", "Nairobi", "Mombasa", "Kisumu", "Nakuru", "Machakos", "Kirinyaga", "West Pokot"]
+    scaled = []
+    for i in range(size):
+        record = dict(records[i % len(records)])
+        record["id"] = f"{record.get('id')}-{i}"
+        record["name"] = f"{record.get('name')} {i}"
+        record["code"] = 100_000 + i
+        record["county"] = counties[i % len(counties)]
+        record["keph_level"] = f"Level {2 + i % 5}"
+        scaled.append(record)
+
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    vectors = QuantizedIndex.build([r["id"] for r in scaled], rng.standard_normal((size, dim)), "int8")
+    keywords = BM25Index.build([keyword_text(r) for r in scaled])
+    index = HybridIndex(vectors, keywords, FacilityIndex.build(scaled))
+    build_s = time.perf_counter() - start
+
+    texts = ["prostate", "Minor Theatre Services", "mental health rehabilitation", str(100_000 + size // 2)]
+    embeddings = normalize(rng.standard_normal((queries, dim)))
+
+    def measure(run) -> float:
+        start = time.perf_counter()
+        for i in range(queries):
+            run(texts[i % len(texts)], embeddings[i])
+        return (time.perf_counter() - start) / queries * 1000
+
+    allowed = index.prefilter("Kiambu", 4)
+    print(f"--- {size:,} facilities, {len(keywords.vocabulary)} terms, built in {build_s:.2f}s ---")
+    print(f"  bm25:                 {measure(lambda t, e: keywords.search(t, DEFAULT_DEPTH)):8.3f} ms/query")
+    print(f"  vector (int8):        {measure(lambda t, e: vectors.search(e, DEFAULT_DEPTH)):8.3f} ms/query")
+    print(f"  hybrid:               {measure(lambda t, e: index.search(t, e)):8.3f} ms/query")
+    print(f"  hybrid, prefiltered:  {measure(lambda t, e: index.search(t, e, county='Kiambu', keph_min=4)):8.3f} "
+          f"ms/query ({int(allowed.sum())} eligible)")
+
+    hits = {r["id"]: r for r in index.search(texts[3], embeddings[0], k=2)}
+    assert hits.get(scaled[size // 2]["id"], {}).get("keyword_rank") == 1, "facility code not found"
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build, query and benchmark the hybrid clinic search.")
+    parser.add_argument("--file", default=DETAIL_INPUT_FILE, help="Scraper detail output file")
+    parser.add_argument("--index", default=INDEX_DIRECTORY, help="Index directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the vector, keyword and filter indexes")
+    build_parser.add_argument("--mode", choices=MODES, default="int8", help="Vector storage mode")
+    build_parser.add_argument("--subspaces", type=int, default=DEFAULT_SUBSPACES, help="PQ bytes per vector")
+
+    query_parser = subparsers.add_parser("query", help="Search a saved index")
+    query_parser.add_argument("text", help="Query text")
+    query_parser.add_argument("-k", type=int, default=10, help="Results to return")
+    query_parser.add_argument("--county", help="Only facilities in this county")
+    query_parser.add_argument("--keph-min", type=int, help="Minimum KEPH level number")
+
+    bench_parser = subparsers.add_parser("bench", help="Time each search stage")
+    bench_parser.add_argument("--size", type=int, default=20_000, help="Scaled dataset size")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_hybrid_index(args.file, args.index, args.mode, args.subspaces)
+    elif args.command == "query":
+        index = HybridIndex.load(args.index)
+        embedding = load_model().encode(args.text, normalize_embeddings=True)
+        for result in index.search(args.text, embedding, args.k, args.county, args.keph_min):
+            print(f"{result['score']:.4f}  keyword#{result['keyword_rank']}  vector#{result['vector_rank']}  "
+                  f"{result['id']}")
+    else:
+        with open(args.file, encoding="utf-8") as f:
+            run_benchmark(json.load(f), size=args.size)
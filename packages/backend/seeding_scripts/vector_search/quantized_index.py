@@ -0,0 +1,468 @@
+"""
+Quantized Vector Index
+----------------------
+
+Compact storage for the clinic embeddings served by `embed_service.py`.
+
+A 384-dim float32 all-MiniLM-L6-v2 vector takes 1.5 KB. The index keeps
+only a compressed code per vector in memory and scores queries against
+the codes directly:
+
+    - int8 (scalar quantization): each dimension is mapped onto 256 levels
+      between its observed min and max → 384 bytes per vector (4x smaller);
+    - pq (product quantization): the vector is cut into `subspaces` slices
+      and each slice is replaced by the nearest of 256 k-means centroids →
+      `subspaces` bytes per vector (48 bytes at the default, 32x smaller);
+      queries are scored with per-subspace lookup tables (ADC).
+
+The full float vectors are written next to the codes and memory-mapped on
+load; only the top `rerank` approximate candidates of a query are read from
+them and re-scored exactly, so the final order is the float order while
+the resident set stays at the code size.
+
+Vectors are L2-normalized, so scores are cosine similarities.
+
+Files (in one directory):
+    meta.json       ids, mode and parameters
+    codes.npy       int8 (n, dim) or uint8 (n, subspaces) codes
+    quantizer.npz   per-dimension offset/scale, or PQ centroids
+    vectors.npy     float32 (n, dim), memory-mapped for re-ranking
+
+Usage:
+    python quantized_index.py build --mode pq
+    python quantized_index.py query "mental health services in Kiambu"
+    python quantized_index.py bench --size 100000
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch_encode import encode_bucketed
+
+# ============================================================
+# --- GLOBAL CONFIGURATION ---
+# ============================================================
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+DETAIL_INPUT_FILE = os.path.join(os.path.dirname(__file__), "..", "all_kmhfl_facilities_details.json")
+INDEX_DIRECTORY = os.path.join(os.path.dirname(__file__), "clinic_index")
+
+MODES = ("float", "int8", "pq")
+DEFAULT_SUBSPACES = 48  # 8 dims per subspace for 384-dim vectors
+CENTROIDS = 256  # one uint8 code per subspace
+KMEANS_ITERATIONS = 12
+KMEANS_SAMPLE = 25_000  # training vectors per PQ codebook
+RERANK_FACTOR = 10  # re-rank k * RERANK_FACTOR approximate candidates
+SCORE_BLOCK = 16_384  # rows scored per block (bounds the float temporaries)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows (float32); zero vectors stay zero."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def facility_text(record: dict) -> str:
+    """Text embedded for one KMHFL detail record: name, type, level and services."""
+    services = [s.get("service") for s in record.get("services") or [] if s.get("service")]
+    parts = [record.get("name"), record.get("type"), record.get("keph_level"), ", ".join(services)]
+    return ". ".join(p for p in parts if p)
+
+
+# ============================================================
+# --- QUANTIZERS ---
+# ============================================================
+
+class ScalarQuantizer:
+    """
+    Per-dimension int8 quantization: x ≈ offset + scale * (code + 128).
+
+    A dot product with a query q is then
+        q·x ≈ q·offset + (q * scale)·(code + 128)
+    so a query costs one (n, dim) int8 → float product.
+    """
+
+    def __init__(self, offset: np.ndarray, scale: np.ndarray):
+        self.offset = offset.astype(np.float32)
+        self.scale = scale.astype(np.float32)
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray) -> "ScalarQuantizer":
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        return cls(low, np.maximum(high - low, 1e-9) / 255)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        levels = np.rint((vectors - self.offset) / self.scale)
+        return (np.clip(levels, 0, 255) - 128).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return self.offset + self.scale * (codes.astype(np.float32) + 128)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        weighted = query * self.scale
+        bias = float(query @ self.offset) + 128 * float(weighted.sum())
+        out = np.empty(len(codes), dtype=np.float32)
+        buffer = np.empty((min(len(codes), SCORE_BLOCK), codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK):
+            block = codes[start:start + SCORE_BLOCK]
+            np.copyto(buffer[:len(block)], block, casting="unsafe")
+            np.matmul(buffer[:len(block)], weighted, out=out[start:start + len(block)])
+        return out + bias
+
+    def arrays(self) -> dict:
+        return {"offset": self.offset, "scale": self.scale}
+
+
+def _kmeans(points: np.ndarray, clusters: int, iterations: int, rng) -> np.ndarray:
+    """Plain Lloyd's k-means; empty clusters are re-seeded from random points."""
+    clusters = min(clusters, len(points))
+    centroids = points[rng.choice(len(points), clusters, replace=False)].copy()
+    point_norms = (points * points).sum(axis=1)
+    for _ in range(iterations):
+        distances = point_norms[:, None] - 2 * points @ centroids.T + (centroids * centroids).sum(axis=1)[None, :]
+        assignment = distances.argmin(axis=1)
+        counts = np.bincount(assignment, minlength=clusters)
+        sums = np.stack([np.bincount(assignment, weights=points[:, d], minlength=clusters)
+                         for d in range(points.shape[1])], axis=1)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = points[rng.choice(len(points), int(empty.sum()), replace=False)]
+    return centroids
+
+
+class ProductQuantizer:
+    """
+    Product quantization with `subspaces` codebooks of 256 centroids each.
+
+    A query is scored by asymmetric distance computation: one (subspaces, 256)
+    table of query-slice · centroid dot products, then a sum of table lookups
+    per stored code.
+    """
+
+    def __init__(self, centroids: np.ndarray):
+        self.centroids = centroids.astype(np.float32)  # (subspaces, 256, sub_dim)
+        self.subspaces, _, self.sub_dim = self.centroids.shape
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, subspaces: int = DEFAULT_SUBSPACES,
+            iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> "ProductQuantizer":
+        dim = vectors.shape[1]
+        if dim % subspaces:
+            raise ValueError(f"Vector dimension {dim} is not divisible by {subspaces} subspaces")
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), KMEANS_SAMPLE), replace=False)]
+        sub_dim = dim // subspaces
+        centroids = np.zeros((subspaces, CENTROIDS, sub_dim), dtype=np.float32)
+        for s in range(subspaces):
+            trained = _kmeans(sample[:, s * sub_dim:(s + 1) * sub_dim], CENTROIDS, iterations, rng)
+            # With fewer training points than centroids, pad with repeats (argmin picks the first copy)
+            centroids[s] = trained[np.arange(CENTROIDS) % len(trained)]
+        return cls(centroids)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8)
+        for s in range(self.subspaces):
+            part = vectors[:, s * self.sub_dim:(s + 1) * self.sub_dim]
+            centroids = self.centroids[s]
+            distances = -2 * part @ centroids.T + (centroids * centroids).sum(axis=1)[None, :]
+            codes[:, s] = distances.argmin(axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return self.centroids[np.arange(self.subspaces)[None, :], codes].reshape(len(codes), -1)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        table = np.einsum("sd,scd->sc", query.reshape(self.subspaces, self.sub_dim), self.centroids)
+        # Flattened lookup: code c of subspace s sits at s * 256 + c
+        flat_table = table.ravel()
+        base = (np.arange(self.subspaces) * CENTROIDS).astype(np.intp)
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK):
+            block = codes[start:start + SCORE_BLOCK]
+            out[start:start + len(block)] = flat_table[block + base].sum(axis=1)
+        return out
+
+    def arrays(self) -> dict:
+        return {"centroids": self.centroids}
+
+
+# ============================================================
+# --- INDEX ---
+# ============================================================
+
+class QuantizedIndex:
+    """
+    Cosine-similarity index over quantized vectors with exact float re-ranking.
+
+    Build one with `QuantizedIndex.build(ids, vectors, mode)` or load a saved
+    directory with `QuantizedIndex.load(path)`. In "float" mode the vectors
+    are scored directly (the exact baseline).
+    """
+
+    def __init__(self, ids: List, mode: str, codes: np.ndarray, quantizer=None,
+                 vectors: Optional[np.ndarray] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown index mode '{mode}' (expected one of {', '.join(MODES)})")
+        self.ids = list(ids)
+        self.mode = mode
+        self.codes = codes
+        self.quantizer = quantizer
+        self.vectors = vectors  # float32 rows for re-ranking (memory-mapped once loaded)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Resident size of the codes and quantizer (excludes the memory-mapped floats)."""
+        if self.mode == "float":
+            return self.codes.nbytes
+        return self.codes.nbytes + sum(a.nbytes for a in self.quantizer.arrays().values())
+
+    # ------------- BUILD & PERSIST -------------
+
+    @classmethod
+    def build(cls, ids: Sequence, vectors: np.ndarray, mode: str = "int8",
+              subspaces: int = DEFAULT_SUBSPACES, keep_vectors: bool = True) -> "QuantizedIndex":
+        """
+        Quantize `vectors` (one row per ID; normalized here).
+
+        Parameters:
+            mode (str): "float", "int8" or "pq".
+            subspaces (int): PQ code bytes per vector.
+            keep_vectors (bool): Keep the float vectors for exact re-ranking.
+        """
+        vectors = normalize(vectors)
+        if len(ids) != len(vectors):
+            raise ValueError(f"{len(ids)} ids for {len(vectors)} vectors")
+        if mode == "float":
+            return cls(ids, mode, vectors, vectors=vectors)
+        quantizer = ScalarQuantizer.fit(vectors) if mode == "int8" else ProductQuantizer.fit(vectors, subspaces)
+        return cls(ids, mode, quantizer.encode(vectors), quantizer, vectors if keep_vectors else None)
+
+    def save(self, directory: str = INDEX_DIRECTORY) -> int:
+        """
+        Write the index to `directory`.
+
+        Returns:
+            int: Total size of the written files in bytes.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = [os.path.join(directory, "meta.json"), os.path.join(directory, "codes.npy")]
+        with open(paths[0], "w", encoding="utf-8") as f:
+            json.dump({"mode": self.mode, "count": len(self), "ids": self.ids}, f, ensure_ascii=False)
+        np.save(paths[1], self.codes)
+        if self.mode != "float":
+            paths.append(os.path.join(directory, "quantizer.npz"))
+            np.savez(paths[-1], **self.quantizer.arrays())
+            if self.vectors is not None:
+                paths.append(os.path.join(directory, "vectors.npy"))
+                np.save(paths[-1], np.asarray(self.vectors, dtype=np.float32))
+        return sum(os.path.getsize(p) for p in paths)
+
+    @classmethod
+    def load(cls, directory: str = INDEX_DIRECTORY, in_memory: bool = False) -> "QuantizedIndex":
+        """
+        Load a saved index. Codes are read into memory; the float vectors are
+        memory-mapped (or read, with `in_memory`) for re-ranking.
+        """
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        mode = meta["mode"]
+        if mode == "float":
+            vectors = np.load(os.path.join(directory, "codes.npy"), mmap_mode=None if in_memory else "r")
+            return cls(meta["ids"], mode, vectors, vectors=vectors)
+
+        codes = np.load(os.path.join(directory, "codes.npy"))
+        with np.load(os.path.join(directory, "quantizer.npz")) as arrays:
+            quantizer = ScalarQuantizer(arrays["offset"], arrays["scale"]) if mode == "int8" \
+                else ProductQuantizer(arrays["centroids"])
+        vectors_path = os.path.join(directory, "vectors.npy")
+        vectors = np.load(vectors_path, mmap_mode=None if in_memory else "r") if os.path.exists(vectors_path) else None
+        return cls(meta["ids"], mode, codes, quantizer, vectors)
+
+    # ------------- SEARCH -------------
+
+    def approximate_scores(self, query: np.ndarray, ordinals: Optional[np.ndarray] = None) -> np.ndarray:
+        """Scores of every stored vector (or of `ordinals` only) from the codes alone."""
+        query = normalize(query)
+        codes = self.codes if ordinals is None else self.codes[ordinals]
+        if self.mode == "float":
+            return np.asarray(codes @ query, dtype=np.float32)
+        return self.quantizer.scores(codes, query)
+
+    def search(self, query: np.ndarray, k: int = 10, rerank: Optional[int] = None,
+               ordinals: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Top-k most similar stored vectors.
+
+        Parameters:
+            query (np.ndarray): Query embedding (normalized here).
+            k (int): Results to return.
+            rerank (int): Approximate candidates re-scored with the float
+                vectors (default k * RERANK_FACTOR; 0 disables re-ranking).
+            ordinals (np.ndarray): Restrict the search to these ordinals
+                (e.g. a county prefilter).
+
+        Returns:
+            list: (ordinal, cosine similarity) pairs, best first.
+        """
+        query = normalize(query)
+        scores = self.approximate_scores(query, ordinals)
+        if rerank is None:
+            rerank = k * RERANK_FACTOR
+        if self.mode == "float" or self.vectors is None:
+            rerank = 0
+
+        keep = min(max(k, rerank), len(scores))
+        if keep == 0:
+            return []
+        positions = np.argpartition(-scores, keep - 1)[:keep] if keep < len(scores) else np.arange(len(scores))
+        candidates = positions if ordinals is None else np.asarray(ordinals)[positions]
+
+        if rerank:
+            order = np.sort(candidates)  # sequential reads from the memory-map
+            exact = np.asarray(self.vectors[order], dtype=np.float32) @ query
+            best = np.argsort(-exact, kind="stable")[:k]
+            return [(int(order[i]), float(exact[i])) for i in best]
+
+        best = np.argsort(-scores[positions], kind="stable")[:k]
+        return [(int(candidates[i]), float(scores[positions[i]])) for i in best]
+
+    def exact_search(self, query: np.ndarray, k: int = 10) -> List[Tuple[int, float]]:
+        """Brute-force float search (ground truth for recall measurements)."""
+        if self.vectors is None:
+            raise RuntimeError("Exact search needs the float vectors (build with keep_vectors=True)")
+        scores = np.asarray(self.vectors, dtype=np.float32) @ normalize(query)
+        best = np.argsort(-scores, kind="stable")[:k]
+        return [(int(i), float(scores[i])) for i in best]
+
+
+# ============================================================
+# --- EMBEDDING ---
+# ============================================================
+
+def load_model(model_name: str = MODEL_NAME):
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        raise RuntimeError("Building the clinic index needs sentence-transformers "
+                           "(pip install sentence-transformers)") from e
+    return SentenceTransformer(model_name)
+
+
+def build_clinic_index(detail_file: str = DETAIL_INPUT_FILE, directory: str = INDEX_DIRECTORY,
+                       mode: str = "int8", subspaces: int = DEFAULT_SUBSPACES, model=None) -> QuantizedIndex:
+    """
+    Embed every facility of the KMHFL detail dump and save the quantized index.
+    """
+    with open(detail_file, encoding="utf-8") as f:
+        records = json.load(f)
+    model = model or load_model()
+    vectors = encode_bucketed(model, [facility_text(r) for r in records])
+    index = QuantizedIndex.build([r.get("id") for r in records], vectors, mode, subspaces)
+    size = index.save(directory)
+    print(f"✅ Indexed {len(index)} facilities ({mode}) into {directory} "
+          f"({size / 1024:.1f} KB on disk, {index.nbytes / 1024:.1f} KB resident)")
+    return index
+
+
+# ============================================================
+# --- BENCHMARK ---
+# ============================================================
+
+def _synthetic_vectors(size: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real sentence embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size)] + 0.6 * rng.standard_normal((size, dim)).astype(np.float32)
+    return normalize(vectors)
+
+
+def run_benchmark(size: int = 100_000, dim: int = 384, queries: int = 200, k: int = 10,
+                  vectors: Optional[np.ndarray] = None, subspaces: Sequence[int] = (48, 96)):
+    """
+    recall@k, resident memory and query latency of every storage mode.
+
+    Uses `vectors` (e.g. real embeddings from a .npy file) when given,
+    otherwise `size` clustered synthetic vectors. Queries are perturbed
+    stored vectors; ground truth is the exact float search.
+    """
+    if vectors is None:
+        vectors = _synthetic_vectors(size, dim, clusters=max(size // 200, 8))
+    vectors = normalize(vectors)
+    rng = np.random.default_rng(1)
+    query_vectors = normalize(vectors[rng.integers(0, len(vectors), queries)]
+                              + 0.3 * rng.standard_normal((queries, vectors.shape[1])).astype(np.float32)
+                              / np.sqrt(vectors.shape[1]))
+    ids = list(range(len(vectors)))
+
+    baseline = QuantizedIndex.build(ids, vectors, "float")
+    truth = [{o for o, _ in baseline.exact_search(q, k)} for q in query_vectors]
+
+    configurations = [("float", "float", 0, 0)]
+    configurations += [("int8", "int8", 0, 0), ("int8+rerank", "int8", 0, k * RERANK_FACTOR)]
+    for m in subspaces:
+        configurations += [(f"pq{m}", "pq", m, 0), (f"pq{m}+rerank", "pq", m, k * RERANK_FACTOR)]
+
+    print(f"--- {len(vectors):,} vectors x {vectors.shape[1]} dims, {queries} queries, recall@{k} ---")
+    print(f"  {'mode':<14} {'bytes/vec':>10} {'resident MB':>12} {'build s':>8} {'ms/query':>9} {'recall':>7}")
+    built = {}
+    for label, mode, m, rerank in configurations:
+        key = (mode, m)
+        if key not in built:
+            start = time.perf_counter()
+            built[key] = (baseline if mode == "float" else QuantizedIndex.build(ids, vectors, mode, m or DEFAULT_SUBSPACES),
+                          time.perf_counter() - start)
+        index, build_s = built[key]
+
+        start = time.perf_counter()
+        results = [index.search(q, k, rerank=rerank) for q in query_vectors]
+        ms = (time.perf_counter() - start) / queries * 1000
+        recall = np.mean([len(truth[i] & {o for o, _ in r}) / k for i, r in enumerate(results)])
+        print(f"  {label:<14} {index.codes.nbytes / len(index):10.0f} {index.nbytes / 1e6:12.1f} "
+              f"{build_s:8.2f} {ms:9.2f} {recall:7.3f}")
+
+
+# ============================================================
+# --- MAIN EXECUTION ---
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build, query and benchmark the quantized clinic index.")
+    parser.add_argument("--index", default=INDEX_DIRECTORY, help="Index directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Embed the detail dump and save the index")
+    build_parser.add_argument("--file", default=DETAIL_INPUT_FILE, help="Scraper detail output file")
+    build_parser.add_argument("--mode", choices=MODES, default="int8", help="Vector storage mode")
+    build_parser.add_argument("--subspaces", type=int, default=DEFAULT_SUBSPACES, help="PQ bytes per vector")
+
+    query_parser = subparsers.add_parser("query", help="Search a saved index")
+    query_parser.add_argument("text", help="Query text")
+    query_parser.add_argument("-k", type=int, default=10, help="Results to return")
+
+    bench_parser = subparsers.add_parser("bench", help="recall@k vs memory/latency of each storage mode")
+    bench_parser.add_argument("--size", type=int, default=100_000, help="Synthetic vectors")
+    bench_parser.add_argument("--queries", type=int, default=200, help="Queries to time")
+    bench_parser.add_argument("--vectors", help="Benchmark real embeddings from a .npy file instead")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_clinic_index(args.file, args.index, args.mode, args.subspaces)
+    elif args.command == "query":
+        index = QuantizedIndex.load(args.index)
+        embedding = load_model().encode(args.text, normalize_embeddings=True)
+        for ordinal, score in index.search(embedding, args.k):
+            print(f"{score:.3f}  {index.ids[ordinal]}")
+    else:
+        run_benchmark(args.size, queries=args.queries,
+                      vectors=np.load(args.vectors) if args.vectors else None)
@@ -11,18 +11,46 @@ It works in two main phases:
 Both phases write to JSON files incrementally (streaming mode) to minimize memory usage.
 This approach allows handling thousands of records without filling RAM.
 
+Each stage (fetch, parse, enrich, write) is timed through `metrics.py`; a
+Prometheus textfile and a JSON summary are written to `metrics/` at the
+end of every phase. Pass `--profile cprofile` (or `pyinstrument`) to dump a
+profile of the whole run.
+
+Phase 2 can be split across hosts with `--shard i/N` (see `sharding.py`):
+each shard crawls the facilities whose ID hashes to it and writes its own
+file, and `--merge-shards N` builds the canonical detail file. Use
+`--local-shards N` to run N shards as local processes.
+
+`--archive PATH` stores every raw response in a local SQLite archive (see
+`response_archive.py`); add `--archive-mode replay` to re-run the scraper
+from that archive, offline and without delays.
+
 Author: [Your Name]
 Date: [Today’s Date]
 """
 
+import argparse
 import json
-import requests
+import multiprocessing
+import threading
 import time
 import os
-from bs4 import BeautifulSoup
-import googlemaps
-from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any
+from urllib.parse import urlencode
+
+import stream_io
+from metrics import Metrics, profiled
+from rate_limit import RETRY_STATUSES, AdaptiveRateLimiter, retry_after_seconds
+from stream_io import end_stream, iter_json_array, open_text, start_stream
+from sharding import Shard, find_shard_files, in_shard, merge_detail_shards, parse_shard, shard_output_file
+
+if TYPE_CHECKING:
+    import requests
+
+# requests, BeautifulSoup, googlemaps, dotenv and numpy (name matching) are
+# imported where they are first needed, so importing this module for its
+# parsing helpers (e.g. in parse_pool worker processes) stays cheap.
+
 # ============================================================
 # --- GLOBAL CONFIGURATION ---
 # ============================================================
@@ -45,10 +73,8 @@ HEADERS = {
     "Accept": "application/json"
 }
 
-# Places API
+# Places API key: read from ../.env when the Google client is first needed
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
-load_dotenv(dotenv_path=dotenv_path)
-GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 
 # Output file paths
 relative_path = os.path.dirname(__file__)
@@ -59,21 +85,152 @@ DETAIL_OUTPUT_FILE = os.path.join(os.path.dirname(__file__), "all_kmhfl_faciliti
 MAX_PAGE_COUNT = 1              # Max number of pages to fetch (None = all)
 MAX_FACILITIES_FOR_DETAIL = 3  # Max facilities for Phase 2 (None = all)
 
+# Optional raw response archive (see response_archive.py): mode "record" or "replay"
+ARCHIVE = None
+ARCHIVE_MODE = None
+ARCHIVE_PATH = None
+
+# Stage timings and counters, exported at the end of each phase
+METRICS = Metrics("kmhfl_scraper")
+METRICS_DIR = os.path.join(os.path.dirname(__file__), "metrics")
+
+# Request pacing: starts at the old one request per second and adapts to
+# the server's latency and error rate (see rate_limit.py)
+MAX_RETRIES = 3
+KMHFL_LIMITER = AdaptiveRateLimiter("kmhfl", initial_rate=1.0, max_rate=8.0, metrics=METRICS)
+GOOGLE_LIMITER = AdaptiveRateLimiter("google", initial_rate=5.0, max_rate=40.0, latency_target=2.0, metrics=METRICS)
+
 
 # ============================================================
-# --- STREAM FILE HELPERS ---
+# --- LAZY CLIENTS ---
 # ============================================================
 
-def start_stream(file_path: str):
+_clients_lock = threading.Lock()
+_http = threading.local()
+_env_loaded = False
+
+# Google Maps client, created on first use by google_client() (tests may assign their own)
+gmaps = None
+
+
+def load_env():
+    """Load ../.env into the environment once."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv(dotenv_path=dotenv_path)
+        _env_loaded = True
+
+
+def google_client():
+    """The shared `googlemaps.Client`, created on first use from GOOGLE_MAPS_API_KEY."""
+    global gmaps
+    if gmaps is None:
+        with _clients_lock:
+            if gmaps is None:
+                import googlemaps
+                load_env()
+                gmaps = googlemaps.Client(key=os.getenv("GOOGLE_MAPS_API_KEY"))
+    return gmaps
+
+
+def http_session() -> "requests.Session":
+    """This thread's `requests.Session`, created on first use (keeps connections alive between requests)."""
+    session = getattr(_http, "session", None)
+    if session is None:
+        import requests
+        session = _http.session = requests.Session()
+    return session
+
+
+# ============================================================
+# --- HTTP HELPERS ---
+# ============================================================
+
+def replaying() -> bool:
+    """Whether responses are served from the archive instead of the network."""
+    return ARCHIVE is not None and ARCHIVE_MODE == "replay"
+
+
+def http_get(url: str, session: "requests.Session" = None, **kwargs) -> "requests.Response":
     """
-    Initialize a JSON file as an open array for streaming append operations.
+    GET a URL, recording the request in METRICS.
+
+    Requests are paced by KMHFL_LIMITER, and 429 / 5xx responses, timeouts
+    and connection errors are retried up to MAX_RETRIES times.
+
+    With a response archive open, successful responses are stored in it
+    ("record" mode), or served from it without touching the network
+    ("replay" mode; unknown URLs raise ArchiveMiss).
 
     Parameters:
-        file_path (str): Path of the file to initialize.
+        url (str): URL to fetch.
+        session (requests.Session): Session to use (default: this thread's
+            `http_session()`).
+        **kwargs: Passed through to `Session.get`.
+
+    Returns:
+        requests.Response: The response, after `raise_for_status()`.
     """
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write('[\n')
+    import requests
+
+    if replaying():
+        archived = ARCHIVE.get(url)
+        if archived is None:
+            from response_archive import ArchiveMiss
+            METRICS.inc("failures_total", stage="replay")
+            raise ArchiveMiss(url)
+        METRICS.inc("archive_hits_total")
+        METRICS.inc("bytes_replayed_total", len(archived.content))
+        return archived
+
+    for attempt in range(MAX_RETRIES + 1):
+        with METRICS.span("throttle"):
+            KMHFL_LIMITER.acquire()
+        METRICS.inc("requests_total", stage="fetch")
+        start = time.perf_counter()
+        try:
+            with METRICS.span("fetch"):
+                response = (session or http_session()).get(url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            KMHFL_LIMITER.record(time.perf_counter() - start, error=True)
+            if attempt == MAX_RETRIES:
+                METRICS.inc("failures_total", stage="fetch")
+                raise
+            METRICS.inc("retries_total", stage="fetch")
+            continue
+
+        KMHFL_LIMITER.record(time.perf_counter() - start, response.status_code,
+                             retry_after=retry_after_seconds(response.headers.get("Retry-After")))
+        if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+            METRICS.inc("retries_total", stage="fetch")
+            continue
+        break
 
+    try:
+        response.raise_for_status()
+    except requests.exceptions.RequestException:
+        METRICS.inc("failures_total", stage="fetch")
+        raise
+    METRICS.inc("bytes_downloaded_total", len(response.content))
+    if ARCHIVE is not None:
+        ARCHIVE.put(url, response.content, response.status_code,
+                    response.headers.get("Content-Type"), response.encoding)
+    return response
+
+
+def polite_pause(seconds: float):
+    """Extra wait between requests to the live site (skipped when replaying)."""
+    if seconds and not replaying():
+        time.sleep(seconds)
+
+
+# ============================================================
+# --- STREAM FILE HELPERS ---
+# ============================================================
+
+# start_stream / end_stream come from stream_io; appends are timed here.
+# Output paths ending in .gz or .zst are written compressed.
 
 def append_stream(file_path: str, data: dict, is_first_entry: bool):
     """
@@ -84,22 +241,8 @@ def append_stream(file_path: str, data: dict, is_first_entry: bool):
         data (dict): Dictionary to serialize and append.
         is_first_entry (bool): Whether this is the first element (controls comma placement).
     """
-    json_string = json.dumps(data, ensure_ascii=False, indent=4)
-    with open(file_path, 'a', encoding='utf-8') as f:
-        if not is_first_entry:
-            f.write(',\n')  # Add comma before all but the first entry
-        f.write(json_string)
-
-
-def end_stream(file_path: str):
-    """
-    Close the open JSON array by appending a closing bracket.
-
-    Parameters:
-        file_path (str): Path of the JSON file to close.
-    """
-    with open(file_path, 'a', encoding='utf-8') as f:
-        f.write('\n]')
+    with METRICS.span("write"):
+        stream_io.append_stream(file_path, data, is_first_entry)
 
 
 # ============================================================
@@ -114,37 +257,93 @@ home_page = "https://kmhfl.health.go.ke/public/facilities"
 
 FIELDS = ['place_id', 'formatted_address', 'name', 'geometry']
 
-# Initialize the Google Maps client
-gmaps = googlemaps.Client(key=GOOGLE_MAPS_API_KEY)
+# Candidates whose name matches the facility name less well than this
+# (name_matching confidence) are rejected rather than taken blindly
+GOOGLE_MIN_CONFIDENCE = 0.4
 
 # --- Functions ---
 
-def google_find_place(place_name: str, detailed: bool= True) -> dict | None:
-    """Uses Text Search to find the Place ID for a given place name."""
+def google_find_place(place_name: str, detailed: bool= True, raise_errors: bool = False) -> dict | None:
+    """
+    Uses Text Search to find the Place ID for a given place name.
+
+    None means no (confident) match. Failed lookups (quota, timeouts,
+    transport errors) also return None unless `raise_errors` is set, in
+    which case they propagate so the caller can retry them later.
+    """
+    METRICS.inc("requests_total", stage="enrich")
     try:
         # Use 'Text Search' to find the most relevant place
-        search_result = gmaps.find_place(
-            input=place_name,
-            input_type='textquery',
-            fields=FIELDS
-        )        
-        if search_result.get('candidates'):
+        search_result = _find_place_response(place_name)
+        candidates = search_result.get('candidates') or []
+        if candidates:
+            from name_matching import best_candidate
+            best, confidence = best_candidate(place_name, [c.get("name") for c in candidates])
+            if confidence < GOOGLE_MIN_CONFIDENCE:
+                print(f"⚠️ No confident match for '{place_name}' "
+                      f"(best: '{candidates[best].get('name')}', confidence {confidence:.2f}).")
+                METRICS.inc("google_rejected_total")
+                return None
+            candidate = candidates[best]
             if not detailed:
-                place_id = search_result['candidates'][0]['place_id']
-                return {"google_place_id": place_id}
-            print(f"✅ Found ID for '{place_name}': {search_result['candidates'][0]['place_id']}")
+                return {"google_place_id": candidate['place_id'], "google_match_confidence": round(confidence, 3)}
+            print(f"✅ Found ID for '{place_name}': {candidate['place_id']} (confidence {confidence:.2f})")
             return {
-                "formatted_address": search_result['candidates'][0]["formatted_address"],
-                "google_name": search_result['candidates'][0]["name"],
-                "google_location": search_result['candidates'][0]["geometry"]["location"]
+                "formatted_address": candidate["formatted_address"],
+                "google_name": candidate["name"],
+                "google_location": candidate["geometry"]["location"],
+                "google_match_confidence": round(confidence, 3),
                 }
         else:
             print(f"❌ No results found for '{place_name}'.")
+            METRICS.inc("google_no_results_total")
             return None
     except Exception as e:
         print(f"An error occurred during search for '{place_name}': {e}")
+        METRICS.inc("failures_total", stage="enrich")
+        if raise_errors:
+            raise
         return None
 
+def _find_place_response(place_name: str) -> dict:
+    """
+    Raw Find Place response. With a response archive open, lookups are
+    read through it: a name already looked up costs no Google quota (in
+    record mode too, since place results rarely change).
+    """
+    key = "google:find_place?" + urlencode({"input": place_name, "fields": ",".join(FIELDS)})
+    if ARCHIVE is not None:
+        found, search_result = ARCHIVE.get_json(key)
+        if found:
+            METRICS.inc("archive_hits_total", stage="enrich")
+            return search_result
+        if replaying():
+            from response_archive import ArchiveMiss
+            raise ArchiveMiss(key)
+
+    import googlemaps
+
+    client = google_client()
+    GOOGLE_LIMITER.acquire()
+    start = time.perf_counter()
+    try:
+        search_result = client.find_place(
+            input=place_name,
+            input_type='textquery',
+            fields=FIELDS
+        )
+    except (googlemaps.exceptions.ApiError, googlemaps.exceptions.TransportError,
+            googlemaps.exceptions.Timeout) as e:
+        # ApiError covers OVER_QUERY_LIMIT; the client has already retried it
+        over_quota = getattr(e, "status", None) == "OVER_QUERY_LIMIT"
+        GOOGLE_LIMITER.record(time.perf_counter() - start, status=429 if over_quota else None,
+                              error=not over_quota)
+        raise
+    GOOGLE_LIMITER.record(time.perf_counter() - start, 200)
+    if ARCHIVE is not None:
+        ARCHIVE.put_json(key, search_result)
+    return search_result
+
 # ============================================================
 
 def extract_general_data(html: str):
@@ -157,6 +356,8 @@ def extract_general_data(html: str):
     Returns:
         dict: Parsed JSON content from the __NEXT_DATA__ script block.
     """
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html, "html.parser")
     script_tag = soup.find("script", {"id": "__NEXT_DATA__"})
 
@@ -198,21 +399,35 @@ def extract_facility_details(html: str, google_data:bool = True) -> dict:
     Returns:
         dict: Structured data extracted from the embedded JSON.
     """
-    soup = BeautifulSoup(html, "html.parser")
+    with METRICS.span("parse"):
+        facility_info = parse_facility_page(html)
 
-    # Locate the embedded JSON data from the Next.js app
-    script_tag = soup.find("script", {"id": "__NEXT_DATA__"})
-    if not script_tag:
-        raise ValueError("No __NEXT_DATA__ script found in HTML")
+    # Optionally enrich with Google Places data
+    if google_data and facility_info.get("name"):
+        with METRICS.span("enrich"):
+            google_place_data = google_find_place(facility_info["name"])
+        if google_place_data:
+            facility_info.update(google_place_data)
+    return facility_info
 
-    # Parse the JSON from inside the script tag
-    data = json.loads(script_tag.string)
+def parse_facility_page(html) -> dict:
+    """
+    Parse the __NEXT_DATA__ JSON of a facility page into the detail record.
+
+    Parameters:
+        html (str | bytes): The page source; raw response bytes are accepted
+            so pages can be shipped to worker processes undecoded.
+
+    Returns:
+        dict: The detail record, without Google enrichment.
+    """
+    data = _next_data(html)
 
     # Navigate to the facility-specific data object
     facility_data = data["props"]["pageProps"]["data"]
 
     # Extract the relevant facility details from the nested structure
-    facility_info = {
+    return {
         "id": facility_data.get("id"),
         "name": facility_data.get("name"),
         "code": facility_data.get("code"),
@@ -246,12 +461,37 @@ def extract_facility_details(html: str, google_data:bool = True) -> dict:
         "date_established": facility_data.get("date_established"),
     }
 
-    # Optionally enrich with Google Places data
-    if google_data and facility_info.get("name"):
-        google_place_data = google_find_place(facility_info["name"])
-        if google_place_data:
-            facility_info.update(google_place_data)
-    return facility_info
+def _next_data(html) -> dict:
+    """
+    Return the decoded __NEXT_DATA__ JSON of a page.
+
+    The script tag is located with a plain substring search, which is far
+    cheaper than building a BeautifulSoup tree for the whole page; pages
+    whose markup does not match fall back to BeautifulSoup.
+    """
+    is_bytes = isinstance(html, (bytes, bytearray))
+    marker, close_tag = (b'id="__NEXT_DATA__"', b"</script>") if is_bytes else ('id="__NEXT_DATA__"', "</script>")
+    start = html.find(marker)
+    if start != -1:
+        start = html.find(b">" if is_bytes else ">", start) + 1
+        end = html.find(close_tag, start)
+        if start > 0 and end != -1:
+            try:
+                return json.loads(html[start:end])
+            except ValueError:
+                pass
+
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Locate the embedded JSON data from the Next.js app
+    script_tag = soup.find("script", {"id": "__NEXT_DATA__"})
+    if not script_tag:
+        raise ValueError("No __NEXT_DATA__ script found in HTML")
+
+    # Parse the JSON from inside the script tag
+    return json.loads(script_tag.string)
 
 def write_facilities_to_file(data: dict, filename: str):
     """
@@ -286,7 +526,8 @@ def write_facilities_to_file(data: dict, filename: str):
         })
 
     # Step 3: overwrite file with a clean JSON array
-    with open(filename, "w", encoding="utf-8") as f:
+    stream_io.close_stream(filename)
+    with METRICS.span("write"), open_text(filename, "w") as f:
         json.dump(clean_list, f, ensure_ascii=False, indent=4)
 
     print(f"✅ Wrote {len(clean_list)} facilities to {filename}")
@@ -306,6 +547,8 @@ def fetch_all_general_data() -> int:
     Returns:
         int: Total number of facilities successfully written to file.
     """
+    import requests
+
     print("--- PHASE 1: General Facility Data ---")
 
     current_url = GENERAL_LIST_URL
@@ -321,8 +564,7 @@ def fetch_all_general_data() -> int:
 
             if page_count == 1:
                 try:
-                    resonse = requests.get(home_page)
-                    resonse.raise_for_status()
+                    resonse = http_get(home_page)
                     AUTH_TOKEN, data = extract_token(resonse.text)
                     HEADERS["Authorization"] = f"Bearer {AUTH_TOKEN}"
                     total_facilities = write_facilities_to_file(data, GENERAL_OUTPUT_FILE)
@@ -338,8 +580,7 @@ def fetch_all_general_data() -> int:
                 break
 
             try:
-                response = requests.get(current_url, headers=HEADERS)
-                response.raise_for_status()
+                response = http_get(current_url, headers=HEADERS)
                 data = response.json()
                 facilities = data.get("results", [])
 
@@ -355,8 +596,6 @@ def fetch_all_general_data() -> int:
                 # Continue to next page if available
                 current_url = data.get("next")
 
-                # Be polite to the API
-                time.sleep(1)
 
             except requests.exceptions.RequestException as e:
                 print(f"❌ Error fetching page {page_count}: {e}")
@@ -365,6 +604,7 @@ def fetch_all_general_data() -> int:
     finally:
         end_stream(GENERAL_OUTPUT_FILE) if page_count != 2 else None # It's two since we already wrote the first page in write_facilities_to_file
         print(f"\nPhase 1 complete. {total_facilities} facilities written to {GENERAL_OUTPUT_FILE}.")
+        export_metrics("general")
 
     return total_facilities
 
@@ -373,7 +613,7 @@ def fetch_all_general_data() -> int:
 # --- PHASE 2: STREAMED DETAILED DATA FETCHING ---
 # ============================================================
 
-def fetch_all_detail_data():
+def fetch_all_detail_data(shard: Shard = None):
     """
     Fetch detailed data for each facility ID obtained in Phase 1.
 
@@ -383,26 +623,33 @@ def fetch_all_detail_data():
 
     Uses HTML parsing since the detail endpoint is a React-rendered page,
     not a JSON API.
+
+    Parameters:
+        shard (tuple): Optional (i, N) to crawl only the facilities of shard
+            i out of N into that shard's own output file. With sharding,
+            MAX_FACILITIES_FOR_DETAIL caps the facilities considered before
+            partitioning, so the shards together cover the same facilities
+            as an unsharded run.
     """
-    print("\n--- PHASE 2: Detailed Facility Data ---")
+    import requests
 
-    if not os.path.exists(GENERAL_OUTPUT_FILE):
+    output_file = shard_output_file(DETAIL_OUTPUT_FILE, shard) if shard else DETAIL_OUTPUT_FILE
+    print(f"\n--- PHASE 2: Detailed Facility Data{f' (shard {shard[0]}/{shard[1]})' if shard else ''} ---")
+
+    if not os.path.exists(stream_io.find_existing(GENERAL_OUTPUT_FILE)):
         print(f"General data file '{GENERAL_OUTPUT_FILE}' not found.")
         return
 
-    start_stream(DETAIL_OUTPUT_FILE)
+    start_stream(output_file)
     first_entry = True
     processed_count = 0
+    considered_count = 0
 
     try:
-        # Load all facility objects from the general output
-        with open(GENERAL_OUTPUT_FILE, 'r', encoding='utf-8') as f:
-            general_data = json.load(f)
-
-        # Iterate through each facility record
-        for facility in general_data:
+        # Stream facility objects from the general output
+        for facility in iter_json_array(GENERAL_OUTPUT_FILE):
             # Stop early if limit set for testing
-            if MAX_FACILITIES_FOR_DETAIL and processed_count >= MAX_FACILITIES_FOR_DETAIL:
+            if MAX_FACILITIES_FOR_DETAIL and (considered_count if shard else processed_count) >= MAX_FACILITIES_FOR_DETAIL:
                 print(f"Reached MAX_FACILITIES_FOR_DETAIL ({MAX_FACILITIES_FOR_DETAIL}). Stopping.")
                 break
 
@@ -410,22 +657,24 @@ def fetch_all_detail_data():
             if not facility_id:
                 continue  # skip incomplete entries
 
+            considered_count += 1
+            if not in_shard(facility_id, shard):
+                continue  # another shard's facility
+
             detail_url = f"{DETAIL_API_BASE_URL}{facility_id}"
 
             try:
-                response = requests.get(detail_url)
-                response.raise_for_status()
+                response = http_get(detail_url)
 
                 # The detail endpoint returns HTML; extract embedded JSON data
                 detail_data = extract_facility_details(response.text)
                 print(detail_data)
 
-                append_stream(DETAIL_OUTPUT_FILE, detail_data, is_first_entry=first_entry)
+                append_stream(output_file, detail_data, is_first_entry=first_entry)
                 first_entry = False
                 processed_count += 1
 
                 print(f"✅ Processed facility {processed_count}: {facility_id}")
-                time.sleep(1)  # delay between requests
 
             except requests.exceptions.RequestException as e:
                 print(f"❌ Error fetching detail for ID {facility_id}: {e}")
@@ -433,12 +682,65 @@ def fetch_all_detail_data():
 
             except Exception as e:
                 print(f"❌ Parsing error for facility {facility_id}: {e}")
+                METRICS.inc("failures_total", stage="parse")
                 continue
 
     finally:
         # Always close the JSON array properly, even on errors
-        end_stream(DETAIL_OUTPUT_FILE)
-        print(f"\nPhase 2 complete. {processed_count} detailed records written to {DETAIL_OUTPUT_FILE}.")
+        end_stream(output_file)
+        print(f"\nPhase 2 complete. {processed_count} detailed records written to {output_file}.")
+        if shard:
+            export_metrics("detail", basename=f"{METRICS.namespace}.shard-{shard[0]}-of-{shard[1]}")
+        else:
+            export_metrics("detail")
+
+
+# Module settings handed to local shard processes (they start from a fresh interpreter)
+SHARD_SETTINGS = ("GENERAL_OUTPUT_FILE", "DETAIL_OUTPUT_FILE", "DETAIL_API_BASE_URL",
+                  "MAX_FACILITIES_FOR_DETAIL", "METRICS_DIR", "ARCHIVE_PATH", "ARCHIVE_MODE")
+
+
+def _run_shard(shard: Shard, settings: dict):
+    global ARCHIVE
+    globals().update(settings)
+    if ARCHIVE_PATH:
+        from response_archive import ResponseArchive
+        ARCHIVE = ResponseArchive(ARCHIVE_PATH)
+    fetch_all_detail_data(shard=shard)
+
+
+def run_local_shards(count: int) -> int:
+    """
+    Run Phase 2 as `count` local shard processes, then merge their files.
+
+    Mirrors a multi-host run on one machine, for testing the shard and
+    merge steps. Processes are spawned rather than forked, like separate
+    hosts they share nothing but the settings in SHARD_SETTINGS.
+
+    Returns:
+        int: Number of records in the merged detail file.
+    """
+    context = multiprocessing.get_context("spawn")
+    settings = {name: globals()[name] for name in SHARD_SETTINGS}
+    processes = [
+        context.Process(target=_run_shard, args=((i, count), settings), name=f"shard-{i}-of-{count}")
+        for i in range(1, count + 1)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        if process.exitcode != 0:
+            print(f"❌ {process.name} exited with code {process.exitcode}")
+    return merge_detail_shards(find_shard_files(DETAIL_OUTPUT_FILE, count), DETAIL_OUTPUT_FILE, GENERAL_OUTPUT_FILE)
+
+
+def export_metrics(phase: str, basename: str = None):
+    """Write the Prometheus textfile and JSON summary, and print stage percentiles."""
+    METRICS.set_gauge("phase_completed_timestamp_seconds", time.time(), phase=phase)
+    prom_path, json_path = METRICS.export(METRICS_DIR, phase=phase, basename=basename)
+    print(f"Stage timings after {phase} phase (metrics: {prom_path}, {json_path}):")
+    METRICS.print_summary()
 
 
 # ============================================================
@@ -446,9 +748,50 @@ def fetch_all_detail_data():
 # ============================================================
 
 if __name__ == "__main__":
-    total = fetch_all_general_data()
-
-    if total > 0:
-        fetch_all_detail_data()
-    else:
-        print("No facilities retrieved in Phase 1. Skipping Phase 2.")
+    parser = argparse.ArgumentParser(description="Scrape KMHFL facility data.")
+    parser.add_argument("--metrics-dir", default=METRICS_DIR, help="Where to write metrics files")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"], help="Profile the whole run")
+    parser.add_argument("--profile-out", help="Profile output path (default: metrics dir)")
+    parser.add_argument("--compress", choices=["gz", "zst"], help="Write the output files compressed")
+    parser.add_argument("--archive", metavar="PATH", help="Raw response archive (SQLite) to record to or replay from")
+    parser.add_argument("--archive-mode", choices=["record", "replay"], default="record",
+                        help="record: fetch and store responses; replay: serve them from the archive offline")
+    sharding_group = parser.add_mutually_exclusive_group()
+    sharding_group.add_argument("--shard", type=parse_shard, metavar="I/N",
+                                help="Run Phase 2 for shard I of N only (Phase 1 file must exist)")
+    sharding_group.add_argument("--merge-shards", type=int, metavar="N",
+                                help="Merge the N shard files into the canonical detail file")
+    sharding_group.add_argument("--local-shards", type=int, metavar="N",
+                                help="Run Phase 1, then Phase 2 as N local shard processes, then merge")
+    args = parser.parse_args()
+
+    METRICS_DIR = args.metrics_dir
+    if args.compress:
+        GENERAL_OUTPUT_FILE += f".{args.compress}"
+        DETAIL_OUTPUT_FILE += f".{args.compress}"
+    if args.archive:
+        from response_archive import ResponseArchive
+        ARCHIVE_PATH, ARCHIVE_MODE = args.archive, args.archive_mode
+        ARCHIVE = ResponseArchive(ARCHIVE_PATH)
+    profile_out = args.profile_out or os.path.join(
+        METRICS_DIR, "scraper.prof" if args.profile == "cprofile" else "scraper_profile.html"
+    )
+    if args.profile:
+        os.makedirs(os.path.dirname(os.path.abspath(profile_out)), exist_ok=True)
+
+    with profiled(args.profile, profile_out):
+        if args.shard:
+            fetch_all_detail_data(shard=args.shard)
+        elif args.merge_shards:
+            merge_detail_shards(find_shard_files(DETAIL_OUTPUT_FILE, args.merge_shards),
+                                DETAIL_OUTPUT_FILE, GENERAL_OUTPUT_FILE)
+        else:
+            total = fetch_all_general_data()
+
+            if total > 0:
+                if args.local_shards:
+                    run_local_shards(args.local_shards)
+                else:
+                    fetch_all_detail_data()
+            else:
+                print("No facilities retrieved in Phase 1. Skipping Phase 2.")
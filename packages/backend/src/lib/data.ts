@@ -97,14 +97,30 @@ export async function updateUserById(userId: number, updates: Record<string, any
 
 
 // CLINICS
-export async function listClinicsDb(filters: { q?: string; min_rating?: number } = {}) {
-  let query = serviceClient!.from('clinics')
-    .select('clinic_id, name, address, latitude, longitude, services, consultation_fee, contact, rating');
+export async function listClinicsDb(filters: { q?: string; min_rating?: number; sort?: 'rating'; service?: string } = {}) {
+  let columns = 'clinic_id, name, address, latitude, longitude, services, consultation_fee, contact, rating';
+  let serviceIds: number[] | undefined;
+  if (filters.service) {
+    // Matched against the small services dictionary, then through the indexed
+    // clinic_services join table (seeding_scripts/service_taxonomy.py, see migrations)
+    const { data: matches, error: servicesError } = await serviceClient!.from('services')
+      .select('service_id')
+      .ilike('name', `%${filters.service}%`);
+    if (servicesError) throw servicesError;
+    serviceIds = (matches || []).map((row: { service_id: number }) => row.service_id);
+    if (serviceIds.length === 0) return [];
+    columns += ', clinic_services!inner(service_id)';
+  }
+
+  let query = serviceClient!.from('clinics').select(columns);
   if (filters.q) query = query.ilike('name', `%${filters.q}%`);
   if (typeof filters.min_rating === 'number') query = query.gte('rating', filters.min_rating);
+  if (serviceIds) query = query.in('clinic_services.service_id', serviceIds);
+  // rating is kept in step with the reviews by seeding_scripts/rating_aggregates.py (indexed, see migrations)
+  if (filters.sort === 'rating') query = query.order('rating', { ascending: false, nullsFirst: false });
   const { data, error } = await query;
   if (error) throw error;
-  return data || [];
+  return (data || []).map(({ clinic_services, ...clinic }: any) => clinic);
 }
 
 export async function getClinicDb(id: number) {
@@ -125,7 +141,96 @@ export async function getClinicByGooglePlaceId(googlePlaceId: string) {
   return data || null;
 }
 
+// Precomputed by seeding_scripts/clinic_neighbours.py; null when the clinic has no row yet
+export async function listClinicNeighboursDb(id: number, limit?: number) {
+  const { data: row, error } = await serviceClient!.from('clinic_neighbours')
+    .select('neighbour_ids, distances_km')
+    .eq('clinic_id', id)
+    .maybeSingle();
+  if (error) throw error;
+  if (!row) return null;
 
+  const ids: number[] = row.neighbour_ids.slice(0, limit ?? row.neighbour_ids.length);
+  if (ids.length === 0) return [];
+  const { data: clinics, error: clinicsError } = await serviceClient!.from('clinics')
+    .select('clinic_id, name, address, latitude, longitude, services, consultation_fee, contact, rating')
+    .in('clinic_id', ids);
+  if (clinicsError) throw clinicsError;
+
+  const byId = new Map((clinics || []).map((c: any) => [c.clinic_id, c]));
+  return ids
+    .map((clinicId, i) => byId.has(clinicId) ? { ...byId.get(clinicId), distance_km: row.distances_km[i] } : null)
+    .filter((c) => c !== null);
+}
+
+
+
+// Service names of a clinic's `services` display text ("A, B, C"), normalized
+// like seeding_scripts/service_taxonomy.py: whitespace collapsed, matched case-insensitively
+function serviceNames(services: string | null | undefined): string[] {
+  const names = new Map<string, string>();
+  for (const part of (services ?? '').split(',')) {
+    const name = part.split(/\s+/).filter(Boolean).join(' ');
+    if (name && !names.has(name.toLowerCase())) names.set(name.toLowerCase(), name);
+  }
+  return [...names.values()];
+}
+
+async function loadServiceDictionaryDb() {
+  const ids = new Map<string, number>();
+  for (let after = 0; ;) {
+    const { data, error } = await serviceClient!.from('services')
+      .select('service_id, name')
+      .gt('service_id', after)
+      .order('service_id')
+      .limit(1000);
+    if (error) throw error;
+    if (!data || data.length === 0) return ids;
+    for (const row of data) {
+      if (!ids.has(row.name.toLowerCase())) ids.set(row.name.toLowerCase(), row.service_id);
+    }
+    after = data[data.length - 1].service_id;
+  }
+}
+
+// Service IDs of the names, adding the missing ones (uncategorized) to the dictionary
+async function serviceIdsDb(names: string[]): Promise<Map<string, number>> {
+  const ids = await loadServiceDictionaryDb();
+  const missing = names.filter((name) => !ids.has(name.toLowerCase()));
+  if (missing.length === 0) return ids;
+
+  // service_id is an identity column; names another writer added first are kept and read back below
+  const { error } = await serviceClient!.from('services')
+    .upsert(missing.map((name) => ({ category_id: null, name })), { onConflict: 'category_id,name', ignoreDuplicates: true });
+  if (error) throw error;
+  const { data, error: readError } = await serviceClient!.from('services')
+    .select('service_id, name')
+    .is('category_id', null)
+    .in('name', missing);
+  if (readError) throw readError;
+  for (const row of data || []) ids.set(row.name.toLowerCase(), row.service_id);
+  return ids;
+}
+
+// Keep clinic_services (read by the ?service= filter) in step with the clinics' services text
+export async function linkClinicServicesDb(clinics: { clinic_id: number; services?: string | null }[]) {
+  if (clinics.length === 0) return;
+  const namesByClinic = clinics.map((clinic) => ({ clinic_id: clinic.clinic_id, names: serviceNames(clinic.services) }));
+  const allNames = serviceNames(namesByClinic.flatMap((clinic) => clinic.names).join(','));
+  const ids = allNames.length > 0 ? await serviceIdsDb(allNames) : new Map<string, number>();
+
+  const { error: deleteError } = await serviceClient!.from('clinic_services')
+    .delete()
+    .in('clinic_id', clinics.map((clinic) => clinic.clinic_id));
+  if (deleteError) throw deleteError;
+
+  const links = namesByClinic.flatMap(({ clinic_id, names }) =>
+    [...new Set(names.map((name) => ids.get(name.toLowerCase())!))].map((service_id) => ({ clinic_id, service_id })));
+  if (links.length === 0) return;
+  const { error } = await serviceClient!.from('clinic_services')
+    .upsert(links, { onConflict: 'clinic_id,service_id', ignoreDuplicates: true });
+  if (error) throw error;
+}
 
 export async function createClinicDb(payload: { name: string; address?: string | null; latitude: number; longitude: number; services?: string | null; consultation_fee?: number | null; contact?: string | null; }) {
   const { data, error } = await serviceClient!.from('clinics')
@@ -141,6 +246,7 @@ export async function createClinicDb(payload: { name: string; address?: string |
     .select('clinic_id, name, address, latitude, longitude, services, consultation_fee, contact, rating')
     .single();
   if (error) throw error;
+  await linkClinicServicesDb([data]);
   return data;
 }
 
@@ -151,6 +257,7 @@ export async function updateClinicDb(id: number, changes: Partial<{ name: string
     .select('clinic_id, name, address, latitude, longitude, services, consultation_fee, contact, rating')
     .single();
   if (error) throw error;
+  if (changes.services !== undefined) await linkClinicServicesDb([data]);
   return data;
 }
 
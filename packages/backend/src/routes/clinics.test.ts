@@ -92,6 +92,48 @@ describe('Clinics API', () => {
         }
       });
     });
+
+    describe('service filter', () => {
+      // POST keeps clinic_services in step with the services text
+      let otherClinicId: number;
+
+      beforeAll(async () => {
+        const response = await request(app)
+          .post('/api/clinics')
+          .send({ ...testClinic, name: 'Test Service Filter Clinic', services: 'Test Filter Dermatology' })
+          .expect(201);
+        otherClinicId = response.body.clinic_id;
+      });
+
+      afterAll(async () => {
+        if (serviceClient && otherClinicId) {
+          await serviceClient.from('clinics').delete().eq('clinic_id', otherClinicId);
+        }
+      });
+
+      it('should include clinics offering the service', async () => {
+        const response = await request(app)
+          .get('/api/clinics?service=Pediatrics')
+          .expect(200);
+
+        const ids = response.body.map((clinic: any) => clinic.clinic_id);
+        expect(ids).toContain(createdClinicId);
+        expect(ids).not.toContain(otherClinicId);
+        response.body.forEach((clinic: any) => {
+          expect(clinic).not.toHaveProperty('clinic_services');
+        });
+      });
+
+      it('should leave out clinics without the service', async () => {
+        const response = await request(app)
+          .get('/api/clinics?service=Test%20Filter%20Dermatology')
+          .expect(200);
+
+        const ids = response.body.map((clinic: any) => clinic.clinic_id);
+        expect(ids).toContain(otherClinicId);
+        expect(ids).not.toContain(createdClinicId);
+      });
+    });
   });
 
   describe('GET /api/clinics/:id', () => {
@@ -114,6 +156,30 @@ describe('Clinics API', () => {
     });
   });
 
+  describe('GET /api/clinics/:id/nearby', () => {
+    it('should reject an invalid limit', async () => {
+      for (const limit of ['abc', '-1', '0', '2.5', '1000']) {
+        const response = await request(app)
+          .get(`/api/clinics/${createdClinicId}/nearby?limit=${limit}`)
+          .expect(400);
+
+        expect(response.body).toHaveProperty('error', 'ValidationError');
+      }
+    });
+
+    it('should return at most limit neighbours', async () => {
+      const response = await request(app)
+        .get(`/api/clinics/${createdClinicId}/nearby?limit=2`);
+
+      // 404 until seeding_scripts/clinic_neighbours.py has run for the new clinic
+      expect([200, 404]).toContain(response.status);
+      if (response.status === 200) {
+        expect(Array.isArray(response.body)).toBe(true);
+        expect(response.body.length).toBeLessThanOrEqual(2);
+      }
+    });
+  });
+
   describe('PUT /api/clinics/:id', () => {
     it('should update clinic successfully', async () => {
       const updateData = {
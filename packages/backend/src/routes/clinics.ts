@@ -1,23 +1,29 @@
 import { Router, Request, Response } from 'express';
-import { createClinicDb, getClinicDb, listClinicsDb, updateClinicDb, deleteClinicDb, getClinicByGooglePlaceId } from '../lib/data';
+import { createClinicDb, getClinicDb, listClinicsDb, updateClinicDb, deleteClinicDb, getClinicByGooglePlaceId, listClinicNeighboursDb } from '../lib/data';
 import { googlePlacesService } from '../services/googlePlaces';
+import { validate } from '../middleware/validate';
+import { NearbyClinicsInput } from '../schemas/clinics.schema';
 
 const router = Router();
 
 // Get all clinics with optional filters
 router.get('/', async (req: Request, res: Response): Promise<Response> => {
   try {
-    const { q, min_rating, limit, offset } = req.query as {
+    const { q, min_rating, sort, service, limit, offset } = req.query as {
       q?: string;
       min_rating?: string;
+      sort?: string;
+      service?: string;
       limit?: string;
       offset?: string;
     };
 
-    const filters: { q?: string; min_rating?: number; limit?: number; offset?: number } = {};
+    const filters: { q?: string; min_rating?: number; sort?: 'rating'; service?: string; limit?: number; offset?: number } = {};
 
     if (q) filters.q = q;
     if (min_rating) filters.min_rating = parseFloat(min_rating);
+    if (sort === 'rating') filters.sort = 'rating';
+    if (service) filters.service = service;
     if (limit) filters.limit = parseInt(limit, 10);
     if (offset) filters.offset = parseInt(offset, 10);
 
@@ -46,6 +52,23 @@ router.get('/:id', async (req: Request, res: Response): Promise<Response> => {
   }
 });
 
+// Get the nearest other clinics (precomputed neighbour table)
+router.get('/:id/nearby', validate({ query: NearbyClinicsInput }), async (req: Request, res: Response): Promise<Response> => {
+  try {
+    const id = Number(req.params.id);
+    const { limit } = req.query as { limit?: number };
+    const neighbours = await listClinicNeighboursDb(id, limit);
+
+    if (!neighbours) {
+      return res.status(404).json({ error: 'No neighbours computed for this clinic' });
+    }
+
+    return res.json(neighbours);
+  } catch (error) {
+    return res.status(500).json({ error: 'Internal server error' });
+  }
+});
+
 // Get clinic by place ID
 router.get('/place/:placeId', async (req: Request, res: Response): Promise<Response> => {
   try {
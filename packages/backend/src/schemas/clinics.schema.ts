@@ -13,8 +13,12 @@ export const CreateClinicInput = z.object({
 export const QueryClinicsInput = z.object({
   q: z.string().optional(),
   min_rating: z.string().optional(),
+  sort: z.enum(['rating']).optional(),
+  service: z.string().optional(),
   limit: z.string().optional(),
   offset: z.string().optional(),
 });
 
-
+export const NearbyClinicsInput = z.object({
+  limit: z.coerce.number().int().min(1).max(100).optional(),
+});
@@ -1,5 +1,6 @@
 import { serviceClient } from '../config/supabase';
 import { env } from '../config/env';
+import { linkClinicServicesDb } from '../lib/data';
 
 
 interface GooglePlaceResult {
@@ -280,6 +281,9 @@ export class GooglePlacesService {
       return [];
     }
 
+    // Clinics with reviews keep the rating maintained from them (seeding_scripts/rating_aggregates.py)
+    const reviewed = await this.reviewedPlaceIds(places.map(place => place.id));
+
     const clinicsToUpsert = places.map(place => ({
       name: place.displayName.text,
       address: place.formattedAddress,
@@ -293,18 +297,27 @@ export class GooglePlacesService {
       source: 'google_places',
       services: place.types?.join(', ') || null
     }));
+    const unrated = clinicsToUpsert.filter(clinic => !reviewed.has(clinic.google_place_id));
+    const rated = clinicsToUpsert
+      .filter(clinic => reviewed.has(clinic.google_place_id))
+      .map(({ rating, ...clinic }) => clinic);
 
-    const { data, error } = await serviceClient!
-      .from('clinics')
-      .upsert(clinicsToUpsert, { onConflict: 'google_place_id' })
-      .select();
+    const savedClinics: any[] = [];
+    for (const batch of [unrated, rated]) {
+      if (batch.length === 0) continue;
 
-    if (error) {
-      console.error('Error bulk saving clinics to Supabase:', error);
-      throw error;
-    }
+      const { data, error } = await serviceClient!
+        .from('clinics')
+        .upsert(batch, { onConflict: 'google_place_id' })
+        .select();
 
-    const savedClinics = data || [];
+      if (error) {
+        console.error('Error bulk saving clinics to Supabase:', error);
+        throw error;
+      }
+      savedClinics.push(...(data || []));
+    }
+    await linkClinicServicesDb(savedClinics);
 
     // If user location is provided, sort by distance
     if (userLat !== undefined && userLng !== undefined) {
@@ -319,6 +332,24 @@ export class GooglePlacesService {
     return savedClinics;
   }
 
+  /**
+   * Google place IDs of the given places whose clinics have reviews
+   * (a clinic_rating_aggregates row)
+   */
+  private async reviewedPlaceIds(placeIds: string[]): Promise<Set<string>> {
+    const { data, error } = await serviceClient!
+      .from('clinics')
+      .select('google_place_id, clinic_rating_aggregates!inner(clinic_id)')
+      .in('google_place_id', placeIds);
+
+    if (error) {
+      console.error('Error loading reviewed clinics from Supabase:', error);
+      throw error;
+    }
+
+    return new Set((data || []).map((clinic: any) => clinic.google_place_id));
+  }
+
   /**
    * Update a single clinic's details in Supabase
    */